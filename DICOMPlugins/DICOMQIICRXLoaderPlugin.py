@@ -1,9 +1,15 @@
+import qt
 import slicer
-import ctk
 import pydicom
+import pydicom.errors
+import sqlite3
 import os
 import json
+import time
 import logging
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import cmp_to_key
 from datetime import datetime
 
@@ -13,10 +19,28 @@ from DICOMScalarVolumePlugin import DICOMScalarVolumePluginClass
 
 from SlicerPIRADSLogic.SeriesType import *
 from SlicerPIRADSLogic.Exception import StudyNotEligibleError
+from SlicerPIRADSLogic.FindingSerializer import FindingSerializer
+from SlicerPIRADSLogic.ProstateMeasurement import ProstateVolume
+from SlicerPIRADSLogic.Tracing import Tracer, BYTES_DECODED, DATABASE_QUERIES, FILES_READ
+from SlicerPIRADSLogic.DICOMIndexingQueue import DICOMIndexingQueue
+from SlicerPIRADSCore.QIICRX import QIICRXReportContext, generateQIICRXMetadata, loadAcquisitionTypes, readHeader, \
+  addFindings, readFindings, readGlandVolume
+from SlicerPIRADSCore.Workspace import Workspace, hashData, hashFile
+from SlicerPIRADSCore.Cache import LRUCache
+from SlicerPIRADSCore.DICOMDatabaseQueries import getFilesForInstances, queryModalitiesForFiles, \
+  querySeriesModalities
+from SlicerPIRADSCore.ExamineResultStore import ExamineResult, ExamineResultStore
 
 from SlicerDevelopmentToolboxUtils.mixins import ModuleLogicMixin
 
 
+_workspace = None
+_decodedReports = LRUCache(maximumSize=64)
+""" Decoded QIICRX meta data by (SOPInstanceUID, modification time of the SR file) """
+_examineResultStores = dict()
+""" ExamineResultStore (or None if examine results cannot be persisted) by DICOM database file name """
+
+
 class DICOMQIICRXMixin(ModuleLogicMixin):
 
   UID_EnhancedSRStorage = "1.2.840.10008.5.1.4.1.1.88.22"
@@ -40,7 +64,126 @@ class DICOMQIICRXMixin(ModuleLogicMixin):
 
   @property
   def db(self):
-    return slicer.dicomDatabase
+    return self.getDICOMDatabase()
+
+  @staticmethod
+  def getDICOMDatabase():
+    """ Returns slicer.dicomDatabase. If tracing is enabled, each query gets counted. """
+    return Tracer().countCalls(slicer.dicomDatabase)
+
+  @staticmethod
+  def readDataset(fileName, **kwargs):
+    """ Reads fileName with pydicom and counts the file and its size if tracing is enabled """
+    tracer = Tracer()
+    if tracer.enabled:
+      tracer.count(FILES_READ)
+      tracer.count(BYTES_DECODED, os.path.getsize(fileName))
+    return pydicom.read_file(fileName, **kwargs)
+
+  @staticmethod
+  def readHeader(fileName):
+    """ Reads fileName up to ContentTemplateSequence (see SlicerPIRADSCore.QIICRX.readHeader) and counts the file and
+    the bytes read if tracing is enabled
+    """
+    dataset, numberOfBytes = readHeader(fileName)
+    tracer = Tracer()
+    if tracer.enabled:
+      tracer.count(FILES_READ)
+      tracer.count(BYTES_DECODED, numberOfBytes)
+    return dataset
+
+  @classmethod
+  def getSeriesModalities(cls, seriesUIDs):
+    """ Returns dictionary mapping SeriesInstanceUIDs to Modality queried at once from the DICOM database index. Series
+    that cannot be resolved that way are missing.
+    """
+    try:
+      modalities = querySeriesModalities(cls.getDICOMDatabase().databaseFilename, seriesUIDs)
+      Tracer().count(DATABASE_QUERIES)
+      return modalities
+    except sqlite3.Error as exc:
+      logging.debug("Bulk query of series modalities failed: %s" % exc)
+      return dict()
+
+  @classmethod
+  def getModalitiesForFiles(cls, fileNames):
+    """ Returns dictionary mapping indexed files to the Modality of their series without reading the files """
+    if not fileNames:
+      return dict()
+    try:
+      modalities = queryModalitiesForFiles(cls.getDICOMDatabase().databaseFilename, fileNames)
+      Tracer().count(DATABASE_QUERIES)
+      return modalities
+    except sqlite3.Error as exc:
+      logging.debug("Bulk query of file modalities failed: %s" % exc)
+      return dict()
+
+  @classmethod
+  def getFilesForInstances(cls, instanceUIDs):
+    """ Returns dictionary mapping SOPInstanceUIDs to files
+
+    All instances are resolved by a single read-only query of the DICOM database file. Instances that cannot be
+    resolved that way (e.g. in-memory database) are looked up one by one.
+    """
+    with Tracer().span("DICOMQIICRXMixin.getFilesForInstances", numberOfInstances=len(instanceUIDs)):
+      Tracer().count(DATABASE_QUERIES)
+      return getFilesForInstances(cls.getDICOMDatabase(), instanceUIDs)
+
+  @classmethod
+  def getExamineResultStore(cls):
+    """ Returns ExamineResultStore next to the current DICOM database or None if the database is not file based """
+    databaseFilename = cls.getDICOMDatabase().databaseFilename
+    if not databaseFilename or databaseFilename == ":memory:":
+      return None
+    try:
+      return _examineResultStores[databaseFilename]
+    except KeyError:
+      try:
+        fileName = os.path.join(os.path.dirname(databaseFilename), "SlicerPIRADS", "ExamineResults.sql")
+        store = ExamineResultStore(fileName)
+      except (sqlite3.Error, OSError) as exc:
+        logging.warning("Examine results cannot be persisted: %s" % exc)
+        store = None
+      _examineResultStores[databaseFilename] = store
+      return store
+
+  @staticmethod
+  def getWorkspace():
+    """ Returns the process wide Workspace of QIICRX intermediate files (decoded reports, meta data and generated SR)
+
+    Size and age limits are taken from the [QIICRX Workspace] section of default.cfg. Outdated entries get evicted when
+    the workspace is used for the first time.
+    """
+    global _workspace
+    if _workspace is None:
+      settings = qt.QSettings()
+      maximumSize = float(settings.value("SlicerPIRADS/QIICRX_Workspace_Maximum_Size", 2048))
+      maximumAge = float(settings.value("SlicerPIRADS/QIICRX_Workspace_Maximum_Age", 14))
+      _workspace = Workspace(os.path.join(slicer.app.temporaryPath, "QIICRX"),
+                             maximumSize=int(maximumSize * 1024 * 1024), maximumAge=maximumAge * 24 * 3600)
+      _workspace.evict()
+    return _workspace
+
+  @property
+  def annotationDirectory(self):
+    """ Persistent directory next to the DICOM database holding annotations referenced by QIICRX reports """
+    return os.path.join(os.path.dirname(self.db.databaseFilename), "SlicerPIRADS", "Annotations", self.currentDateTime)
+
+  @classmethod
+  @Tracer().traced("DICOMQIICRXMixin.createReportContext")
+  def createReportContext(cls, seriesUIDs):
+    """ Returns QIICRXReportContext with files and series types of seriesUIDs queried once from the DICOM database
+
+    Series get classified by the series description stored in the database. Only if it is missing the first file gets
+    read. The b-values of DWI series are read from their files.
+    """
+    db = cls.getDICOMDatabase()
+
+    def getSeriesType(files):
+      description = db.fileValue(files[0], cls.tags['seriesDescription'])
+      return SeriesTypeFactory.getSeriesTypeForFiles(files, description if description else None)
+
+    return QIICRXReportContext.fromSeriesFiles([(s, db.filesForSeries(s)) for s in seriesUIDs], getSeriesType)
 
   @classmethod
   def isQIICRX(cls, dataset):
@@ -55,14 +198,11 @@ class DICOMQIICRXMixin(ModuleLogicMixin):
 class DICOMQIICRXLoaderPluginClass(DICOMPlugin, DICOMQIICRXMixin):
 
   @staticmethod
+  @Tracer().traced("DICOMQIICRXLoaderPluginClass.getEligibleSeriesForStudy")
   def getEligibleSeriesForStudy(study):
-    db = slicer.dicomDatabase
-    series = db.seriesForStudy(study)
-    validSeries = []
-    for s in series:
-      if SeriesTypeFactory.getSeriesType(db.filesForSeries(s)[0]):
-        validSeries.append(s)
-    return validSeries
+    db = DICOMQIICRXMixin.getDICOMDatabase()
+    context = DICOMQIICRXMixin.createReportContext(db.seriesForStudy(study))
+    return context.getEligibleContext().getSeriesInstanceUIDs()
 
   @classmethod
   def hasEligibleQIICRXReport(cls, study):
@@ -70,18 +210,21 @@ class DICOMQIICRXLoaderPluginClass(DICOMPlugin, DICOMQIICRXMixin):
 
   @classmethod
   def isDicomTIDQIICRX(cls, fileName):
-    if cls.getDICOMValue(fileName, cls.tags['modality']) == 'SR':
-      return DICOMQIICRXLoaderPluginClass.isQIICRX(pydicom.read_file(fileName))
-    return False
+    return cls.isQIICRX(cls.readHeader(fileName))
 
   @staticmethod
+  @Tracer().traced("DICOMQIICRXLoaderPluginClass.getQIICRXReportSeries")
   def getQIICRXReportSeries(inputData):
+    db = DICOMQIICRXMixin.getDICOMDatabase()
     if type(inputData) is str:
-      return DICOMQIICRXLoaderPluginClass.getQIICRXReportSeries(slicer.dicomDatabase.seriesForStudy(inputData))
+      return DICOMQIICRXLoaderPluginClass.getQIICRXReportSeries(db.seriesForStudy(inputData))
     else:
+      modalities = DICOMQIICRXLoaderPluginClass.getSeriesModalities(inputData)
       eligible = []
       for currentSeries in inputData:
-        if DICOMQIICRXLoaderPluginClass.isDicomTIDQIICRX(slicer.dicomDatabase.filesForSeries(currentSeries)[0]):
+        if modalities.get(currentSeries, 'SR') != 'SR':
+          continue
+        if DICOMQIICRXLoaderPluginClass.isDicomTIDQIICRX(db.filesForSeries(currentSeries)[0]):
           eligible.append(currentSeries)
       return eligible
 
@@ -93,7 +236,10 @@ class DICOMQIICRXLoaderPluginClass(DICOMPlugin, DICOMQIICRXMixin):
 
     DICOMPlugin.__init__(self)
     self.loadType = "DICOM {}".format(self.TEMPLATE_ID)
+    self.findings = []
+    self.glandVolume = None
 
+  @Tracer().traced("DICOMQIICRXLoaderPluginClass.examine")
   def examine(self, fileLists):
     loadables = []
     for files in fileLists:
@@ -109,67 +255,118 @@ class DICOMQIICRXLoaderPluginClass(DICOMPlugin, DICOMQIICRXMixin):
 
     return loadables
 
+  @Tracer().traced("DICOMQIICRXLoaderPluginClass.examineFiles")
   def examineFiles(self, files):
+    """ Returns a loadable for each QIICRX file. Results of examined files are persisted (see ExamineResultStore), so
+    that unchanged files are not read again, not even after a restart. Files without SOPInstanceUID are skipped.
+
+    Files whose series is indexed with a Modality other than SR are rejected without reading them. Only the header
+    (see readHeader) of all other files gets read.
+    """
+    store = self.getExamineResultStore()
+    results = store.get(files) if store else dict()
+    modalities = self.getModalitiesForFiles([f for f in files if f not in results])
+    newResults = []
     loadables = []
     for currentFile in files:
-      dataset = pydicom.read_file(currentFile)
-
-      uid = self.getDICOMValue(dataset, "SOPInstanceUID")
-      if uid == "":
-        return []
-
-      seriesDescription = self.getDICOMValue(dataset, "SeriesDescription", "Unknown")
-
-      if self.isQIICRX(dataset):
+      result = results.get(currentFile)
+      if result is None:
+        if modalities.get(currentFile, 'SR') != 'SR':
+          continue
+        try:
+          result = self._examineFile(currentFile)
+        except (IOError, OSError, pydicom.errors.InvalidDicomError) as exc:
+          logging.debug("Examining '%s' failed: %s" % (currentFile, exc))
+          continue
+        newResults.append(result)
+
+      if not result.sopInstanceUID:
+        continue
+
+      if result.isQIICRX:
         loadable = DICOMLoadable()
-        loadable.selected = True
-        loadable.confidence = 0.95
         loadable.files = [currentFile]
-        loadable.name = '{} - as a DICOM {} object'.format(seriesDescription, self.TEMPLATE_ID)
+        loadable.name = '{} - as a DICOM {} object'.format(result.seriesDescription, self.TEMPLATE_ID)
         loadable.tooltip = loadable.name
         loadable.selected = True
         loadable.confidence = 0.95
-        loadable.uids = [uid]
+        loadable.uids = [result.sopInstanceUID]
         loadables.append(loadable)
 
         logging.debug('DICOM SR {} modality found'.format(self.TEMPLATE_ID))
 
+    if store and newResults:
+      store.put(newResults)
     return loadables
 
+  def _examineFile(self, fileName):
+    dataset = self.readHeader(fileName)
+    return ExamineResult(fileName, self.getDICOMValue(dataset, "SOPInstanceUID"),
+                         self.getDICOMValue(dataset, "SeriesDescription", "Unknown"), self.isQIICRX(dataset))
+
+  @Tracer().traced("DICOMQIICRXLoaderPluginClass.load")
   def load(self, loadable):
 
     uid = loadable.uids[0]
-    self.tempDir = os.path.join(slicer.app.temporaryPath, self.TEMPLATE_ID, self.currentDateTime)
-    if not os.path.exists(self.tempDir):
-      ModuleLogicMixin.createDirectory(self.tempDir)
-
-    outputFile = os.path.join(self.tempDir, "{}.json".format(uid))
-
     srFileName = self.db.fileForInstance(uid)
     if srFileName is None:
       logging.debug('Failed to get the filename from the DICOM database for ', uid)
       return False
 
+    data = self._getReportMetaData(uid, srFileName)
+    if data is None:
+      return False
+
+    files = self.getFilesForInstances([e for entry in data['imageLibrary'] for e in entry['instanceUIDs']])
+    for imageLibraryEntry in data['imageLibrary']:
+      self.loadSeries([files[e] for e in imageLibraryEntry['instanceUIDs']])
+
+    self.findings = FindingSerializer.deserialize(data.get('findings', []),
+                                                  VolumeSeriesTypeSceneObserver().volumeSeriesTypes.values())
+    self.glandVolume = ProstateVolume.fromDict(data.get('glandVolume'))
+    return True
+
+  @staticmethod
+  def _getReportMetaData(uid, srFileName):
+    """ Returns decoded meta data of the SR including the findings and the gland volume stored in it (see
+    addFindings). It is cached by SOPInstanceUID and modification time of the SR file.
+    """
+    key = (uid, os.path.getmtime(srFileName))
+    data = _decodedReports.get(key)
+    if data is not None:
+      return data
+
+    outputFile = os.path.join(DICOMQIICRXMixin.getWorkspace().getEntry(hashFile(srFileName)), "{}.json".format(uid))
+    if not os.path.exists(outputFile) and not DICOMQIICRXLoaderPluginClass._decodeReport(srFileName, outputFile):
+      return None
+
+    Tracer().count(FILES_READ)
+    with open(outputFile) as metaFile:
+      data = json.load(metaFile)
+    dataset = DICOMQIICRXMixin.readDataset(srFileName)
+    data['findings'] = readFindings(dataset)
+    data['glandVolume'] = readGlandVolume(dataset)
+    _decodedReports.put(key, data)
+    return data
+
+  @classmethod
+  def _decodeReport(cls, srFileName, outputFile):
     param = {
       "inputDICOM": srFileName,
       "metaDataFileName": outputFile,
     }
 
-    cliNode = slicer.cli.run(slicer.modules.qiicrxsr, None, param, wait_for_completion=True)
+    with Tracer().span("qiicrxsr CLI", mode="read"):
+      cliNode = slicer.cli.run(slicer.modules.qiicrxsr, None, param, wait_for_completion=True)
     if cliNode.GetStatusString() != 'Completed':
-      logging.debug('qiicrxsr did not complete successfully, unable to load DICOM {}'.format(self.TEMPLATE_ID))
-      # self.cleanup()
+      logging.debug('qiicrxsr did not complete successfully, unable to load DICOM {}'.format(cls.TEMPLATE_ID))
+      if os.path.exists(outputFile):
+        os.remove(outputFile)
       return False
-
-    with open(outputFile) as metaFile:
-      data = json.load(metaFile)
-      for imageLibraryEntry in data['imageLibrary']:
-        files = [self.db.fileForInstance(e) for e in imageLibraryEntry['instanceUIDs']]
-        self.loadSeries(files)
-
     return True
 
   @staticmethod
+  @Tracer().traced("DICOMQIICRXLoaderPluginClass.loadSeries")
   def loadSeries(files):
     scalarVolumePlugin = DICOMScalarVolumePluginClass()
     scalarLoadables = scalarVolumePlugin.examineFiles(files)
@@ -191,105 +388,184 @@ class DICOMQIICRXGenerator(DICOMQIICRXMixin):
       slicer.modules.qiicrxsr
     except AttributeError as exc:
       raise (AttributeError("{}\nMake sure to install extension DCMQI".format(exc)))
-    self.tempDir = os.path.join(slicer.app.temporaryPath, "QIICRX", self.currentDateTime)
     self.modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
 
-  def generateReport(self, obj):
+  @Tracer().traced("DICOMQIICRXGenerator.generateReport")
+  def generateReport(self, obj, findings=None, glandVolume=None, flush=True):
     """ Generates a qiicrx DICOM report from an existing studyID and adds resulting series to DICOMDatabase
 
     Args:
       obj: studyID or list of series UIDs that is used as the input for creating a qiicrx DICOM report
+      findings: optional list of Finding instances to be stored with the report. Annotations are saved next to the
+        DICOM database and referenced by file name.
+      glandVolume: optional dictionary describing the gland volume measurement (see ProstateVolume.toDict) to be
+        stored with the report
+      flush: if False, the report is only queued in DICOMIndexingQueue and added to the DICOMDatabase together with
+        other generated files
 
     Todo:
       add option to add predecessor
     """
     if type(obj) is str:
-      seriesUIDs = DICOMQIICRXLoaderPluginClass.getEligibleSeriesForStudy(obj)
-      if not seriesUIDs:
+      context = self.createReportContext(self.db.seriesForStudy(obj)).getEligibleContext()
+      if not len(context):
         raise StudyNotEligibleError
     elif type(obj) in [tuple, list]:
-      seriesUIDs = obj
+      context = self.createReportContext(obj)
     else:
       raise ValueError("Value of type %s is not supported" % type(obj))
 
+    if findings:
+      findings = FindingSerializer.serialize(findings, self.annotationDirectory)
     try:
-      params = self._generateJSON(seriesUIDs)
+      params = self._generateJSON(context, findings, glandVolume)
     except StudyNotEligibleError:
-      logging.error("Series '%s' is not eligible for PIRADS reading" % seriesUIDs)
+      logging.error("Series '%s' is not eligible for PIRADS reading" % context.getSeriesInstanceUIDs())
       return
 
-    outputSRPath = os.path.join(self.tempDir, "sr.dcm")
-    params.update({
-      "outputFileName": outputSRPath
-    })
+    outputSRPath = params["outputFileName"]
+    if not os.path.exists(outputSRPath):
+      logging.debug(params)
+      with Tracer().span("qiicrxsr CLI", mode="write"):
+        cliNode = slicer.cli.run(slicer.modules.qiicrxsr, None, params, wait_for_completion=True)
+
+      if cliNode.GetStatusString() != 'Completed':
+        self._removeIncompleteOutput(outputSRPath)
+        raise Exception("qiicrxsr CLI did not complete cleanly")
+      if findings or glandVolume:
+        try:
+          addFindings(outputSRPath, findings if findings else [], glandVolume)
+        except Exception:
+          self._removeIncompleteOutput(outputSRPath)
+          raise
+    DICOMIndexingQueue().add(outputSRPath)
+    if flush:
+      DICOMIndexingQueue().flush()
+
+  def _generateJSON(self, context, findings=None, glandVolume=None):
+    """ Writes meta data to the workspace entry keyed by its content, the serialized findings (see
+    FindingSerializer.serialize) and the gland volume. If a report was generated from identical meta data, findings and
+    gland volume before, outputFileName already exists.
+    """
+    data, params = generateQIICRXMetadata(context, self._getAcquisitionTypes())
+    metaData = json.dumps(data, indent=2)
+    if findings or glandVolume:
+      key = hashData(metaData + json.dumps([findings, glandVolume], sort_keys=True))
+    else:
+      key = hashData(metaData)
+    directory = self.getWorkspace().getEntry(key)
+    params["metaDataFileName"] = os.path.join(directory, "meta.json")
+    params["outputFileName"] = os.path.join(directory, "sr.dcm")
 
-    logging.debug(params)
-    cliNode = slicer.cli.run(slicer.modules.qiicrxsr, None, params, wait_for_completion=True)
+    if not os.path.exists(params['metaDataFileName']):
+      with open(params['metaDataFileName'], 'w') as outfile:
+        outfile.write(metaData)
 
-    if cliNode.GetStatusString() != 'Completed':
-      raise Exception("qiicrxsr CLI did not complete cleanly")
-    else:
-      indexer = ctk.ctkDICOMIndexer()
-      indexer.addFile(self.db, outputSRPath, "copy")
+    return params
 
-  def _generateJSON(self, seriesUIDs):
-    data = self._getGeneralMetaInformation()
-    data['imageLibrary'] = []
+  @staticmethod
+  def _removeIncompleteOutput(outputSRPath):
+    if os.path.exists(outputSRPath):
+      os.remove(outputSRPath)
 
-    params = {
-      "metaDataFileName": os.path.join(self.tempDir, "meta.json")
-    }
-    acqTypes = self._getAcquisitionTypes()
-    data["compositeContext"], params["compositeContextDataDir"] = self._populateCompositeContext(seriesUIDs)
+  def _getAcquisitionTypes(self):
+    return loadAcquisitionTypes(os.path.join(self.modulePath, 'Resources', 'ProstateMRIAcquisitionTypes.json'))
 
-    seriesDirs = set(os.path.dirname(os.path.abspath(self.db.filesForSeries(series)[0])) for series in seriesUIDs)
-    params["imageLibraryDataDir"] = os.path.commonprefix(list(seriesDirs))
 
-    for series in seriesUIDs:
-      try:
-        data['imageLibrary'].append(self._createImageLibraryEntry(series, acqTypes, params, len(seriesDirs) > 1))
-      except ValueError as exc:
-        print(exc)
+class DICOMQIICRXBatchGenerator(DICOMQIICRXGenerator):
+  """ DICOMQIICRXBatchGenerator generates qiicrx DICOM reports for a list of studies e.g. for pre-creating reports of a
+  worklist
 
-    if not data['imageLibrary']:
-      raise ValueError("No eligible series has been found for PIRADS reading!")
+  DICOM database queries are executed on the main thread. Meta data of all studies is built on a pool of
+  maximumNumberOfWorkers threads and qiicrxsr runs asynchronously for at most maximumNumberOfWorkers studies at a time.
+  All generated reports are added to the DICOM database at once (see DICOMIndexingQueue) after all of them finished.
 
-    if not os.path.exists(self.tempDir):
-      ModuleLogicMixin.createDirectory(self.tempDir)
-    with open(params['metaDataFileName'], 'w') as outfile:
-      json.dump(data, outfile, indent=2)
+  .. code-block:: python
 
-    return params
+    generator = DICOMQIICRXBatchGenerator(maximumNumberOfWorkers=4)
+    reports = generator.generateReports(slicer.dicomDatabase.studiesForPatient(patientID))
+  """
 
-  def _getAcquisitionTypes(self):
-    with open(os.path.join(self.modulePath, 'Resources', 'ProstateMRIAcquisitionTypes.json')) as acqTypeFile:
-      return json.load(acqTypeFile)
-
-  def _populateCompositeContext(self, allSeries):
-    f = self.db.filesForSeries(allSeries[0])[0]
-    return os.path.basename(f), os.path.dirname(os.path.abspath(f))
-
-  def _getGeneralMetaInformation(self):
-    return {
-      "SeriesDescription": "PI-RADS Report",
-      "SeriesNumber": "1001",
-      "InstanceNumber": "1",
-    }
+  POLLING_INTERVAL = 0.05
+  """ Seconds to wait between checks of running qiicrxsr CLIs """
 
-  def _createImageLibraryEntry(self, series, acqTypes, params, organizedInDirectories):
-    data = dict()
-    files = self.db.filesForSeries(series)
-    seriesType = SeriesTypeFactory.getSeriesType(files[0])
-    if not seriesType:
-      raise ValueError("No eligible series type found for series '%s' " %
-                       self.db.fileValue(files[0], self.tags['seriesDescription']))
-    data['piradsSeriesType'] = acqTypes[seriesType.getName()]
-    if organizedInDirectories:
-      commonDirectory = params["imageLibraryDataDir"]
-      data['inputDICOMDirectory'] = os.path.relpath(os.path.dirname(files[0]), commonDirectory)
-    else:
-      data['inputDICOMFiles'] = [os.path.basename(f) for f in files]
-    return data
+  def __init__(self, maximumNumberOfWorkers=None):
+    DICOMQIICRXGenerator.__init__(self)
+    self.maximumNumberOfWorkers = maximumNumberOfWorkers if maximumNumberOfWorkers else \
+      min(4, multiprocessing.cpu_count())
+
+  @Tracer().traced("DICOMQIICRXBatchGenerator.generateReports")
+  def generateReports(self, studyUIDs):
+    """ Generates a qiicrx DICOM report for each eligible study and adds all reports to the DICOMDatabase
+
+    Studies that are not eligible for PI-RADS reading or whose report could not be generated are logged and skipped.
+
+    Args:
+      studyUIDs: list of StudyInstanceUIDs
+
+    Returns:
+      OrderedDict: maps StudyInstanceUID to generated report file or None if no report was generated
+    """
+    reports = OrderedDict((study, None) for study in studyUIDs)
+    contexts = self._createReportContexts(studyUIDs)
+    params = self._generateMetaData(contexts)
+    reports.update(self._runCLIs(params))
+
+    for outputFile in [f for f in reports.values() if f]:
+      DICOMIndexingQueue().add(outputFile)
+    DICOMIndexingQueue().flush()
+    self.getWorkspace().evict()
+    return reports
+
+  def _createReportContexts(self, studyUIDs):
+    contexts = OrderedDict()
+    for study in studyUIDs:
+      context = self.createReportContext(self.db.seriesForStudy(study)).getEligibleContext()
+      if not len(context):
+        logging.warning("Study '%s' is not eligible for PIRADS reading" % study)
+        continue
+      contexts[study] = context
+    return contexts
+
+  def _generateMetaData(self, contexts):
+    self._getAcquisitionTypes()
+    self.getWorkspace()
+    params = OrderedDict()
+    with ThreadPoolExecutor(max_workers=self.maximumNumberOfWorkers) as executor:
+      futures = OrderedDict((study, executor.submit(self._generateJSON, context))
+                            for study, context in contexts.items())
+      for study, future in futures.items():
+        try:
+          params[study] = future.result()
+        except Exception as exc:
+          logging.error("Meta data generation for study '%s' failed: %s" % (study, exc))
+    return params
+
+  def _runCLIs(self, params):
+    reports = OrderedDict((study, p["outputFileName"]) for study, p in params.items()
+                          if os.path.exists(p["outputFileName"]))
+    queue = [(study, p) for study, p in params.items() if study not in reports]
+    running = []
+    with Tracer().span("qiicrxsr CLI", mode="write", numberOfStudies=len(queue)):
+      while queue or running:
+        while queue and len(running) < self.maximumNumberOfWorkers:
+          study, studyParams = queue.pop(0)
+          logging.debug(studyParams)
+          running.append((study, studyParams, slicer.cli.run(slicer.modules.qiicrxsr, None, studyParams,
+                                                             wait_for_completion=False)))
+        slicer.app.processEvents()
+        for entry in [e for e in running if not e[2].IsBusy()]:
+          study, studyParams, cliNode = entry
+          running.remove(entry)
+          if cliNode.GetStatusString() == 'Completed':
+            reports[study] = studyParams["outputFileName"]
+          else:
+            self._removeIncompleteOutput(studyParams["outputFileName"])
+            logging.error("qiicrxsr CLI did not complete cleanly for study '%s'" % study)
+          slicer.mrmlScene.RemoveNode(cliNode)
+        if running:
+          time.sleep(self.POLLING_INTERVAL)
+    return reports
 
 
 class DICOMQIICRXLoaderPlugin:
@@ -7,63 +7,38 @@ import logging
 from slicer.ScriptedLoadableModule import ScriptedLoadableModule, ScriptedLoadableModuleWidget, ScriptedLoadableModuleLogic
 from collections import OrderedDict
 
-from SlicerDevelopmentToolboxUtils.mixins import UICreationHelpers, GeneralModuleMixin, ModuleWidgetMixin
-from SlicerDevelopmentToolboxUtils.icons import Icons
-from SlicerDevelopmentToolboxUtils.buttons import ModuleSettingsButton, CrosshairButton
-from SlicerDevelopmentToolboxUtils.helpers import WatchBoxAttribute
-from SlicerDevelopmentToolboxUtils.widgets import DICOMBasedInformationWatchBox
-from SlicerDevelopmentToolboxUtils.constants import DICOMTAGS
-
-from SlicerPIRADSLogic.Configuration import SlicerPIRADSConfiguration
-from SlicerPIRADSLogic.HangingProtocol import HangingProtocolFactory
-from SlicerPIRADSLogic.HTMLReportCreator import HTMLReportCreator
-from SlicerPIRADSLogic.SeriesType import VolumeSeriesTypeSceneObserver
-from SlicerPIRADSWidgets.AssessmentWidget import AssessmentWidget
-from SlicerPIRADSWidgets.DataSelectionDialog import DataSelectionDialog
-from SlicerPIRADSWidgets.FindingsWidget import FindingsWidget
-from SlicerPIRADSWidgets.ProstateWidget import ProstateWidget
-
-from SlicerLayoutButtons import SlicerLayoutButtonsWidget
-
-from qSlicerMultiVolumeExplorerModuleWidget import qSlicerMultiVolumeExplorerSimplifiedModuleWidget
-
-
-class SlicerPIRADSMultiVolumeExplorer(qSlicerMultiVolumeExplorerSimplifiedModuleWidget):
-
-  def getCurrentSeriesNumber(self):
-    import string
-    ref = -1
-    if self._bgMultiVolumeNode:
-      name = self._bgMultiVolumeNode.GetName()
-      ref = string.split(name,':')[0]
-    return ref
-
-  def showInputMultiVolumeSelector(self, show):
-    if show:
-      self._bgMultiVolumeSelectorLabel.show()
-      self.bgMultiVolumeSelector.show()
-    else:
-      self._bgMultiVolumeSelectorLabel.hide()
-      self.bgMultiVolumeSelector.hide()
-
-  def setMultiVolume(self, node):
-    self.bgMultiVolumeSelector.setCurrentNode(node)
-
-  def createChart(self, sliceWidget, position):
-    self._multiVolumeIntensityChart.createChart(sliceWidget, position, ignoreCurrentBackground=True)
-
-  def refreshGUIForNewBackgroundImage(self):
-    self._multiVolumeIntensityChart.reset()
-    self.setFramesEnabled(True)
-    self.refreshFrameSlider()
-    self._multiVolumeIntensityChart.bgMultiVolumeNode = self._bgMultiVolumeNode
-
-  def onBackgroundInputChanged(self, node):
-    qSlicerMultiVolumeExplorerSimplifiedModuleWidget.onBackgroundInputChanged(self)
-    self.popupChartButton.setEnabled(self._bgMultiVolumeNode is not None)
-
-  def onSliderChanged(self, frameId):
-    return
+from SlicerPIRADSLogic.StartupProfile import StartupProfile
+
+_startupProfile = StartupProfile()
+
+with _startupProfile.stage("import SlicerDevelopmentToolboxUtils"):
+  from SlicerDevelopmentToolboxUtils.mixins import UICreationHelpers, GeneralModuleMixin, ModuleWidgetMixin, \
+    ModuleLogicMixin
+  from SlicerDevelopmentToolboxUtils.icons import Icons
+  from SlicerDevelopmentToolboxUtils.buttons import ModuleSettingsButton, CrosshairButton
+  from SlicerDevelopmentToolboxUtils.helpers import WatchBoxAttribute
+  from SlicerDevelopmentToolboxUtils.widgets import DICOMBasedInformationWatchBox
+  from SlicerDevelopmentToolboxUtils.constants import DICOMTAGS
+
+with _startupProfile.stage("import SlicerPIRADSLogic"):
+  from SlicerPIRADSLogic.Annotation import AnnotationFactory
+  from SlicerPIRADSLogic.Configuration import SlicerPIRADSConfiguration
+  from SlicerPIRADSLogic.FindingSerializer import FindingSerializer
+  from SlicerPIRADSLogic.HangingProtocol import HangingProtocolFactory, getAdaptiveLayout, getViewNames, \
+    MAXIMUM_NUMBER_OF_VIEWS
+  from SlicerPIRADSLogic.HTMLReportCreator import HTMLReportCreator
+  from SlicerPIRADSLogic.ProstateMeasurement import findPSAValue
+  from SlicerPIRADSLogic.SeriesType import VolumeSeriesTypeSceneObserver, getMultiVolumeBValues
+  from SlicerPIRADSCore.SeriesType import DERIVED_FROM_ATTRIBUTE, HIGH_B_VALUE_THRESHOLD
+  from SlicerPIRADSLogic.Tracing import Tracer, SCENE_NODES_ADDED
+
+with _startupProfile.stage("import SlicerPIRADSWidgets"):
+  from SlicerPIRADSWidgets.AssessmentWidget import AssessmentWidget
+  from SlicerPIRADSWidgets.FindingsWidget import FindingsWidget
+  from SlicerPIRADSWidgets.ProstateWidget import ProstateWidget
+  from SlicerPIRADSWidgets.UIRegistry import UIRegistry
+
+_startupProfile.markMilestone("SlicerPIRADS imported")
 
 
 class SlicerPIRADS(ScriptedLoadableModule):
@@ -104,8 +79,12 @@ class SlicerPIRADSWidget(ScriptedLoadableModuleWidget, GeneralModuleMixin):
   def __init__(self, parent=None):
     ScriptedLoadableModuleWidget.__init__(self, parent)
     VolumeSeriesTypeSceneObserver().refresh() # is a singleton and observes the mrmlScene
-    self.modulePath = os.path.dirname(slicer.util.modulePath(self.moduleName))
-    SlicerPIRADSConfiguration(self.moduleName, os.path.join(self.modulePath, 'Resources', "default.cfg"))
+    self.modulePath = UIRegistry().modulePath
+    SlicerPIRADSConfiguration(self.moduleName, UIRegistry().getResourcePath("default.cfg"))
+    AnnotationFactory.setSharedSegmentationEnabled(
+      str(self.getSetting("Shared_Segmentation_Per_Series")).lower() == "true")
+    Tracer().enabled = str(self.getSetting("Tracing_Enabled")).lower() == "true"
+    self._sceneNodeAddedObserver = None
     self._loadedVolumeNodes = OrderedDict()
     self.logic = SlicerPIRADSModuleLogic()
 
@@ -120,6 +99,7 @@ class SlicerPIRADSWidget(ScriptedLoadableModuleWidget, GeneralModuleMixin):
     self._studyAssessmentWidget.enabled = len(self._loadedVolumeNodes) > 0
     self._prostateMeasurementsWidget.enabled = len(self._loadedVolumeNodes) > 0
     self._findingsWidget.enabled = len(self._loadedVolumeNodes) > 0
+    self._saveReportButton.enabled = len(self._loadedVolumeNodes) > 0
     self._collapsibleMultiVolumeButton.visible = False
     self._checkForMultiVolumes()
 
@@ -134,17 +114,25 @@ class SlicerPIRADSWidget(ScriptedLoadableModuleWidget, GeneralModuleMixin):
     # TODO: following line is only for the purpose of testing
     self._loadedVolumeNodes = OrderedDict({volume.GetID: volume for volume
                                            in slicer.util.getNodesByClass('vtkMRMLScalarVolumeNode')})
+    profile = StartupProfile()
     ScriptedLoadableModuleWidget.setup(self)
-    self._setupPatientWatchBox()
-    self._setupViewSettingGroupBox()
-    self._setupCollapsibleLayoutButton()
-    self._patientAssessmentWidget = AssessmentWidget(forms=self.getSetting("Patient_Assessment_Forms"),
-                                                   title="Patient Level Assessment")
-    self._studyAssessmentWidget = AssessmentWidget(forms=self.getSetting("Study_Assessment_Forms"),
-                                                   title="Study Level Assessment")
-    self._prostateMeasurementsWidget = ProstateWidget()
-
-    self._findingsWidget = FindingsWidget(maximumNumber=4)
+    with profile.stage("setup: load UI files"):
+      UIRegistry().preload()
+    with profile.stage("setup: patient information"):
+      self._setupPatientWatchBox()
+      self._setupViewSettingGroupBox()
+    with profile.stage("setup: layout buttons"):
+      self._setupCollapsibleLayoutButton()
+    with profile.stage("setup: assessment forms"):
+      self._patientAssessmentWidget = AssessmentWidget(forms=self.getSetting("Patient_Assessment_Forms"),
+                                                       title="Patient Level Assessment")
+      self._studyAssessmentWidget = AssessmentWidget(forms=self.getSetting("Study_Assessment_Forms"),
+                                                     title="Study Level Assessment")
+    with profile.stage("setup: prostate measurements"):
+      self._prostateMeasurementsWidget = ProstateWidget()
+    with profile.stage("setup: findings"):
+      self._findingsWidget = FindingsWidget(maximumNumber=4)
+    self._saveReportButton = UICreationHelpers.createButton("Save Report")
     self._exportToHTMLButton = UICreationHelpers.createButton("Export to HTML")
     self.layout.addWidget(self._collapsibleLayoutButton)
     self._setupCollapsibleMultiVolumeExplorerButton()
@@ -153,7 +141,7 @@ class SlicerPIRADSWidget(ScriptedLoadableModuleWidget, GeneralModuleMixin):
     self.layout.addWidget(self._studyAssessmentWidget)
     self.layout.addWidget(self._prostateMeasurementsWidget)
     self.layout.addWidget(self._findingsWidget)
-    self.layout.addWidget(self._exportToHTMLButton)
+    self.layout.addWidget(UICreationHelpers.createHLayout([self._saveReportButton, self._exportToHTMLButton]))
     self._stepButtonGroup = qt.QButtonGroup()
     self._stepButtonGroup.addButton(self._patientAssessmentWidget, 1)
     self._stepButtonGroup.addButton(self._studyAssessmentWidget, 2)
@@ -162,6 +150,8 @@ class SlicerPIRADSWidget(ScriptedLoadableModuleWidget, GeneralModuleMixin):
     self.layout.addStretch(1)
     self._setupConnections()
     self.updateGUIFromData()
+    profile.markMilestone("SlicerPIRADS setup finished")
+    profile.logReport()
 
   def _setupPatientWatchBox(self):
     WatchBoxAttribute.TRUNCATE_LENGTH = 20
@@ -179,15 +169,29 @@ class SlicerPIRADSWidget(ScriptedLoadableModuleWidget, GeneralModuleMixin):
     self._loadDataButton.setIcon(Icons.open)
     self._crosshairButton = CrosshairButton()
     self._settingsButton = ModuleSettingsButton(self.moduleName)
-    self._settingsButton.enabled = False
+    self._settingsButton.enabled = Tracer().enabled
+    if Tracer().enabled:
+      self._settingsButton.setToolTip("Right click for exporting timing information")
+      self._settingsButton.setContextMenuPolicy(qt.Qt.CustomContextMenu)
     self.layout.addWidget(UICreationHelpers.createHLayout([self._loadDataButton, self._crosshairButton,
                                                            self._settingsButton]))
 
   def _setupCollapsibleLayoutButton(self):
     self._collapsibleLayoutButton = ctk.ctkCollapsibleButton()
     self._collapsibleLayoutButton.text = "Layout"
-    self._collapsibleLayoutButton.collapsed = 0
+    self._collapsibleLayoutButton.collapsed = True
     self._collapsibleLayoutButton.setLayout(qt.QVBoxLayout())
+    # SlicerLayoutButtons is only imported and set up when the button gets expanded for the first time
+    self._layoutButtonsWidget = None
+    self._collapsibleLayoutButton.contentsCollapsed.connect(self._onLayoutButtonCollapsed)
+
+  def _onLayoutButtonCollapsed(self, collapsed):
+    if not collapsed and not self._layoutButtonsWidget:
+      self._setupLayoutButtonsWidget()
+
+  def _setupLayoutButtonsWidget(self):
+    with StartupProfile().stage("import SlicerLayoutButtons"):
+      from SlicerLayoutButtons import SlicerLayoutButtonsWidget
     self._layoutButtonsWidget = SlicerLayoutButtonsWidget(parent=self._collapsibleLayoutButton)
     self._layoutButtonsWidget.setup()
     self._layoutButtonsWidget.hideReloadAndTestArea()
@@ -195,13 +199,61 @@ class SlicerPIRADSWidget(ScriptedLoadableModuleWidget, GeneralModuleMixin):
 
   def _setupConnections(self):
     self._loadDataButton.clicked.connect(self._onLoadButtonClicked)
+    self._saveReportButton.clicked.connect(self._onSaveReportButtonClicked)
     self._exportToHTMLButton.clicked.connect(self._onExportToHTMLButtonClicked)
-
-    self._multiVolumeExplorer.frameSlider.connect('valueChanged(double)', self.onSliderChanged)
+    if Tracer().enabled:
+      self._settingsButton.customContextMenuRequested.connect(self._onSettingsButtonRightClicked)
+      self._sceneNodeAddedObserver = slicer.mrmlScene.AddObserver(slicer.mrmlScene.NodeAddedEvent,
+                                                                  self._onSceneNodeAdded)
+
+  def cleanup(self):
+    if self._sceneNodeAddedObserver:
+      slicer.mrmlScene.RemoveObserver(self._sceneNodeAddedObserver)
+      self._sceneNodeAddedObserver = None
+
+  def _onSceneNodeAdded(self, caller, event):
+    Tracer().count(SCENE_NODES_ADDED)
+
+  def _onSettingsButtonRightClicked(self, point):
+    self._tracingMenu = qt.QMenu()
+    self._tracingMenu.addAction("Export Timing as Chrome Trace...").triggered.connect(
+      lambda: self._exportTiming("Chrome Trace (*.json)", Tracer().exportChromeTrace))
+    self._tracingMenu.addAction("Export Timing as CSV...").triggered.connect(
+      lambda: self._exportTiming("CSV (*.csv)", Tracer().exportCSV))
+    self._tracingMenu.addSeparator()
+    self._tracingMenu.addAction("Reset Timing").triggered.connect(lambda: Tracer().reset())
+    self._tracingMenu.popup(self._settingsButton.mapToGlobal(point))
+
+  def _exportTiming(self, fileFilter, exportFunction):
+    fileName = qt.QFileDialog.getSaveFileName(self.parent.window(), "Export Timing", "", fileFilter)
+    if not fileName:
+      return
+    try:
+      exportFunction(fileName)
+    except (IOError, OSError) as exc:
+      logging.error(exc)
+      slicer.util.errorDisplay("Exporting timing failed: {}".format(exc))
 
   def _onExportToHTMLButtonClicked(self):
-    creator = HTMLReportCreator(self._findingsWidget.getAssessmentCalculator())
-    creator.generateReport()
+    with Tracer().span("export HTML report"):
+      self._findingsWidget.updateMeasurements()
+      creator = HTMLReportCreator(self._findingsWidget.getAssessmentCalculator(),
+                                  prostateVolume=self._prostateMeasurementsWidget.getProstateVolume(),
+                                  psa=findPSAValue(self._patientAssessmentWidget.getData()))
+      creator.generateReport()
+
+  def _onSaveReportButtonClicked(self):
+    prostateVolume = self._prostateMeasurementsWidget.getProstateVolume()
+    if not prostateVolume:
+      slicer.util.errorDisplay("The gland volume is required on every report. Please measure it before saving.")
+      return
+    try:
+      with Tracer().span("save report"):
+        self.logic.saveReport(self._loadedVolumeNodes.values(), self._findingsWidget.getFindings(), prostateVolume,
+                              psa=findPSAValue(self._patientAssessmentWidget.getData()))
+    except Exception as exc:
+      logging.error(exc)
+      slicer.util.errorDisplay("Saving report failed: {}".format(exc))
 
   def _setupCollapsibleMultiVolumeExplorerButton(self):
     self._collapsibleMultiVolumeButton = ctk.ctkCollapsibleButton()
@@ -209,8 +261,17 @@ class SlicerPIRADSWidget(ScriptedLoadableModuleWidget, GeneralModuleMixin):
     self._collapsibleMultiVolumeButton.collapsed = True
     self._collapsibleMultiVolumeButton.visible = False
     self._collapsibleMultiVolumeButton.setLayout(qt.QFormLayout())
-    self._multiVolumeExplorer = SlicerPIRADSMultiVolumeExplorer(self._collapsibleMultiVolumeButton.layout())
-    self._multiVolumeExplorer.setup()
+    self._multiVolumeExplorer = None
+
+  def _getOrCreateMultiVolumeExplorer(self):
+    """ MultiVolumeExplorer is only imported and built once the first multivolume was loaded """
+    if not self._multiVolumeExplorer:
+      with StartupProfile().stage("setup: MultiVolumeExplorer"):
+        from SlicerPIRADSWidgets.MultiVolumeExplorer import SlicerPIRADSMultiVolumeExplorer
+        self._multiVolumeExplorer = SlicerPIRADSMultiVolumeExplorer(self._collapsibleMultiVolumeButton.layout())
+        self._multiVolumeExplorer.setup()
+        self._multiVolumeExplorer.frameSlider.connect('valueChanged(double)', self.onSliderChanged)
+    return self._multiVolumeExplorer
 
   def onSliderChanged(self, newValue):
     newValue = int(newValue)
@@ -218,23 +279,34 @@ class SlicerPIRADSWidget(ScriptedLoadableModuleWidget, GeneralModuleMixin):
     multiVolumeNode.GetDisplayNode().SetFrameComponent(newValue)
 
   def _onLoadButtonClicked(self):
+    with StartupProfile().stage("import DICOM plugins"):
+      from SlicerPIRADSWidgets.DataSelectionDialog import DataSelectionDialog
     self._dataSelectionDialog = DataSelectionDialog()
     self._loadedVolumeNodes = OrderedDict()
 
     nodeAddedObserver = slicer.mrmlScene.AddObserver(slicer.mrmlScene.NodeAddedEvent, self._onVolumeNodeAdded)
     nodeRemovedObserver = slicer.mrmlScene.AddObserver(slicer.mrmlScene.NodeRemovedEvent, self._onVolumeNodeRemoved)
     try:
-      if self._dataSelectionDialog.exec_():
+      with Tracer().span("data selection dialog"):
+        accepted = self._dataSelectionDialog.exec_()
+      if accepted:
+        self._addDerivedDiffusionVolumes()
         self._hangingProtocol = HangingProtocolFactory.getHangingProtocol(self.loadedVolumeNodes.values())
         if not self._hangingProtocol:
           raise RuntimeError("No eligible hanging protocol found.")
         background = list(self._loadedVolumeNodes.values())[0]
-        self.logic.viewerPerVolume(volumeNodes=self._loadedVolumeNodes.values(), layout=self._hangingProtocol.LAYOUT,
-                                   background=background)
+        numberOfViews = min(len(self._loadedVolumeNodes), MAXIMUM_NUMBER_OF_VIEWS)
+        self.logic.viewerPerVolume(volumeNodes=self._loadedVolumeNodes.values(),
+                                   layout=getAdaptiveLayout(numberOfViews), background=background,
+                                   viewNames=getViewNames(numberOfViews))
         ModuleWidgetMixin.linkAllSliceWidgets(1)
         for sliceWidget in ModuleWidgetMixin.getAllVisibleWidgets():
           sliceWidget.mrmlSliceNode().RotateToVolumePlane(background)
         self._checkForMultiVolumes()
+        self._findingsWidget.setFindings(self._dataSelectionDialog.getLoadedFindings())
+        self._prostateMeasurementsWidget.setReportedProstateVolume(self._dataSelectionDialog.getLoadedProstateVolume())
+        if StartupProfile().markMilestone("first study loaded"):
+          StartupProfile().logReport()
     except Exception as exc:
       logging.error(exc)
     finally:
@@ -242,9 +314,40 @@ class SlicerPIRADSWidget(ScriptedLoadableModuleWidget, GeneralModuleMixin):
       slicer.mrmlScene.RemoveObserver(nodeRemovedObserver)
       self.updateGUIFromData()
 
+  def _addDerivedDiffusionVolumes(self):
+    """ Adds ADC map and high b-value image from multi b-value DWI if the loaded study has none
+
+    An acquired frame with b-value >= HIGH_B_VALUE_THRESHOLD is preferred over a computed high b-value image.
+    """
+    if str(self.getSetting("Compute_Diffusion_Maps")).lower() != "true":
+      return
+    loadedSeriesTypes = set(seriesType.getName() for volume, seriesType
+                            in VolumeSeriesTypeSceneObserver().volumeSeriesTypes.items()
+                            if volume in self._loadedVolumeNodes.values())
+    missing = [name for name in ["ADC", "DWIb"] if name not in loadedSeriesTypes]
+    if not missing:
+      return
+    from SlicerPIRADSLogic.DerivedDiffusionVolumes import DerivedDiffusionVolumes
+    for volume in list(self._loadedVolumeNodes.values()):
+      if volume.IsA('vtkMRMLMultiVolumeNode') and DerivedDiffusionVolumes.canCompute(volume):
+        highBValues = [b for b in getMultiVolumeBValues(volume) if b >= HIGH_B_VALUE_THRESHOLD]
+        try:
+          if "DWIb" in missing and highBValues:
+            DerivedDiffusionVolumes().getBValueVolume(volume, max(highBValues))
+            missing.remove("DWIb")
+          if missing:
+            DerivedDiffusionVolumes().getDerivedVolumes(volume, seriesTypeNames=missing,
+                                                        highBValue=float(self.getSetting("High_B_Value")))
+        except (ValueError, MemoryError) as exc:
+          logging.error("Computing %s from '%s' failed: %s" % (missing, volume.GetName(), exc))
+        return
+
   def _checkForMultiVolumes(self):
     multiVolumes = slicer.util.getNodesByClass('vtkMRMLMultiVolumeNode')
-    self._multiVolumeExplorer.showInputMultiVolumeSelector(len(multiVolumes) > 1)
+    if not multiVolumes and not self._multiVolumeExplorer:
+      self._showMultiVolumeExplorer(False)
+      return
+    self._getOrCreateMultiVolumeExplorer().showInputMultiVolumeSelector(len(multiVolumes) > 1)
     multiVolume = None
     if len(multiVolumes) == 1:
       multiVolume = multiVolumes[0]
@@ -279,26 +382,55 @@ class SlicerPIRADSModuleLogic(ScriptedLoadableModuleLogic):
   def __init__(self):
     ScriptedLoadableModuleLogic.__init__(self)
 
+  @staticmethod
+  def saveReport(volumeNodes, findings, prostateVolume, psa=None):
+    """ Generates a qiicrx report for the series of volumeNodes including findings, gland volume and PSA density and adds
+    it to the DICOM database
+    """
+    if not prostateVolume:
+      raise ValueError("The gland volume has not been measured")
+    from DICOMQIICRXLoaderPlugin import DICOMQIICRXGenerator
+    seriesUIDs = []
+    for volume in volumeNodes:
+      if volume.GetAttribute(DERIVED_FROM_ATTRIBUTE):
+        continue
+      seriesUID = ModuleLogicMixin.getDICOMValue(volume, FindingSerializer.SERIES_INSTANCE_UID)
+      if seriesUID and seriesUID not in seriesUIDs:
+        seriesUIDs.append(seriesUID)
+    if not seriesUIDs:
+      raise ValueError("None of the loaded volumes has been loaded from DICOM")
+    DICOMQIICRXGenerator().generateReport(seriesUIDs, findings=findings, glandVolume=prostateVolume.toDict(psa))
+
   @classmethod
-  def viewerPerVolume(cls, volumeNodes, layout, background, opacity=1.0):
+  @Tracer().traced("viewerPerVolume")
+  def viewerPerVolume(cls, volumeNodes, layout, background, opacity=1.0, viewNames=None):
     """ Load each volume in the scene into its own slice viewer and link them all together.
     If background is specified, put it in the background of all viewers and make the other volumes be the foreground.
     If label is specified, make it active as the label layer of all viewers. Return a map of slice nodes indexed by
     the view name (given or generated). Opacity applies only when background is selected.
+    If viewNames are given, volumes are shown in the slice views of that name. Otherwise all visible slice views are
+    used. Volumes exceeding the number of available slice views are not shown.
     """
 
     if not volumeNodes:
       raise ValueError("VolumeNodes are supposed to be non empty")
 
     layoutManager = slicer.app.layoutManager()
-    layoutManager.setLayout(layout)
+    if layoutManager.layout != layout:
+      layoutManager.setLayout(layout)
+      slicer.app.processEvents()
 
-    sliceWidgets = list(ModuleWidgetMixin.getAllVisibleWidgets())
+    if viewNames:
+      sliceWidgets = [w for w in (layoutManager.sliceWidget(name) for name in viewNames) if w]
+    else:
+      sliceWidgets = list(ModuleWidgetMixin.getAllVisibleWidgets())
 
-    slicer.app.processEvents()
+    volumeNodes = list(volumeNodes)
+    if len(volumeNodes) > len(sliceWidgets):
+      logging.warning("Layout provides %d slice views for %d volumes. Volumes %s are not shown."
+                      % (len(sliceWidgets), len(volumeNodes), [v.GetName() for v in volumeNodes[len(sliceWidgets):]]))
 
-    for index, volume in enumerate(volumeNodes):
-      sliceWidget = sliceWidgets[index]
+    for volume, sliceWidget in zip(volumeNodes, sliceWidgets):
       volumeNodeID = volume.GetID()
 
       compositeNode = sliceWidget.mrmlSliceCompositeNode()
@@ -400,223 +532,3 @@ class SlicerPIRADSSlicelet(qt.QWidget):
 
 if __name__ == "SlicerPIRADSSlicelet":
   slicelet = SlicerPIRADSSlicelet()
-
-
-import ctk
-import os
-import slicer
-import qt
-from random import random
-from SlicerDevelopmentToolboxUtils.events import SlicerDevelopmentToolboxEvents as events
-
-from SlicerDevelopmentToolboxUtils.mixins import ParameterNodeObservationMixin, GeneralModuleMixin
-
-from SlicerPIRADSLogic.Annotation import Ruler
-from SlicerPIRADSLogic.Finding import Finding
-from SlicerPIRADSLogic.SeriesType import *
-
-
-class ProstateWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
-
-  LINEAR_MEASUREMENT = "Linear Measurement"
-  VOLUMETRIC_MEASUREMENT= "Volumetric Measurement"
-
-  StartedEvent = events.StartedEvent
-  FinishedEvent = events.FinishedEvent
-  CanceledEvent = events.CanceledEvent
-
-  def __init__(self, parent=None):
-    ctk.ctkCollapsibleButton.__init__(self, parent)
-    self.text = "Prostate Gland Measurements"
-    self.modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
-    self.setup()
-
-  def setup(self):
-    self.setLayout(qt.QGridLayout())
-    self._loadUI()
-    self.layout().addWidget(self.ui)
-    self._setupConnections()
-
-  def _loadUI(self):
-    path = os.path.join(self.modulePath, 'Resources', 'UI', 'ProstateWidget.ui')
-    self.ui = slicer.util.loadUI(path)
-    self._addMeasurementsButton = self.ui.findChild(qt.QPushButton, "addMeasurementButton")
-    self._addMenu(self._addMeasurementsButton)
-    self._measurementsListWidget = self.ui.findChild(qt.QListWidget, "listWidget")
-    self._updateButtons()
-
-  def _addMenu(self, button):
-    menu = qt.QMenu(button)
-    menu.name = button.name
-    button.setMenu(menu)
-
-    actionGroup = qt.QActionGroup(menu)
-    actionGroup.setExclusive(False)
-
-    for name, enabled in [(self.LINEAR_MEASUREMENT, True), (self.VOLUMETRIC_MEASUREMENT, False)]:
-      action = qt.QAction(name, actionGroup)
-      action.setEnabled(enabled)
-      menu.addAction(action)
-      actionGroup.addAction(action)
-      action.triggered.connect(lambda triggered, a=action: self._onActionTriggered(a))
-
-  def _onActionTriggered(self, action):
-    action.setEnabled(False)
-
-    if action.text == self.LINEAR_MEASUREMENT:
-      logging.debug("Starting creation of linear measurement for prostate in ax, sag, and cor orientations")
-      measurementCreator = LinearMeasurementCreator()
-      measurementCreator.start()
-      measurements = measurementCreator.getMeasurements()
-    elif action.text == self.VOLUMETRIC_MEASUREMENT:
-      print("create volumetric measurement")
-
-    # TODO: disable UI and add buttons to cancel current action
-
-    # Depending on type
-    # finding = Finding("Finding %s" % random.randint(0, 10))
-    # self._findingsListModel.addFinding(finding)
-    # self._measurementsListWidget.selectionModel().clear()
-    # model = self._measurementsListWidget.model()
-    # self._measurementsListWidget.selectionModel().setCurrentIndex(model.index(model.rowCount() - 1, 0),
-    #                                                               qt.QItemSelectionModel.Select)
-    # self._updateButtons()
-
-  def _setupConnections(self):
-    def setupConnections(funcName="connect"):
-      getattr(self._measurementsListWidget, funcName)("customContextMenuRequested(QPoint)", self._onMeasurementItemRightClicked)
-      getattr(self._measurementsListWidget.selectionModel(), funcName)("currentRowChanged(QModelIndex, QModelIndex)",
-                                                                       self._onFindingSelectionChanged)
-
-    setupConnections()
-    slicer.app.connect('aboutToQuit()', self.deleteLater)
-    self.destroyed.connect(lambda : setupConnections(funcName="disconnect"))
-
-  def _onMeasurementItemRightClicked(self, point):
-    if not self._measurementsListWidget.currentIndex() or not self._measurementsListWidget.model().rowCount():
-      return
-    self.listMenu = qt.QMenu()
-    menu_item = self.listMenu.addAction("Remove Item")
-    menu_item.triggered.connect(self._onRemoveFindingRequested)
-    parentPosition = self._measurementsListWidget.mapToGlobal(qt.QPoint(0, 0))
-    self.listMenu.move(parentPosition + point)
-    self.listMenu.show()
-
-  def _onRemoveFindingRequested(self):
-    currentIndex = self._measurementsListWidget.currentIndex()
-    finding = self._findingsListModel.getFindings()[currentIndex.row()]
-    if slicer.util.confirmYesNoDisplay("Finding '{}' is about to be deleted. "
-                                       "Do you want to proceed?".format(finding.getName())):
-      self._findingsListModel.removeFinding(finding)
-      self._deleteFindingInformationWidget()
-      self._updateButtons()
-
-  def _onFindingSelectionChanged(self, current, previous):
-    self._deleteFindingInformationWidget()
-
-    row = current.row()
-    if row >= 0:
-      finding =  self._findingsListModel.getFindings()[row]
-      # TODO: jump to centroid of lesion
-
-    self._updateButtons()
-
-  def _onAddMeasurementButtonClicked(self):
-    # TODO: findings assessment
-    # TODO: add segmentation and enable editor
-    listWidgetItem = qt.QListWidgetItem(self._measurementsListWidget)
-    self._measurementsListWidget.addItem(listWidgetItem)
-    findingsItemWidget = ProstateMeasurementItemWidget()
-    listWidgetItem.setSizeHint(findingsItemWidget.sizeHint)
-    self._findingsListWidget.setItemWidget(listWidgetItem, findingsItemWidget)
-
-    self._findingsListWidget.selectionModel().clear()
-    model = self._findingsListWidget.model()
-    self._findingsListWidget.selectionModel().setCurrentIndex(model.index(model.rowCount()-1, 0),
-                                                              qt.QItemSelectionModel.Select)
-
-    self.updateButtons()
-
-  def _updateButtons(self):
-    pass
-    # self._addMeasurementsButton.setEnabled(self._findingsListModel.rowCount() < self._maximumFindingCount)
-
-
-class LinearMeasurementCreator(ParameterNodeObservationMixin):
-
-  ORIENTATIONS = ["Axial", "Sagittal", "Coronal"]
-  DEFAULT_SERIES_TYPES = {"Axial": T2a, "Sagittal": T2s, "Coronal": T2c}
-  ALTERNATIVE_SERIES_TYPE = T2a
-
-  StartedEvent = events.StartedEvent
-  FinishedEvent = events.FinishedEvent
-  DataChangedEvent = events.DataChangedEvent
-
-  def __init__(self):
-    self._measurements = {orientation: None for orientation in self.ORIENTATIONS}
-
-  def reset(self):
-    for orientation, measurement in self._measurements.items():
-      if measurement:
-        slicer.mrmlScene.RemoveNode(measurement)
-        self._measurements[orientation] = None
-
-  def start(self, caller=None, event=None):
-    # decide which seriesType to use and which orientation
-    self.invokeEvent(self.StartedEvent)
-    self._start()
-
-  def _start(self, caller=None, event=None):
-    for orientation in self.ORIENTATIONS:
-      if not self._measurements[orientation]:
-        seriesTypeClass = self.DEFAULT_SERIES_TYPES[orientation]
-        volumeNode = None
-        for volume, seriesType in VolumeSeriesTypeSceneObserver().volumeSeriesTypes.items():
-          if isinstance(seriesType, seriesTypeClass):
-            volumeNode = volume
-            break
-        if not volumeNode:
-          logging.error("Volume with series type %s for %s measurement not found" % (seriesTypeClass.getName(),
-                                                                                     orientation.lower()))
-        else:
-          # TODO: set orientations!
-          # TODO: enable only the viewer to create annotation in
-          # TODO: find volume node to use for annotating
-          ruler = Ruler(volumeNode)
-          self._measurements[orientation] = ruler
-          ruler.addEventObserver(ruler.AnnotationFinishedEvent, self._start)
-          break
-
-    if all(value is not None for value in self._measurements.values()):
-      self.invokeEvent(self.FinishedEvent)
-
-  def getMeasurements(self):
-    return self._measurements
-
-
-class ProstateMeasurementItemWidget(qt.QWidget):
-
-  def __init__(self):
-    super(ProstateMeasurementItemWidget, self).__init__()
-    self.modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
-    self.setup()
-    self._processData()
-
-  def setup(self):
-    self.setLayout(qt.QGridLayout())
-    path = os.path.join(self.modulePath, 'Resources', 'UI', 'ProstateMeasurementItemWidget.ui')
-    self.ui = slicer.util.loadUI(path)
-
-    self._measurementIconLabel = self.ui.findChild(qt.QLabel, "measurementTypeLabel")
-    self._measurementLabel = self.ui.findChild(qt.QLabel, "measurementLabel")
-
-    self.layout().addWidget(self.ui)
-
-  def _processData(self):
-    return
-    icon = self._finding.getIcon()
-    # self._measurementTypeLabel.setPixmap(icon.pixmap(qt.QSize(32, 32)))
-    #
-    # self._findingNameLabel.text = self._finding.getName()
-    # self._locationLabel.text = self._finding.getLocation()
-    # self._measurementLabel.text = str(self._finding.getMeasurementValue())
\ No newline at end of file
@@ -0,0 +1,36 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+  """ Thread safe mapping holding at most maximumSize items. The least recently used item gets dropped first. """
+
+  def __init__(self, maximumSize):
+    self.maximumSize = maximumSize
+    self._items = OrderedDict()
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    return len(self._items)
+
+  def __contains__(self, key):
+    return key in self._items
+
+  def get(self, key, default=None):
+    with self._lock:
+      try:
+        self._items.move_to_end(key)
+        return self._items[key]
+      except KeyError:
+        return default
+
+  def put(self, key, value):
+    with self._lock:
+      self._items[key] = value
+      self._items.move_to_end(key)
+      while len(self._items) > self.maximumSize:
+        self._items.popitem(last=False)
+
+  def clear(self):
+    with self._lock:
+      self._items.clear()
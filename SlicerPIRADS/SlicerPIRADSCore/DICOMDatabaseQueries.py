@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import logging
+from collections import OrderedDict
+
+
+MAXIMUM_NUMBER_OF_QUERY_PARAMETERS = 900
+""" SQLite limits the number of host parameters of one statement (999 for older versions) """
+
+
+def connectReadOnly(databaseFilename):
+  """ Opens a read-only connection to a ctkDICOMDatabase file
+
+  Raises:
+    sqlite3.Error: if the database cannot be opened
+  """
+  return sqlite3.connect("file:{}?mode=ro".format(databaseFilename), uri=True)
+
+
+def queryFilesForInstances(databaseFilename, instanceUIDs):
+  """ Resolves SOPInstanceUIDs to file names with one query (per MAXIMUM_NUMBER_OF_QUERY_PARAMETERS UIDs) on the
+  Images table instead of one ctkDICOMDatabase.fileForInstance call per instance
+
+  Relative file names (stored by newer CTK versions) are returned relative to the database directory.
+
+  Returns:
+    dict: maps SOPInstanceUID to file name. Unknown instances are missing.
+
+  Raises:
+    sqlite3.Error: if the database cannot be read
+  """
+  instanceUIDs = list(OrderedDict.fromkeys(instanceUIDs))
+  databaseDirectory = os.path.dirname(os.path.abspath(databaseFilename))
+  files = dict()
+  connection = connectReadOnly(databaseFilename)
+  try:
+    for start in range(0, len(instanceUIDs), MAXIMUM_NUMBER_OF_QUERY_PARAMETERS):
+      chunk = instanceUIDs[start:start + MAXIMUM_NUMBER_OF_QUERY_PARAMETERS]
+      query = "SELECT SOPInstanceUID, Filename FROM Images WHERE SOPInstanceUID IN ({})".format(
+        ",".join("?" * len(chunk)))
+      for uid, fileName in connection.execute(query, chunk):
+        files[uid] = fileName if os.path.isabs(fileName) else os.path.join(databaseDirectory, fileName)
+  finally:
+    connection.close()
+  return files
+
+
+def getFilesForInstances(database, instanceUIDs):
+  """ Returns dictionary mapping SOPInstanceUIDs to files of database
+
+  All instances are resolved by queryFilesForInstances. Instances that cannot be resolved that way (e.g. in-memory
+  database) are looked up one by one.
+
+  Args:
+    database: ctkDICOMDatabase or any object providing databaseFilename and fileForInstance(uid)
+    instanceUIDs: list of SOPInstanceUIDs
+  """
+  try:
+    files = queryFilesForInstances(database.databaseFilename, instanceUIDs)
+  except sqlite3.Error as exc:
+    logging.debug("Bulk query of instance files failed: %s" % exc)
+    files = dict()
+  for uid in instanceUIDs:
+    if uid not in files:
+      files[uid] = database.fileForInstance(uid)
+  return files
+
+
+def querySeriesModalities(databaseFilename, seriesUIDs):
+  """ Returns dictionary mapping SeriesInstanceUIDs to Modality as indexed in the Series table. Unknown series are
+  missing.
+
+  Raises:
+    sqlite3.Error: if the database cannot be read
+  """
+  seriesUIDs = list(OrderedDict.fromkeys(seriesUIDs))
+  modalities = dict()
+  connection = connectReadOnly(databaseFilename)
+  try:
+    for start in range(0, len(seriesUIDs), MAXIMUM_NUMBER_OF_QUERY_PARAMETERS):
+      chunk = seriesUIDs[start:start + MAXIMUM_NUMBER_OF_QUERY_PARAMETERS]
+      query = "SELECT SeriesInstanceUID, Modality FROM Series WHERE SeriesInstanceUID IN ({})".format(
+        ",".join("?" * len(chunk)))
+      modalities.update(connection.execute(query, chunk))
+  finally:
+    connection.close()
+  return modalities
+
+
+def queryModalitiesForFiles(databaseFilename, fileNames):
+  """ Returns dictionary mapping file names to the Modality of their series without reading the files. Files that are
+  not indexed are missing.
+
+  Raises:
+    sqlite3.Error: if the database cannot be read
+  """
+  databaseDirectory = os.path.dirname(os.path.abspath(databaseFilename))
+  storedFileNames = dict()
+  for fileName in fileNames:
+    storedFileNames[fileName] = fileName
+    absoluteFileName = os.path.abspath(fileName)
+    if absoluteFileName.startswith(databaseDirectory + os.sep):
+      storedFileNames[os.path.relpath(absoluteFileName, databaseDirectory).replace(os.sep, "/")] = fileName
+  candidates = list(storedFileNames.keys())
+  modalities = dict()
+  connection = connectReadOnly(databaseFilename)
+  try:
+    for start in range(0, len(candidates), MAXIMUM_NUMBER_OF_QUERY_PARAMETERS):
+      chunk = candidates[start:start + MAXIMUM_NUMBER_OF_QUERY_PARAMETERS]
+      query = "SELECT Images.Filename, Series.Modality FROM Images " \
+              "JOIN Series ON Images.SeriesInstanceUID = Series.SeriesInstanceUID " \
+              "WHERE Images.Filename IN ({})".format(",".join("?" * len(chunk)))
+      for storedFileName, modality in connection.execute(query, chunk):
+        modalities[storedFileNames[storedFileName]] = modality
+  finally:
+    connection.close()
+  return modalities
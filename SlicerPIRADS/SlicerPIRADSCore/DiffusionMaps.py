@@ -0,0 +1,65 @@
+import numpy as np
+
+
+DEFAULT_HIGH_B_VALUE = 1400
+""" b-value (s/mm2) of computed high b-value images as recommended by PI-RADS v2 """
+
+ADC_SCALE = 1e6
+""" Computed ADC maps are stored in 10^-6 mm2/s like ADC maps of most vendors """
+
+
+def fitMonoExponential(signals, bValues, chunkSize=8, minimumSignal=1.0):
+  """ Fits S(b) = S0 * exp(-b * ADC) to each voxel with log-linear least squares
+
+  The design matrix is the same for all voxels, so the fit reduces to one matrix product per chunk of chunkSize slices.
+  This keeps memory bounded to a few copies of a chunk instead of the whole series.
+
+  Args:
+    signals: array of shape (number of b-values, slices, rows, columns)
+    bValues: b-values in s/mm2, one per first dimension of signals
+    chunkSize: number of slices fitted at once
+    minimumSignal: signals are clipped to this value before taking the logarithm
+
+  Returns:
+    tuple: S0 and ADC (mm2/s) as float32 arrays of shape (slices, rows, columns). Negative ADCs are set to 0.
+
+  Raises:
+    ValueError: if less than two distinct b-values are given
+  """
+  bValues = np.asarray(bValues, dtype=np.float64)
+  if signals.shape[0] != len(bValues):
+    raise ValueError("Number of b-values (%d) does not match number of volumes (%d)" % (len(bValues), signals.shape[0]))
+  if len(np.unique(bValues)) < 2:
+    raise ValueError("At least two distinct b-values are required for fitting ADC")
+
+  designMatrix = np.stack([np.ones_like(bValues), -bValues], axis=1)
+  pseudoInverse = np.linalg.pinv(designMatrix)
+
+  s0 = np.empty(signals.shape[1:], dtype=np.float32)
+  adc = np.empty(signals.shape[1:], dtype=np.float32)
+  for start in range(0, signals.shape[1], chunkSize):
+    chunk = signals[:, start:start + chunkSize]
+    logSignals = np.log(np.maximum(chunk.astype(np.float64), minimumSignal)).reshape(len(bValues), -1)
+    logS0, chunkADC = pseudoInverse.dot(logSignals)
+    s0[start:start + chunkSize] = np.exp(logS0).reshape(chunk.shape[1:])
+    adc[start:start + chunkSize] = np.maximum(chunkADC, 0).reshape(chunk.shape[1:])
+  return s0, adc
+
+
+def computeHighBValueImage(s0, adc, bValue=DEFAULT_HIGH_B_VALUE):
+  """ Returns S0 * exp(-b * ADC) as float32 array (adc in mm2/s) """
+  return (s0 * np.exp(-bValue * adc)).astype(np.float32)
+
+
+def computeDiffusionMaps(signals, bValues, highBValue=DEFAULT_HIGH_B_VALUE, chunkSize=8):
+  """ Computes ADC map (scaled by ADC_SCALE) and a high b-value image of a multi b-value DWI series
+
+  .. code-block:: python
+
+    adc, highB = computeDiffusionMaps(np.moveaxis(dwiArray, -1, 0), [0, 100, 800])
+
+  Returns:
+    tuple: ADC map and high b-value image as float32 arrays of shape (slices, rows, columns)
+  """
+  s0, adc = fitMonoExponential(signals, bValues, chunkSize=chunkSize)
+  return (adc * ADC_SCALE).astype(np.float32), computeHighBValueImage(s0, adc, highBValue)
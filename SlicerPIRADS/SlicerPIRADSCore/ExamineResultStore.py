@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import logging
+
+
+MAXIMUM_NUMBER_OF_QUERY_PARAMETERS = 900
+
+
+def getFingerprint(fileName):
+  """ Returns (modification time, size) of fileName or None if it cannot be accessed """
+  try:
+    stat = os.stat(fileName)
+  except OSError:
+    return None
+  return stat.st_mtime, stat.st_size
+
+
+class ExamineResult(object):
+  """ Result of examining one file
+
+  Attributes:
+    fileName: examined file
+    sopInstanceUID: SOPInstanceUID or empty string if the file has none (such files are skipped by examine)
+    seriesDescription: SeriesDescription
+    isQIICRX: True if the file is a DICOM QIICRX SR
+  """
+
+  __slots__ = ("fileName", "sopInstanceUID", "seriesDescription", "isQIICRX")
+
+  def __init__(self, fileName, sopInstanceUID, seriesDescription, isQIICRX):
+    self.fileName = fileName
+    self.sopInstanceUID = sopInstanceUID
+    self.seriesDescription = seriesDescription
+    self.isQIICRX = isQIICRX
+
+
+class ExamineResultStore(object):
+  """ SQLite file persisting ExamineResults across sessions
+
+  Results are stored per file together with the file fingerprint (modification time and size). A result is only
+  returned as long as the fingerprint of the file did not change. Increasing SCHEMA_VERSION discards all stored
+  results e.g. if the examine logic changes.
+
+  .. code-block:: python
+
+    store = ExamineResultStore(os.path.join(databaseDirectory, "SlicerPIRADS", "ExamineResults.sql"))
+    results = store.get(files)
+    store.put([examine(f) for f in files if f not in results])
+  """
+
+  SCHEMA_VERSION = 1
+
+  def __init__(self, fileName):
+    self.fileName = fileName
+    directory = os.path.dirname(os.path.abspath(fileName))
+    if not os.path.exists(directory):
+      os.makedirs(directory)
+    self._connection = sqlite3.connect(fileName)
+    self._createSchema()
+
+  def _createSchema(self):
+    version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+    with self._connection:
+      if version != self.SCHEMA_VERSION:
+        self._connection.execute("DROP TABLE IF EXISTS ExamineResults")
+        self._connection.execute("PRAGMA user_version = {:d}".format(self.SCHEMA_VERSION))
+      self._connection.execute("CREATE TABLE IF NOT EXISTS ExamineResults (FileName TEXT PRIMARY KEY, "
+                               "ModificationTime REAL, Size INTEGER, SOPInstanceUID TEXT, SeriesDescription TEXT, "
+                               "IsQIICRX INTEGER)")
+
+  def close(self):
+    self._connection.close()
+
+  def get(self, fileNames):
+    """ Returns dictionary mapping file names to stored ExamineResults. Files without (up to date) result are missing.
+    """
+    fingerprints = dict()
+    for fileName in fileNames:
+      fingerprint = getFingerprint(fileName)
+      if fingerprint is not None:
+        fingerprints[fileName] = fingerprint
+    candidates = list(fingerprints.keys())
+    results = dict()
+    for start in range(0, len(candidates), MAXIMUM_NUMBER_OF_QUERY_PARAMETERS):
+      chunk = candidates[start:start + MAXIMUM_NUMBER_OF_QUERY_PARAMETERS]
+      query = "SELECT FileName, ModificationTime, Size, SOPInstanceUID, SeriesDescription, IsQIICRX " \
+              "FROM ExamineResults WHERE FileName IN ({})".format(",".join("?" * len(chunk)))
+      for fileName, modificationTime, size, sopInstanceUID, seriesDescription, isQIICRX in \
+          self._connection.execute(query, chunk):
+        if fingerprints[fileName] == (modificationTime, size):
+          results[fileName] = ExamineResult(fileName, sopInstanceUID, seriesDescription, bool(isQIICRX))
+    return results
+
+  def put(self, results):
+    """ Stores list of ExamineResults within one transaction """
+    rows = []
+    for result in results:
+      fingerprint = getFingerprint(result.fileName)
+      if fingerprint is None:
+        continue
+      rows.append((result.fileName,) + fingerprint + (result.sopInstanceUID, result.seriesDescription,
+                                                      int(result.isQIICRX)))
+    if not rows:
+      return
+    try:
+      with self._connection:
+        self._connection.executemany("INSERT OR REPLACE INTO ExamineResults VALUES (?, ?, ?, ?, ?, ?)", rows)
+    except sqlite3.Error as exc:
+      logging.warning("Storing examine results in %s failed: %s" % (self.fileName, exc))
@@ -0,0 +1,100 @@
+from abc import ABCMeta
+import math
+
+from SlicerPIRADSCore.SeriesType import *
+
+
+MAXIMUM_NUMBER_OF_VIEWS = 9
+""" Maximum number of slice views of an adaptive layout """
+
+VIEW_NAME_PREFIX = "PIRADS"
+""" Slice views of adaptive layouts are named PIRADS1, PIRADS2, ... so that all layouts share the same view nodes """
+
+
+def getGridSize(numberOfViews):
+  """ Returns (rows, columns) of the smallest almost square grid holding numberOfViews views """
+  if numberOfViews < 1:
+    raise ValueError("At least one view is required")
+  columns = int(math.ceil(math.sqrt(numberOfViews)))
+  rows = int(math.ceil(numberOfViews / float(columns)))
+  return rows, columns
+
+
+def getViewNames(numberOfViews):
+  return ["{}{:d}".format(VIEW_NAME_PREFIX, index + 1) for index in range(numberOfViews)]
+
+
+def createLayoutDescription(numberOfViews, orientation="Axial"):
+  """ Returns the layout XML (see vtkMRMLLayoutNode::AddLayoutDescription) of a grid of numberOfViews slice views
+  named by getViewNames. The last row holds the remaining views if numberOfViews does not fill the grid.
+  """
+  rows, columns = getGridSize(numberOfViews)
+  viewNames = getViewNames(numberOfViews)
+  xml = ['<layout type="vertical">']
+  for row in range(rows):
+    xml.append(' <item>')
+    xml.append('  <layout type="horizontal">')
+    for viewName in viewNames[row * columns:(row + 1) * columns]:
+      xml.append('   <item>')
+      xml.append('    <view class="vtkMRMLSliceNode" singletontag="{}">'.format(viewName))
+      xml.append('     <property name="orientation" action="default">{}</property>'.format(orientation))
+      xml.append('     <property name="viewlabel" action="default">{}</property>'.format(
+        viewName[len(VIEW_NAME_PREFIX):]))
+      xml.append('     <property name="viewcolor" action="default">#808080</property>')
+      xml.append('    </view>')
+      xml.append('   </item>')
+    xml.append('  </layout>')
+    xml.append(' </item>')
+  xml.append('</layout>')
+  return "\n".join(xml)
+
+
+class HangingProtocolFactory(object):
+
+  @staticmethod
+  def getHangingProtocol(volumeNodes):
+    if len(volumeNodes) <= 4:
+      return PIRADSHangingProtocolP1
+    elif 4 < len(volumeNodes) < 7:
+      return PIRADSHangingProtocolP2
+    else:
+      return PIRADSHangingProtocolP3
+
+
+class HangingProtocol(object):
+  """ Base class of hanging protocols
+
+  LAYOUT_NAME is the name of the vtkMRMLLayoutNode layout constant (e.g. 'SlicerLayoutTwoOverTwoView') so that hanging
+  protocols can be chosen without Slicer. Use SlicerPIRADSLogic.HangingProtocol.getLayout for the layout ID.
+  """
+
+  __metaclass__ = ABCMeta
+
+  SERIES_TYPES = None
+  LAYOUT_NAME = None
+
+  def __init__(self, volumeNodes):
+    if not self.SERIES_TYPES or not self.LAYOUT_NAME:
+      raise NotImplementedError
+    self._volumeNodes = volumeNodes
+
+  def canHandle(self, seriesTypes):
+    pass
+
+
+class PIRADSHangingProtocolP1(HangingProtocol):
+
+  SERIES_TYPES = [T2a, ADC, DWIb, SUB]
+  LAYOUT_NAME = "SlicerLayoutTwoOverTwoView"
+
+
+class PIRADSHangingProtocolP2(HangingProtocol):
+
+  SERIES_TYPES = [T2a, T2s, T2c, ADC, DWIb, SUB]
+  LAYOUT_NAME = "SlicerLayoutThreeOverThreeView"
+
+
+class PIRADSHangingProtocolP3(HangingProtocol):
+
+  SERIES_TYPES = [T2a, T2s, T2c, ADC, DWIb, SUB, DCE] # TODO: add , "curve"]
+  LAYOUT_NAME = "SlicerLayoutThreeByThreeSliceView"
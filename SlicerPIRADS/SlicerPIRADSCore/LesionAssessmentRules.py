@@ -0,0 +1,126 @@
+import re
+
+from SlicerPIRADSCore.SeriesType import *
+from SlicerPIRADSCore.Constants import *
+from SlicerPIRADSCore.ProstateSector import ProstateSectorSet
+
+
+class LesionAssessmentRule(object):
+  """ Base class for lesion based rules
+  """
+
+  PATTERN = None
+  ZONE = None
+  PREFERRED_MEASUREMENT_SERIES_TYPES = None
+  PREFERRED_SERIES_TYPES_TOOLTIPS = {}
+
+  def __init__(self):
+    if not self.PATTERN:
+      raise NotImplementedError("Class member 'PATTERN' must be defined by all inheriting classes")
+
+  @classmethod
+  def isApplicable(cls, sectors):
+    return ProstateSectorSet.coerce(sectors).isInZone(cls.ZONE)
+
+  @classmethod
+  def getPickList(cls, seriesType):
+    raise NotImplementedError
+
+  @classmethod
+  def getPickListTooltip(cls, seriesType):
+    for seriesTypeClass in cls.PREFERRED_SERIES_TYPES_TOOLTIPS.keys():
+      if isinstance(seriesType, seriesTypeClass):
+        data = cls.PREFERRED_SERIES_TYPES_TOOLTIPS[seriesTypeClass]
+        return HTML_FORMATTED_TOOLTIP.format("\n".join([HTML_FORMATTED_ROW.format(key, value) for key,value in data.items()]))
+    return ""
+
+
+class TZRule(LesionAssessmentRule):
+
+  PATTERN = r'^TZ'
+  ZONE = "TZ"
+  PREFERRED_MEASUREMENT_SERIES_TYPES = [T2BasedSeriesType, DiffusionBasedSeriesType]
+  PREFERRED_SERIES_TYPES_TOOLTIPS = {T2BasedSeriesType: TZ_T2_TOOLTIPS,
+                                     DiffusionBasedSeriesType: TZ_DWI_TOOLTIPS}
+  @classmethod
+  def getPickList(cls, seriesType):
+    if any(isinstance(seriesType, c) for c in cls.PREFERRED_MEASUREMENT_SERIES_TYPES):
+      return [1,2,3,4,5]
+    return []
+
+
+class PZRule(LesionAssessmentRule):
+
+  PATTERN = r'^PZ'
+  ZONE = "PZ"
+  PREFERRED_MEASUREMENT_SERIES_TYPES = [T2BasedSeriesType, DiffusionBasedSeriesType, DCEBasedSeriesType]
+  PREFERRED_SERIES_TYPES_TOOLTIPS = {T2BasedSeriesType: PZ_T2_TOOLTIPS,
+                                     DiffusionBasedSeriesType: PZ_DWI_TOOLTIPS,
+                                     DCEBasedSeriesType: PZ_DCE_TOOLTIPS}
+
+  @classmethod
+  def getPickList(cls, seriesType):
+    if any(isinstance(seriesType, c) for c in cls.PREFERRED_MEASUREMENT_SERIES_TYPES):
+      if isinstance(seriesType, DCEBasedSeriesType):
+        return ["+", "-"]
+      return [1,2,3,4,5]
+    return []
+
+
+class CZRule(LesionAssessmentRule):
+
+  PATTERN = r'^CZ'
+  ZONE = "CZ"
+
+  @classmethod
+  def isApplicable(cls, sectors):
+    sectors = ProstateSectorSet.coerce(sectors)
+    return sectors.isInZone(cls.ZONE) or (TZRule.isApplicable(sectors) and PZRule.isApplicable(sectors))
+
+
+class LesionAssessmentRuleFactory(object):
+  """ LesionAssessmentRuleFactory offers a static method for applying lesion assessment rules depending on its location
+  """
+
+  LesionAssessmentRules = [TZRule, PZRule]
+
+  @classmethod
+  def getLesionAssessmentRuleForZone(cls, zone):
+    """ Returns LesionAssessmentRule instance for a zone ('TZ' or 'PZ') or None if no rule is registered """
+    for assessmentRule in cls.LesionAssessmentRules:
+      if assessmentRule.ZONE == zone:
+        return assessmentRule()
+    return None
+
+  @classmethod
+  def getEligibleLesionAssessmentRule(cls, sectors, chooseZone=None):
+    """ Returns LesionAssessmentRule for a list of sectors
+
+    Args:
+      sectors: ProstateSectorSet or list of sector names selected from ProstateSectorMapDialog
+      chooseZone: callable receiving the list of zone options (['TZ', 'PZ']) and returning the chosen one (or None).
+        It is only called if the sectors span both zones or lie within the central zone. Without chooseZone no rule
+        is returned in that case.
+
+    Returns:
+      LesionAssessmentRule: instance of LesionAssessmentRule
+
+    """
+    sectors = ProstateSectorSet.coerce(sectors)
+    if CZRule.isApplicable(sectors):
+      return cls.getLesionAssessmentRuleForChoice(chooseZone(["TZ", "PZ"]) if chooseZone else None)
+    elif TZRule.isApplicable(sectors):
+      return TZRule()
+    elif PZRule.isApplicable(sectors):
+      return PZRule()
+    return None
+
+  @classmethod
+  def getLesionAssessmentRuleForChoice(cls, value):
+    """ Returns LesionAssessmentRule instance whose PATTERN matches value (e.g. 'TZ') or None """
+    if not value:
+      return None
+    for assessmentRule in cls.LesionAssessmentRules:
+      if re.match(assessmentRule.PATTERN, value):
+        return assessmentRule()
+    return None
@@ -0,0 +1,147 @@
+from SlicerPIRADSCore.Constants import PIRADS_SIZE_THRESHOLD_MM
+from SlicerPIRADSCore.SeriesType import T2BasedSeriesType, DiffusionBasedSeriesType, DCEBasedSeriesType
+
+
+T2W = "T2W"
+DWI = "DWI"
+DCE = "DCE"
+
+
+def getSequenceScores(scores):
+  """ Groups assessment scores by sequence
+
+  Args:
+    scores: dictionary mapping SeriesType instances (or classes) to scores (1-5 or '+'/'-' for DCE)
+
+  Returns:
+    dict: maps T2W and DWI to the highest score and DCE to True/False if DCE was assessed
+  """
+  sequenceScores = dict()
+  for seriesType, score in scores.items():
+    seriesTypeClass = seriesType if isinstance(seriesType, type) else type(seriesType)
+    if issubclass(seriesTypeClass, DCEBasedSeriesType):
+      sequenceScores[DCE] = sequenceScores.get(DCE, False) or str(score).strip() in ("+", "(+)")
+      continue
+    try:
+      score = int(score)
+    except (TypeError, ValueError):
+      continue
+    for baseClass, sequence in [(T2BasedSeriesType, T2W), (DiffusionBasedSeriesType, DWI)]:
+      if issubclass(seriesTypeClass, baseClass):
+        sequenceScores[sequence] = max(score, sequenceScores.get(sequence, 0))
+  return sequenceScores
+
+
+DOMINANT_SEQUENCE_BASE_CLASSES = {"PZ": DiffusionBasedSeriesType, "TZ": T2BasedSeriesType}
+
+
+def getLesionDiameter(zone, diameters):
+  """ Returns the maximum diameter of a lesion measured on the dominant sequence of zone
+
+  Diameters measured on other series are only used if the lesion was not measured on the dominant sequence.
+
+  Args:
+    zone: 'PZ', 'TZ' or None
+    diameters: dictionary mapping SeriesType instances (or classes) to maximum diameters in mm
+
+  Returns:
+    float or None if diameters is empty
+  """
+  baseClass = DOMINANT_SEQUENCE_BASE_CLASSES.get(zone)
+  dominant = [diameter for seriesType, diameter in diameters.items() if baseClass and
+              issubclass(seriesType if isinstance(seriesType, type) else type(seriesType), baseClass)]
+  candidates = dominant if dominant else list(diameters.values())
+  return max(candidates) if candidates else None
+
+
+def calculateLesionCategory(zone, scores, diameter=None):
+  """ Returns the PI-RADS v2 assessment category of a lesion or None if the dominant sequence was not scored
+
+  In the peripheral zone DWI is dominant and a positive DCE upgrades DWI score 3 to 4. In the transition zone T2W is
+  dominant and DWI score 5 upgrades T2W score 3 to 4. A dominant score of 4 is upgraded to 5 if the lesion diameter
+  reaches PIRADS_SIZE_THRESHOLD_MM.
+
+  Args:
+    zone: 'PZ' or 'TZ'
+    scores: dictionary mapping SeriesType instances (or classes) to scores
+    diameter: optional maximum lesion diameter in mm
+  """
+  sequenceScores = getSequenceScores(scores)
+  if zone == "PZ":
+    category = sequenceScores.get(DWI)
+    if category == 3 and sequenceScores.get(DCE):
+      return 4
+  elif zone == "TZ":
+    category = sequenceScores.get(T2W)
+    if category == 3 and sequenceScores.get(DWI) == 5:
+      return 4
+  else:
+    return None
+  if category == 4 and diameter is not None and diameter >= PIRADS_SIZE_THRESHOLD_MM:
+    return 5
+  return category
+
+
+class PIRADSAssessmentCategory(object):
+  """ Overall PI-RADS assessment category of a list of findings
+
+  Findings can be any objects providing getAssessmentScores() and getAssessmentRule() (returning an object with
+  attribute ZONE or None). Findings providing getMaximumDiameter() are upgraded according to the size threshold. The
+  overall category is the highest category of all findings.
+  """
+  # TODO: introduce event for changes on findings
+
+  def __init__(self, findings=None):
+    self._findings = findings if findings else []
+    self._calculateAssessmentCategory()
+    self._dataChanged = True
+
+  def __len__(self):
+    return len(self._findings)
+
+  def setFindings(self, findings):
+    self._findings = findings
+    self._dataChanged = True
+
+  def getFindings(self):
+    return self._findings
+
+  def addFinding(self, finding):
+    self._findings.append(finding)
+    self._dataChanged = True
+
+  def removeFinding(self, finding):
+    if not finding in self._findings:
+      return
+    index = self._findings.index(finding)
+    self._findings.pop(index)
+    self._dataChanged = True
+    return index
+
+  def invalidate(self):
+    """ Recalculates the category on the next request e.g. after scores or measurements of a finding changed """
+    self._dataChanged = True
+
+  def getAssessmentCategory(self):
+    if self._dataChanged:
+      self._calculateAssessmentCategory()
+      self._dataChanged = False
+    return self._assessmentCategory
+
+  def _calculateAssessmentCategory(self):
+    self._assessmentCategory = None
+    categories = []
+    for finding in self._findings:
+      category = self.getLesionCategory(finding)
+      if category is not None:
+        categories.append(category)
+    if categories:
+      self._assessmentCategory = max(categories)
+
+  @staticmethod
+  def getLesionCategory(finding):
+    """ Returns the assessment category of a single finding or None if it cannot be determined """
+    rule = finding.getAssessmentRule()
+    getMaximumDiameter = getattr(finding, "getMaximumDiameter", None)
+    return calculateLesionCategory(rule.ZONE if rule else None, finding.getAssessmentScores(),
+                                   getMaximumDiameter() if getMaximumDiameter else None)
@@ -0,0 +1,259 @@
+from collections import OrderedDict
+
+
+class ProstateSector(object):
+  """ Fixed enumeration of the 39 PI-RADS v2 prostate sectors
+
+  Each sector is identified by the object name of its check box in ProstateSectorMapDialog.ui. The position of a sector
+  within SECTORS defines the bit it occupies in a ProstateSectorSet.
+  """
+
+  SECTORS = OrderedDict([
+    # name: (zone, level, side)
+    ("PZpl_Base_R", ("PZpl", "Base", "R")),
+    ("PZpl_Base_L", ("PZpl", "Base", "L")),
+    ("PZpl_Mid_R", ("PZpl", "Mid", "R")),
+    ("PZpl_Mid_L", ("PZpl", "Mid", "L")),
+    ("PZpl_Apex_R", ("PZpl", "Apex", "R")),
+    ("PZpl_Apex_L", ("PZpl", "Apex", "L")),
+    ("PZpm_Mid_R", ("PZpm", "Mid", "R")),
+    ("PZpm_Mid_L", ("PZpm", "Mid", "L")),
+    ("PZpm_Apex_R", ("PZpm", "Apex", "R")),
+    ("PZpm_Apex_L", ("PZpm", "Apex", "L")),
+    ("PZa_Base_R", ("PZa", "Base", "R")),
+    ("PZa_Base_L", ("PZa", "Base", "L")),
+    ("PZa_Mid_R", ("PZa", "Mid", "R")),
+    ("PZa_Mid_L", ("PZa", "Mid", "L")),
+    ("PZa_Apex_R", ("PZa", "Apex", "R")),
+    ("PZa_Apex_L", ("PZa", "Apex", "L")),
+    ("CZ_Base_R", ("CZ", "Base", "R")),
+    ("CZ_Base_L", ("CZ", "Base", "L")),
+    ("TZa_Base_R", ("TZa", "Base", "R")),
+    ("TZa_Base_L", ("TZa", "Base", "L")),
+    ("TZa_Mid_R", ("TZa", "Mid", "R")),
+    ("TZa_Mid_L", ("TZa", "Mid", "L")),
+    ("TZa_Apex_R", ("TZa", "Apex", "R")),
+    ("TZa_Apex_L", ("TZa", "Apex", "L")),
+    ("TZp_Base_R", ("TZp", "Base", "R")),
+    ("TZp_Base_L", ("TZp", "Base", "L")),
+    ("TZp_Mid_R", ("TZp", "Mid", "R")),
+    ("TZp_Mid_L", ("TZp", "Mid", "L")),
+    ("TZp_Apex_R", ("TZp", "Apex", "R")),
+    ("TZp_Apex_L", ("TZp", "Apex", "L")),
+    ("AS_Base_R", ("AS", "Base", "R")),
+    ("AS_Base_L", ("AS", "Base", "L")),
+    ("AS_Mid_R", ("AS", "Mid", "R")),
+    ("AS_Mid_L", ("AS", "Mid", "L")),
+    ("AS_Apex_R", ("AS", "Apex", "R")),
+    ("AS_Apex_L", ("AS", "Apex", "L")),
+    ("Seminal_Vesicle_R", ("SV", "Vesicle", "R")),
+    ("Seminal_Vesicle_L", ("SV", "Vesicle", "L")),
+    ("Urethra_Urethra_LR", ("US", "Urethra", "LR")),
+  ])
+  """ All sectors in bit order mapped to their (zone, level, side) """
+
+  NAMES = tuple(SECTORS.keys())
+  INDEX = {name: index for index, name in enumerate(NAMES)}
+  BITS = {name: 1 << index for index, name in enumerate(NAMES)}
+
+  ZONE_GROUPS = OrderedDict([
+    ("PZ", ["PZpl", "PZpm", "PZa"]),
+    ("CZ", ["CZ"]),
+    ("TZ", ["TZa", "TZp"]),
+    ("AS", ["AS"]),
+    ("SV", ["SV"]),
+    ("US", ["US"])
+  ])
+  """ Anatomical zones summarizing the sector zones """
+
+  LEVELS = ["Vesicle", "Base", "Mid", "Apex", "Urethra"]
+  """ Levels ordered from cranial to caudal """
+
+  @staticmethod
+  def _buildMasks(key):
+    masks = OrderedDict()
+    for name, description in ProstateSector.SECTORS.items():
+      value = key(description)
+      masks[value] = masks.get(value, 0) | ProstateSector.BITS[name]
+    return masks
+
+  @classmethod
+  def getZone(cls, name):
+    return cls.SECTORS[name][0]
+
+  @classmethod
+  def getLevel(cls, name):
+    return cls.SECTORS[name][1]
+
+  @classmethod
+  def getSide(cls, name):
+    return cls.SECTORS[name][2]
+
+
+ProstateSector.ZONE_MASKS = ProstateSector._buildMasks(lambda d: d[0])
+ProstateSector.LEVEL_MASKS = OrderedDict(sorted(ProstateSector._buildMasks(lambda d: d[1]).items(),
+                                                key=lambda item: ProstateSector.LEVELS.index(item[0])))
+ProstateSector.SIDE_MASKS = ProstateSector._buildMasks(lambda d: d[2])
+ProstateSector.ZONE_GROUP_MASKS = OrderedDict(
+  (group, sum(ProstateSector.ZONE_MASKS[zone] for zone in zones))
+  for group, zones in ProstateSector.ZONE_GROUPS.items())
+ProstateSector.ALL_MASK = (1 << len(ProstateSector.NAMES)) - 1
+
+
+class ProstateSectorSet(object):
+  """ Immutable set of prostate sectors backed by an integer bitmask
+
+  Iterating yields the sector names in ProstateSector order, so instances can be used wherever a list of sector names
+  was expected before.
+
+  :param sectors: iterable of sector names, another ProstateSectorSet or None
+  """
+
+  __slots__ = ("_mask",)
+
+  @classmethod
+  def fromMask(cls, mask):
+    """ Creates a ProstateSectorSet from an integer bitmask
+
+    :param mask: integer with one bit per sector as defined by ProstateSector.NAMES
+    :return: ProstateSectorSet
+    """
+    if mask & ~ProstateSector.ALL_MASK:
+      raise ValueError("Mask {} contains bits that do not map to a prostate sector".format(mask))
+    sectorSet = cls.__new__(cls)
+    sectorSet._mask = mask
+    return sectorSet
+
+  @classmethod
+  def fromNames(cls, names):
+    """ Creates a ProstateSectorSet from sector names
+
+    :param names: iterable of sector names
+    :return: ProstateSectorSet
+    """
+    mask = 0
+    for name in names:
+      try:
+        mask |= ProstateSector.BITS[name]
+      except KeyError:
+        raise ValueError("Unknown prostate sector '{}'".format(name))
+    return cls.fromMask(mask)
+
+  @classmethod
+  def fromZone(cls, zone):
+    """ Returns all sectors of a sector zone (e.g. 'PZpl') or zone group (e.g. 'PZ') """
+    try:
+      return cls.fromMask(ProstateSector.ZONE_GROUP_MASKS[zone])
+    except KeyError:
+      return cls.fromMask(ProstateSector.ZONE_MASKS[zone])
+
+  @classmethod
+  def fromLevel(cls, level):
+    """ Returns all sectors of a level (e.g. 'Base') """
+    return cls.fromMask(ProstateSector.LEVEL_MASKS[level])
+
+  @classmethod
+  def coerce(cls, sectors):
+    """ Returns sectors as ProstateSectorSet without copying if it already is one """
+    if isinstance(sectors, cls):
+      return sectors
+    return cls(sectors)
+
+  def __init__(self, sectors=None):
+    if sectors is None:
+      self._mask = 0
+    elif isinstance(sectors, ProstateSectorSet):
+      self._mask = sectors._mask
+    else:
+      self._mask = ProstateSectorSet.fromNames(sectors)._mask
+
+  @property
+  def mask(self):
+    return self._mask
+
+  def __len__(self):
+    return bin(self._mask).count("1")
+
+  def __bool__(self):
+    return self._mask != 0
+
+  __nonzero__ = __bool__
+
+  def __iter__(self):
+    mask = self._mask
+    for name in ProstateSector.NAMES:
+      if not mask:
+        break
+      if mask & 1:
+        yield name
+      mask >>= 1
+
+  def __contains__(self, name):
+    return bool(self._mask & ProstateSector.BITS.get(name, 0))
+
+  def __eq__(self, other):
+    if isinstance(other, ProstateSectorSet):
+      return self._mask == other._mask
+    try:
+      return self._mask == ProstateSectorSet.coerce(other)._mask
+    except (TypeError, ValueError):
+      return NotImplemented
+
+  def __ne__(self, other):
+    result = self.__eq__(other)
+    return result if result is NotImplemented else not result
+
+  def __hash__(self):
+    return hash(self._mask)
+
+  def __or__(self, other):
+    return ProstateSectorSet.fromMask(self._mask | ProstateSectorSet.coerce(other)._mask)
+
+  def __and__(self, other):
+    return ProstateSectorSet.fromMask(self._mask & ProstateSectorSet.coerce(other)._mask)
+
+  def __sub__(self, other):
+    return ProstateSectorSet.fromMask(self._mask & ~ProstateSectorSet.coerce(other)._mask)
+
+  def __repr__(self):
+    return "{}({})".format(self.__class__.__name__, self.toNames())
+
+  def union(self, *others):
+    mask = self._mask
+    for other in others:
+      mask |= ProstateSectorSet.coerce(other)._mask
+    return ProstateSectorSet.fromMask(mask)
+
+  def intersection(self, other):
+    return self & other
+
+  def overlaps(self, other):
+    """ Returns True if at least one sector is shared with other """
+    return bool(self._mask & ProstateSectorSet.coerce(other)._mask)
+
+  def isInZone(self, zone):
+    """ Returns True if any sector lies in zone, which can either be a sector zone (e.g. 'TZa') or a zone group
+    (e.g. 'TZ')
+    """
+    mask = ProstateSector.ZONE_GROUP_MASKS.get(zone) or ProstateSector.ZONE_MASKS.get(zone, 0)
+    return bool(self._mask & mask)
+
+  def zones(self):
+    """ Returns list of sector zones (e.g. ['PZpl', 'TZa']) touched by this set """
+    return [zone for zone, mask in ProstateSector.ZONE_MASKS.items() if self._mask & mask]
+
+  def zoneGroups(self):
+    """ Returns list of zone groups (e.g. ['PZ', 'TZ']) touched by this set """
+    return [group for group, mask in ProstateSector.ZONE_GROUP_MASKS.items() if self._mask & mask]
+
+  def levels(self):
+    """ Returns list of levels (e.g. ['Base', 'Mid']) touched by this set """
+    return [level for level, mask in ProstateSector.LEVEL_MASKS.items() if self._mask & mask]
+
+  def sides(self):
+    """ Returns list of sides ('R', 'L', 'LR') touched by this set """
+    return [side for side, mask in ProstateSector.SIDE_MASKS.items() if self._mask & mask]
+
+  def toNames(self):
+    """ Returns sector names in ProstateSector order """
+    return list(self)
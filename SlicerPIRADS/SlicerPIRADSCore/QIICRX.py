@@ -0,0 +1,251 @@
+import os
+import json
+import logging
+
+import pydicom
+import pydicom.filereader
+from pydicom.dataset import Dataset
+
+from SlicerPIRADSCore.SeriesType import SeriesTypeFactory
+
+
+UID_ENHANCED_SR_STORAGE = "1.2.840.10008.5.1.4.1.1.88.22"
+TEMPLATE_ID = "QIICRX"
+CONTENT_TEMPLATE_SEQUENCE = 0x0040A504
+
+FINDINGS_CONCEPT_NAME = ("FINDINGS", "99SLICERPIRADS", "SlicerPIRADS Findings")
+""" Code (value, scheme designator, meaning) of the TEXT content item holding serialized findings in a QIICRX SR """
+
+GLAND_VOLUME_CONCEPT_NAME = ("GLANDVOLUME", "99SLICERPIRADS", "SlicerPIRADS Gland Volume")
+""" Code (value, scheme designator, meaning) of the TEXT content item holding the gland volume in a QIICRX SR """
+
+
+def _isBeyondContentTemplateSequence(tag, VR, length):
+  return tag > CONTENT_TEMPLATE_SEQUENCE
+
+
+def readHeader(fileName):
+  """ Reads all data elements up to ContentTemplateSequence (0040,A504)
+
+  Elements following it, like the content sequence of a SR or pixel data of images, are neither read nor decoded, which
+  is sufficient for identifying QIICRX reports (see isQIICRXDataset).
+
+  Returns:
+    tuple: pydicom dataset, number of bytes read
+  """
+  with open(fileName, 'rb') as fp:
+    dataset = pydicom.filereader.read_partial(fp, stop_when=_isBeyondContentTemplateSequence)
+    return dataset, fp.tell()
+
+
+def isQIICRXDataset(dataset):
+  """ Returns True if dataset is an Enhanced SR based on the QIICRX template """
+  try:
+    return dataset.Modality == 'SR' and dataset.SOPClassUID == UID_ENHANCED_SR_STORAGE and \
+           dataset.ContentTemplateSequence[0].TemplateIdentifier == TEMPLATE_ID
+  except (AttributeError, IndexError):
+    return False
+
+
+def getGeneralMetaInformation():
+  return {
+    "SeriesDescription": "PI-RADS Report",
+    "SeriesNumber": "1001",
+    "InstanceNumber": "1",
+  }
+
+
+_acquisitionTypes = dict()
+
+
+def loadAcquisitionTypes(fileName):
+  """ Returns the acquisition type table (e.g. Resources/ProstateMRIAcquisitionTypes.json) mapping series type names
+  to coded concepts
+
+  The table is read once per process and shared by all callers. It must not be modified.
+  """
+  fileName = os.path.abspath(fileName)
+  try:
+    return _acquisitionTypes[fileName]
+  except KeyError:
+    with open(fileName) as acqTypeFile:
+      return _acquisitionTypes.setdefault(fileName, json.load(acqTypeFile))
+
+
+def createImageLibraryEntry(files, seriesTypeName, acquisitionTypes, commonDirectory=None):
+  """ Returns the imageLibrary entry of one series
+
+  Args:
+    files: files of the series
+    seriesTypeName: name of the SeriesType of the series e.g. 'T2a'
+    acquisitionTypes: acquisition type table as returned by loadAcquisitionTypes
+    commonDirectory: if series are organized in directories, the directory all series directories have in common.
+      The series gets referenced by its directory relative to commonDirectory instead of by file names.
+  """
+  data = dict()
+  data['piradsSeriesType'] = acquisitionTypes[seriesTypeName]
+  if commonDirectory is not None:
+    data['inputDICOMDirectory'] = os.path.relpath(os.path.dirname(files[0]), commonDirectory)
+  else:
+    data['inputDICOMFiles'] = [os.path.basename(f) for f in files]
+  return data
+
+
+def getSeriesTypeForFiles(files):
+  """ Default classification of a series by the description of its first file and the b-values of DWI series """
+  return SeriesTypeFactory.getSeriesTypeForFiles(files)
+
+
+class ReportSeries(object):
+  """ Series referenced by a QIICRX report
+
+  Attributes:
+    seriesInstanceUID: SeriesInstanceUID
+    files: files of the series
+    directory: absolute directory of the first file
+    seriesType: SeriesType class of the series or None if it is not eligible for PI-RADS reading
+  """
+
+  __slots__ = ("seriesInstanceUID", "files", "directory", "seriesType")
+
+  def __init__(self, seriesInstanceUID, files, seriesType):
+    self.seriesInstanceUID = seriesInstanceUID
+    self.files = files
+    self.directory = os.path.dirname(os.path.abspath(files[0]))
+    self.seriesType = seriesType
+
+
+class QIICRXReportContext(object):
+  """ Resolves files, directories and series types of all series of a report once
+
+  .. code-block:: python
+
+    context = QIICRXReportContext.fromSeriesFiles([(uid, db.filesForSeries(uid)) for uid in db.seriesForStudy(study)])
+    data, params = generateQIICRXMetadata(context.getEligibleContext(), loadAcquisitionTypes(fileName))
+  """
+
+  @classmethod
+  def fromSeriesFiles(cls, seriesFiles, getSeriesType=getSeriesTypeForFiles):
+    """
+    Args:
+      seriesFiles: list of (seriesInstanceUID, files) tuples. Series without files are ignored.
+      getSeriesType: callable returning the SeriesType class for the files of a series or None
+    """
+    return cls([ReportSeries(seriesUID, files, getSeriesType(files)) for seriesUID, files in seriesFiles if files])
+
+  def __init__(self, series=None):
+    self.series = list(series) if series else []
+
+  def __len__(self):
+    return len(self.series)
+
+  def getSeriesInstanceUIDs(self):
+    return [s.seriesInstanceUID for s in self.series]
+
+  def getEligibleSeries(self):
+    """ Returns ReportSeries with a SeriesType """
+    return [s for s in self.series if s.seriesType]
+
+  def getEligibleContext(self):
+    """ Returns a QIICRXReportContext holding the eligible series only (without resolving them again) """
+    return QIICRXReportContext(self.getEligibleSeries())
+
+  def getImageLibraryDataDir(self):
+    """ Returns the directory all series directories have in common """
+    return os.path.commonpath(list(set(s.directory for s in self.series)))
+
+  def isOrganizedInDirectories(self):
+    return len(set(s.directory for s in self.series)) > 1
+
+
+def generateQIICRXMetadata(context, acquisitionTypes):
+  """ Builds qiicrxsr meta data without accessing Slicer or the DICOM database
+
+  Findings are not part of the meta data, because qiicrxsr does not encode them. Use addFindings on the generated SR.
+
+  Args:
+    context: QIICRXReportContext of the series to reference
+    acquisitionTypes: acquisition type table as returned by loadAcquisitionTypes
+
+  Returns:
+    tuple: meta data dictionary, dictionary with qiicrxsr parameters 'compositeContextDataDir' and
+      'imageLibraryDataDir'
+
+  Raises:
+    ValueError: if none of the series is eligible for PI-RADS reading
+  """
+  if not context.getEligibleSeries():
+    raise ValueError("No eligible series has been found for PIRADS reading!")
+
+  firstFile = context.series[0].files[0]
+  params = {
+    "compositeContextDataDir": context.series[0].directory,
+    "imageLibraryDataDir": context.getImageLibraryDataDir()
+  }
+  commonDirectory = params["imageLibraryDataDir"] if context.isOrganizedInDirectories() else None
+
+  data = getGeneralMetaInformation()
+  data["compositeContext"] = os.path.basename(firstFile)
+  data['imageLibrary'] = []
+  for series in context.series:
+    if not series.seriesType:
+      logging.warning("No eligible series type found for series '%s'" % series.seriesInstanceUID)
+      continue
+    data['imageLibrary'].append(createImageLibraryEntry(series.files, series.seriesType.getName(), acquisitionTypes,
+                                                        commonDirectory))
+  return data, params
+
+
+def _isContentItem(item, conceptName):
+  try:
+    code = item.ConceptNameCodeSequence[0]
+    return item.ValueType == "TEXT" and (code.CodeValue, code.CodingSchemeDesignator) == conceptName[:2]
+  except (AttributeError, IndexError):
+    return False
+
+
+def _createTextContentItem(conceptName, value):
+  item = Dataset()
+  item.RelationshipType = "CONTAINS"
+  item.ValueType = "TEXT"
+  code = Dataset()
+  code.CodeValue, code.CodingSchemeDesignator, code.CodeMeaning = conceptName
+  item.ConceptNameCodeSequence = [code]
+  item.TextValue = json.dumps(value, sort_keys=True)
+  return item
+
+
+def _readTextContentItem(dataset, conceptName, default=None):
+  for item in dataset.get("ContentSequence", []):
+    if _isContentItem(item, conceptName):
+      try:
+        return json.loads(item.TextValue)
+      except ValueError as exc:
+        logging.warning("%s of the report cannot be decoded: %s" % (conceptName[2], exc))
+  return default
+
+
+def addFindings(fileName, findings, glandVolume=None):
+  """ Stores serialized findings (see FindingSerializer) as JSON in a TEXT content item of the QIICRX SR fileName
+
+  The gland volume (see ProstateVolume.toDict) is stored in a content item of its own. Existing findings and gland
+  volume content items get replaced.
+  """
+  dataset = pydicom.dcmread(fileName)
+  items = [_createTextContentItem(FINDINGS_CONCEPT_NAME, findings)]
+  if glandVolume is not None:
+    items.append(_createTextContentItem(GLAND_VOLUME_CONCEPT_NAME, glandVolume))
+  conceptNames = [FINDINGS_CONCEPT_NAME, GLAND_VOLUME_CONCEPT_NAME]
+  content = [i for i in dataset.get("ContentSequence", []) if not any(_isContentItem(i, c) for c in conceptNames)]
+  dataset.ContentSequence = content + items
+  dataset.save_as(fileName)
+
+
+def readFindings(dataset):
+  """ Returns serialized findings stored by addFindings in the pydicom dataset of a QIICRX SR or an empty list """
+  return _readTextContentItem(dataset, FINDINGS_CONCEPT_NAME, [])
+
+
+def readGlandVolume(dataset):
+  """ Returns the gland volume stored by addFindings in the pydicom dataset of a QIICRX SR or None """
+  return _readTextContentItem(dataset, GLAND_VOLUME_CONCEPT_NAME)
@@ -0,0 +1,266 @@
+from abc import ABCMeta
+import os
+import re
+import struct
+import pydicom
+from collections import OrderedDict
+
+
+SERIES_TYPE_ATTRIBUTE = "SlicerPIRADS.SeriesType"
+""" Volume node attribute overriding the description based classification with the name of a SeriesType """
+
+DERIVED_FROM_ATTRIBUTE = "SlicerPIRADS.DerivedFrom"
+""" Volume node attribute holding the ID of the node a computed volume (e.g. ADC map) was derived from """
+
+B_VALUES_ATTRIBUTE = "SlicerPIRADS.BValues"
+""" Volume node attribute holding comma separated b-values of computed or split diffusion weighted volumes """
+
+HIGH_B_VALUE_THRESHOLD = 1400
+""" Minimum b-value (s/mm2) of a high b-value DWI series according to PI-RADS v2 """
+
+B_VALUE_TAGS = OrderedDict([
+  ("DiffusionBValue", (0x0018, 0x9087)),
+  ("GE", (0x0043, 0x1039)),
+  ("Siemens", (0x0019, 0x100C)),
+  ("Philips", (0x2001, 0x1003))
+])
+""" Standard and vendor specific tags holding the b-value of an image. The first available one is used. """
+
+
+def _parseNumbers(element):
+  value = element.value
+  if isinstance(value, bytes):
+    # private elements without known VR: Philips stores FL, GE and Siemens store IS
+    if element.tag == B_VALUE_TAGS["Philips"] and len(value) == 4:
+      return list(struct.unpack("<f", value))
+    value = value.decode("ascii", "ignore").strip("\x00 ").split("\\")
+  elif isinstance(value, (str, int, float)):
+    value = [value]
+  return [float(v) for v in value]
+
+
+def readBValue(dataset):
+  """ Returns the b-value of a pydicom dataset read from one of B_VALUE_TAGS or None if it has none """
+  for vendor, tag in B_VALUE_TAGS.items():
+    if tag not in dataset:
+      continue
+    try:
+      bValue = _parseNumbers(dataset[tag])[0]
+    except (ValueError, TypeError, IndexError, struct.error):
+      continue
+    if vendor == "GE" and bValue >= 1e9:
+      # GE adds 10^9 to b-values of some sequences
+      bValue -= 1e9
+    return bValue
+  return None
+
+
+def readBValues(fileNames):
+  """ Returns sorted list of distinct b-values of fileNames or None if none of the files provides a b-value
+
+  Only B_VALUE_TAGS are parsed and pixel data is not read.
+  """
+  bValues = set()
+  for fileName in fileNames:
+    try:
+      dataset = pydicom.dcmread(fileName, stop_before_pixels=True, specific_tags=list(B_VALUE_TAGS.values()))
+    except (IOError, pydicom.errors.InvalidDicomError):
+      continue
+    bValue = readBValue(dataset)
+    if bValue is not None:
+      bValues.add(bValue)
+  return sorted(bValues) if bValues else None
+
+
+def getBValuesFromDescription(description):
+  """ Returns list of b-values mentioned in a series description like 'dwi b1400' """
+  return [float(b) for b in re.findall(r'(?<![a-z0-9])b[ =_-]?(\d{3,4})(?!\d)', description.lower())]
+
+
+class SeriesType(object):
+
+  __metaclass__ = ABCMeta
+
+  @classmethod
+  def canHandle(cls, obj, bValues=None):
+    if type(obj) is str:
+      assert os.path.exists(obj)
+      return cls.canHandleFile(obj, bValues)
+    else:
+      #TODO: check if volumeNode
+      return cls.canHandleVolumeNode(obj, bValues)
+
+  @classmethod
+  def getName(cls):
+    return cls.__name__
+
+  @classmethod
+  def canHandleFile(cls, filename, bValues=None):
+    """ bValues are the b-values of the whole series of filename (see SeriesTypeFactory.getSeriesTypeForFiles). The
+    b-value of filename itself is not used, since a single instance of a multi b-value series can look like DWIb.
+    """
+    try:
+      # TODO: if is imported in DICOMDatabase, use database mechanism for checking tag else use dicom
+      dataset = pydicom.dcmread(filename, stop_before_pixels=True)
+      return cls.isEligible(dataset.SeriesDescription.lower(), bValues)
+    except AttributeError:
+      return False
+
+  @classmethod
+  def canHandleVolumeNode(cls, volumeNode, bValues=None):
+    """ volumeNode can be any object providing GetName() e.g. a vtkMRMLScalarVolumeNode
+
+    If volumeNode provides GetAttribute and has attribute SERIES_TYPE_ATTRIBUTE set (e.g. for computed volumes), only
+    the SeriesType of that name can handle it.
+    """
+    seriesTypeName = volumeNode.GetAttribute(SERIES_TYPE_ATTRIBUTE) if hasattr(volumeNode, "GetAttribute") else None
+    if seriesTypeName:
+      return seriesTypeName == cls.getName()
+    description = volumeNode.GetName().lower()
+    return cls.isEligible(description, bValues)
+
+  @classmethod
+  def hasEligibleDescription(cls, description):
+    raise NotImplementedError
+
+  @classmethod
+  def isEligible(cls, description, bValues=None):
+    """ Returns True if a series with (lower case) description and list of b-values (None if unknown) is of this type
+    """
+    return bool(cls.hasEligibleDescription(description))
+
+  def __init__(self, volume, bValues=None):
+    self._volume = volume
+    self._bValues = bValues
+
+  def getVolume(self):
+    return self._volume
+
+  def getBValues(self):
+    """ Returns sorted list of b-values the volume was acquired (or computed) with or None if unknown """
+    return self._bValues
+
+
+class T2BasedSeriesType(SeriesType):
+
+  @classmethod
+  def hasEligibleDescription(cls, description):
+    return 't2' in description
+
+
+class DiffusionBasedSeriesType(SeriesType):
+  pass
+
+
+class DCEBasedSeriesType(SeriesType):
+  pass
+
+
+class T1a(SeriesType):
+
+  @classmethod
+  def hasEligibleDescription(cls, description):
+    return all(term in description for term in ['ax', 't1'])
+
+
+class T2a(T2BasedSeriesType):
+
+  @classmethod
+  def hasEligibleDescription(cls, description):
+    return T2BasedSeriesType.hasEligibleDescription(description) and 'ax' in description
+
+
+class T2s(T2BasedSeriesType):
+
+  @classmethod
+  def hasEligibleDescription(cls, description):
+    return T2BasedSeriesType.hasEligibleDescription(description) and 'sag' in description
+
+
+class T2c(T2BasedSeriesType):
+
+  @classmethod
+  def hasEligibleDescription(cls, description):
+    return T2BasedSeriesType.hasEligibleDescription(description) and 'cor' in description
+
+
+class ADC(DiffusionBasedSeriesType):
+
+  @classmethod
+  def hasEligibleDescription(cls, description):
+    return 'apparent diffusion coeff' in description
+
+
+class DWIb(DiffusionBasedSeriesType):
+  """ DWI series of only high b-values (>= HIGH_B_VALUE_THRESHOLD). If the b-values of a series are unknown, they are
+  taken from the description (e.g. 'dwi b1400').
+  """
+
+  @classmethod
+  def hasEligibleDescription(cls, description):
+    return DWI.hasEligibleDescription(description) and \
+           any(b >= HIGH_B_VALUE_THRESHOLD for b in getBValuesFromDescription(description))
+
+  @classmethod
+  def isEligible(cls, description, bValues=None):
+    if not bValues:
+      return cls.hasEligibleDescription(description)
+    return bool(DWI.hasEligibleDescription(description)) and min(bValues) >= HIGH_B_VALUE_THRESHOLD
+
+
+class DWI(DiffusionBasedSeriesType):
+  """ DWI series which is not a DWIb series e.g. with multiple b-values """
+
+  @classmethod
+  def hasEligibleDescription(cls, description):
+    return re.search(r'dwi', description)
+
+
+class DCE(DCEBasedSeriesType):
+
+  @classmethod
+  def hasEligibleDescription(cls, description):
+    return any(re.search(term, description) for term in [r'ax dynamic', r'3d dce'])
+
+
+class SUB(DCEBasedSeriesType):
+
+  @classmethod
+  def hasEligibleDescription(cls, description):
+    return re.search(r'[a-zA-Z]', description) is None
+
+
+class SeriesTypeFactory(object):
+
+  SERIES_TYPE_CLASSES = [T1a, T2a, T2s, T2c, ADC, DWIb, DWI, SUB, DCE]
+
+  @staticmethod
+  def getSeriesType(obj, bValues=None):
+    for seriesTypeClass in SeriesTypeFactory.SERIES_TYPE_CLASSES:
+      if seriesTypeClass.canHandle(obj, bValues):
+        return seriesTypeClass
+    return None
+
+  @staticmethod
+  def getSeriesTypeForDescription(description, bValues=None):
+    """ Returns the SeriesType class matching a series description (e.g. queried from the DICOM database) or None """
+    description = description.lower()
+    for seriesTypeClass in SeriesTypeFactory.SERIES_TYPE_CLASSES:
+      if seriesTypeClass.isEligible(description, bValues):
+        return seriesTypeClass
+    return None
+
+  @staticmethod
+  def getSeriesTypeForFiles(files, description=None):
+    """ Returns the SeriesType class of a series consisting of files or None
+
+    If description is not given, it is read from the first file. The b-values of all files are only read if the
+    description denotes a diffusion weighted series.
+    """
+    if description is None:
+      try:
+        description = pydicom.dcmread(files[0], stop_before_pixels=True).SeriesDescription
+      except AttributeError:
+        return None
+    bValues = readBValues(files) if DWI.hasEligibleDescription(description.lower()) else None
+    return SeriesTypeFactory.getSeriesTypeForDescription(description, bValues)
@@ -0,0 +1,119 @@
+import os
+import time
+import shutil
+import hashlib
+import logging
+
+
+def hashFile(fileName, blockSize=1 << 20):
+  """ Returns SHA-1 hex digest of the content of fileName """
+  sha1 = hashlib.sha1()
+  with open(fileName, 'rb') as f:
+    for block in iter(lambda: f.read(blockSize), b""):
+      sha1.update(block)
+  return sha1.hexdigest()
+
+
+def hashData(data):
+  """ Returns SHA-1 hex digest of data (str or bytes) """
+  return hashlib.sha1(data.encode("utf-8") if isinstance(data, str) else data).hexdigest()
+
+
+class WorkspaceEntry(object):
+  """ Directory of a Workspace holding all files derived from one content hash
+
+  Attributes:
+    key: content hash
+    directory: absolute path
+    lastAccess: modification time of the directory (updated on each access through the Workspace)
+    size: accumulated size of all files in bytes
+  """
+
+  __slots__ = ("key", "directory", "lastAccess", "size")
+
+  def __init__(self, key, directory, lastAccess, size):
+    self.key = key
+    self.directory = directory
+    self.lastAccess = lastAccess
+    self.size = size
+
+
+class Workspace(object):
+  """ Directory of intermediate files addressed by content hash with size and age based eviction
+
+  Each key (e.g. hashFile of a DICOM SR) gets its own entry directory. Files derived from the same content are found
+  again instead of being generated a second time. evict removes entries that have not been accessed for maximumAge
+  seconds and then least recently used entries until the workspace is smaller than maximumSize bytes.
+
+  .. code-block:: python
+
+    workspace = Workspace(os.path.join(tempfile.gettempdir(), "QIICRX"), maximumSize=1 << 30, maximumAge=7 * 86400)
+    entry = workspace.getEntry(hashFile(srFileName))
+    jsonFile = os.path.join(entry, "meta.json")
+    if not os.path.exists(jsonFile):
+      decode(srFileName, jsonFile)
+  """
+
+  def __init__(self, directory, maximumSize=None, maximumAge=None):
+    self.directory = os.path.abspath(directory)
+    self.maximumSize = maximumSize
+    self.maximumAge = maximumAge
+
+  def getEntry(self, key):
+    """ Returns the directory of key. It gets created if it doesn't exist and marked as used otherwise. """
+    directory = os.path.join(self.directory, key[:2], key)
+    if os.path.exists(directory):
+      os.utime(directory, None)
+    else:
+      os.makedirs(directory, exist_ok=True)
+    return directory
+
+  def getEntries(self):
+    """ Returns list of WorkspaceEntry ordered from least to most recently used """
+    entries = []
+    if not os.path.exists(self.directory):
+      return entries
+    for prefix in os.listdir(self.directory):
+      prefixDirectory = os.path.join(self.directory, prefix)
+      if not os.path.isdir(prefixDirectory):
+        continue
+      for key in os.listdir(prefixDirectory):
+        directory = os.path.join(prefixDirectory, key)
+        try:
+          size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(directory) for f in files)
+          entries.append(WorkspaceEntry(key, directory, os.path.getmtime(directory), size))
+        except OSError:
+          continue
+    return sorted(entries, key=lambda e: e.lastAccess)
+
+  def getSize(self):
+    return sum(e.size for e in self.getEntries())
+
+  def evict(self, now=None):
+    """ Removes entries exceeding maximumAge and least recently used entries exceeding maximumSize
+
+    Returns:
+      list: removed WorkspaceEntry instances
+    """
+    now = now if now is not None else time.time()
+    entries = self.getEntries()
+    removed = []
+    if self.maximumAge is not None:
+      removed += [e for e in entries if now - e.lastAccess > self.maximumAge]
+    if self.maximumSize is not None:
+      remaining = [e for e in entries if e not in removed]
+      size = sum(e.size for e in remaining)
+      for entry in remaining:
+        if size <= self.maximumSize:
+          break
+        removed.append(entry)
+        size -= entry.size
+    for entry in removed:
+      shutil.rmtree(entry.directory, ignore_errors=True)
+      try:
+        os.rmdir(os.path.dirname(entry.directory))
+      except OSError:
+        pass
+    if removed:
+      logging.debug("Removed %d entries from workspace %s" % (len(removed), self.directory))
+    return removed
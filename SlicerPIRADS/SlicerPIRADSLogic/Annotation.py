@@ -1,37 +1,123 @@
+import os
 import vtk
 import slicer
+import logging
 
 from SlicerDevelopmentToolboxUtils.mixins import ParameterNodeObservationMixin
+from SlicerDevelopmentToolboxUtils.decorators import singleton
 
 
 class Annotation(ParameterNodeObservationMixin):
   """ Base class for annotations providing a mrmlNode and visibility options
 
+  Annotations are lightweight handles. Unless CREATE_ON_DEMAND is disabled, the mrmlNode gets created not before
+  getOrCreateMRMLNode() is called.
+
   :param volumeNode: volume that will be used as the annotation's reference volume
+  :param mrmlNode: optional existing mrmlNode (e.g. loaded from file) to be used instead of creating a new one
   """
 
   DataChangedEvent = vtk.vtkCommand.UserEvent + 201
   """ This event needs to be invoked if internal data changed"""
   MRML_NODE_CLASS = None
   """ MRML_NODE_CLASS is required to be defined for mrmlNode instantiation"""
-
-  def __init__(self, volumeNode):
+  FILE_TYPE = None
+  """ Slicer file type used for loading a saved mrmlNode"""
+  FILE_EXTENSION = None
+  """ File extension used for saving the mrmlNode"""
+  CREATE_ON_DEMAND = True
+  """ If False, the mrmlNode gets initialized when the annotation is created"""
+
+  @property
+  def mrmlNode(self):
+    return self._mrmlNode
+
+  @mrmlNode.setter
+  def mrmlNode(self, node):
+    self._mrmlNode = node
+
+  @classmethod
+  def load(cls, volumeNode, fileName):
+    """ Loads a previously saved annotation from file
+
+    :param volumeNode: volume that will be used as the annotation's reference volume
+    :param fileName: file that was returned by save()
+    :return: Annotation instance or None if loading failed
+    """
+    if not cls.FILE_TYPE or not os.path.exists(fileName):
+      logging.error("Annotation file {} cannot be loaded by {}".format(fileName, cls.__name__))
+      return None
+    result = slicer.util.loadNodeFromFile(fileName, cls.FILE_TYPE, {}, returnNode=True)
+    mrmlNode = result[1] if isinstance(result, tuple) else result
+    return cls(volumeNode, mrmlNode=mrmlNode) if mrmlNode else None
+
+  def __init__(self, volumeNode, mrmlNode=None):
     if not self.MRML_NODE_CLASS:
       raise ValueError("MRML_NODE_CLASS needs to be defined for all inheriting classes of {}".format(self.__class__.__name__))
     self._masterVolume = volumeNode
-    self._initializeMRMLNode()
+    self._mrmlNode = None
+    self._initialized = False
+    self._modified = False
+    if mrmlNode:
+      self._initialized = True
+      self._modified = True
+      self.mrmlNode = mrmlNode
+      self._observeMRMLNode()
+    elif not self.CREATE_ON_DEMAND:
+      self.getOrCreateMRMLNode()
 
   def __del__(self):
     self.delete()
 
+  def getOrCreateMRMLNode(self):
+    """ Returns the mrmlNode and initializes it if that didn't happen yet """
+    if not self._initialized:
+      self._initialized = True
+      self._initializeMRMLNode()
+    return self.mrmlNode
+
+  def hasMRMLNode(self):
+    return self.mrmlNode is not None
+
+  def isModified(self):
+    """ Returns True if the annotation holds user created or loaded data """
+    return self._modified
+
   def _initializeMRMLNode(self):
     self.mrmlNode = slicer.mrmlScene.AddNewNodeByClass(self.MRML_NODE_CLASS)
 
+  def _observeMRMLNode(self):
+    """ This method should be implemented if an existing mrmlNode needs to be observed"""
+    pass
+
+  def _releaseMRMLNode(self):
+    """ Removes the mrmlNode from the scene. Subclasses can override this for recycling nodes. """
+    slicer.mrmlScene.RemoveNode(self.mrmlNode)
+
+  def save(self, directory, name):
+    """ Saves the mrmlNode into directory
+
+    :param directory: output directory
+    :param name: file name without extension
+    :return: absolute file name or None if there was nothing to save
+    """
+    if not self.mrmlNode or not self.FILE_EXTENSION or not self._modified:
+      return None
+    if not os.path.exists(directory):
+      os.makedirs(directory)
+    fileName = os.path.join(directory, name + self.FILE_EXTENSION)
+    if not slicer.util.saveNode(self.mrmlNode, fileName):
+      logging.error("Failed to save annotation to {}".format(fileName))
+      return None
+    return fileName
+
   def delete(self):
     """ Deletes the mrmlNode"""
     if self.mrmlNode:
-      slicer.mrmlScene.RemoveNode(self.mrmlNode)
+      self._releaseMRMLNode()
       self.mrmlNode = None
+    self._initialized = False
+    self._modified = False
 
   def setVisible(self, visible):
     """ Set visibility of the mrmlNode
@@ -45,42 +131,308 @@ class Annotation(ParameterNodeObservationMixin):
     """ This method should be implemented if there is any data to cleanup at anytime"""
     pass
 
+  def _onDataModified(self, caller=None, event=None):
+    self._modified = True
+    self.invokeEvent(self.DataChangedEvent)
+
+
+@singleton
+class SegmentationNodePool(object):
+  """ Recycles vtkMRMLSegmentationNodes keyed by the reference image geometry of their master volume
+
+  Released nodes stay in the mrmlScene (hidden and empty) so that creating and deleting segmentations does not invoke
+  NodeAdded/NodeRemoved events on the mrmlScene.
+  """
+
+  POOL_ATTRIBUTE = "SlicerPIRADS.Pooled"
+
+  def __init__(self):
+    self._freeNodes = dict()
+    self._sceneClosedObserver = slicer.mrmlScene.AddObserver(slicer.mrmlScene.EndCloseEvent, self._onSceneClosed)
+
+  def __del__(self):
+    slicer.mrmlScene.RemoveObserver(self._sceneClosedObserver)
+
+  @staticmethod
+  def getGeometryKey(volumeNode):
+    """ Returns hashable key describing the image geometry of volumeNode """
+    imageData = volumeNode.GetImageData()
+    matrix = vtk.vtkMatrix4x4()
+    volumeNode.GetIJKToRASMatrix(matrix)
+    return (tuple(imageData.GetDimensions()) if imageData else None,
+            tuple(round(matrix.GetElement(row, col), 5) for row in range(3) for col in range(4)))
+
+  def acquire(self, volumeNode):
+    """ Returns an empty segmentation node with reference geometry set from volumeNode """
+    key = self.getGeometryKey(volumeNode)
+    freeNodes = self._freeNodes.get(key, [])
+    while freeNodes:
+      node = freeNodes.pop()
+      if slicer.mrmlScene.IsNodePresent(node):
+        wasModified = node.StartModify()
+        node.SetAttribute(self.POOL_ATTRIBUTE, None)
+        node.SetHideFromEditors(False)
+        node.SetSaveWithScene(True)
+        node.SetReferenceImageGeometryParameterFromVolumeNode(volumeNode)
+        node.EndModify(wasModified)
+        return node
+    node = slicer.mrmlScene.AddNewNodeByClass("vtkMRMLSegmentationNode")
+    node.SetReferenceImageGeometryParameterFromVolumeNode(volumeNode)
+    return node
+
+  def release(self, node, volumeNode):
+    """ Empties and hides node and keeps it for reuse with volumes of the same geometry as volumeNode """
+    wasModified = node.StartModify()
+    node.GetSegmentation().RemoveAllSegments()
+    node.SetDisplayVisibility(False)
+    node.SetAttribute(self.POOL_ATTRIBUTE, "1")
+    node.SetHideFromEditors(True)
+    node.SetSaveWithScene(False)
+    node.EndModify(wasModified)
+    self._freeNodes.setdefault(self.getGeometryKey(volumeNode), []).append(node)
+
+  def clear(self):
+    """ Removes all pooled nodes from the mrmlScene """
+    for nodes in self._freeNodes.values():
+      for node in nodes:
+        if slicer.mrmlScene.IsNodePresent(node):
+          slicer.mrmlScene.RemoveNode(node)
+    self._freeNodes = dict()
+
+  def _onSceneClosed(self, caller, event):
+    self._freeNodes = dict()
+    SeriesSegmentationContainer.reset()
+
 
 class Segmentation(Annotation):
-  """ Annotation subclass using vtkMRMLSegmentationNode
+  """ Annotation subclass using vtkMRMLSegmentationNode. Nodes are acquired from and released to SegmentationNodePool.
   """
 
   MRML_NODE_CLASS = "vtkMRMLSegmentationNode"
+  FILE_TYPE = "SegmentationFile"
+  FILE_EXTENSION = ".seg.nrrd"
 
-  def __init__(self, volumeNode):
-    super(Segmentation, self).__init__(volumeNode)
+  def __init__(self, volumeNode, mrmlNode=None):
+    self._segmentModifiedObserver = None
+    self.segmentID = None
+    super(Segmentation, self).__init__(volumeNode, mrmlNode)
+
+  def _initializeMRMLNode(self):
+    self.mrmlNode = SegmentationNodePool().acquire(self._masterVolume)
     self._createAndObserveSegment()
 
   def _createAndObserveSegment(self):
     import vtkSegmentationCorePython as vtkSegmentationCore
     segment = vtkSegmentationCore.vtkSegment()
     segment.SetName(self._masterVolume.GetName())
-    # TODO need to think about the reference more in detail. After loading the volume nodes don't occupy the same address
-    self.mrmlNode.SetReferenceImageGeometryParameterFromVolumeNode(self._masterVolume)
-    self.mrmlNode.GetSegmentation().AddSegment(segment)
-    self.mrmlNode.AddObserver(vtkSegmentationCore.vtkSegmentation.SegmentModified, self._onSegmentModified)
+    segmentation = self.mrmlNode.GetSegmentation()
+    segmentation.AddSegment(segment)
+    self.segmentID = segmentation.GetNthSegmentID(segmentation.GetNumberOfSegments() - 1)
+    self.mrmlNode.SetDisplayVisibility(True)
+    self._observeMRMLNode()
+
+  def _observeMRMLNode(self):
+    import vtkSegmentationCorePython as vtkSegmentationCore
+    if not self.segmentID and self.mrmlNode.GetSegmentation().GetNumberOfSegments():
+      self.segmentID = self.mrmlNode.GetSegmentation().GetNthSegmentID(0)
+    self._segmentModifiedObserver = self.mrmlNode.AddObserver(vtkSegmentationCore.vtkSegmentation.SegmentModified,
+                                                              self._onSegmentModified)
+
+  def _releaseMRMLNode(self):
+    if self._segmentModifiedObserver:
+      self.mrmlNode.RemoveObserver(self._segmentModifiedObserver)
+      self._segmentModifiedObserver = None
+    SegmentationNodePool().release(self.mrmlNode, self._masterVolume)
 
   def _onSegmentModified(self, caller, event):
-    self.invokeEvent(self.DataChangedEvent)
+    self._onDataModified()
+
+
+class SeriesSegmentationContainer(object):
+  """ Single vtkMRMLSegmentationNode shared by all findings annotated on one series, holding one segment per finding
+
+  Containers are registered per master volume and hand their node back to SegmentationNodePool once the last segment
+  was removed.
+
+  :param volumeNode: master volume of the series
+  """
+
+  _containers = dict()
+
+  @classmethod
+  def getOrCreate(cls, volumeNode):
+    """ Returns the container registered for volumeNode and creates it if needed """
+    try:
+      return cls._containers[volumeNode.GetID()]
+    except KeyError:
+      container = cls(volumeNode)
+      cls._containers[volumeNode.GetID()] = container
+      return container
+
+  @classmethod
+  def get(cls, volumeNode):
+    """ Returns the container registered for volumeNode or None if there is none """
+    return cls._containers.get(volumeNode.GetID())
+
+  @classmethod
+  def reset(cls):
+    cls._containers = dict()
+
+  def __init__(self, volumeNode):
+    self._volumeNode = volumeNode
+    self._segmentObservers = dict()
+    self._segmentModifiedObserver = None
+    self.mrmlNode = None
+
+  def addSegment(self, name, callback):
+    """ Adds an empty segment and calls callback whenever that segment gets modified
+
+    :param name: name of the segment
+    :param callback: function without arguments
+    :return: ID of the new segment
+    """
+    self._initializeMRMLNode()
+    segmentation = self.mrmlNode.GetSegmentation()
+    segmentID = segmentation.AddEmptySegment("", name)
+    if hasattr(segmentation, "CollapseBinaryLabelmaps"):
+      # all segments of one series share one labelmap layer if they don't overlap
+      segmentation.CollapseBinaryLabelmaps(False)
+    self._segmentObservers[segmentID] = callback
+    return segmentID
+
+  def importSegment(self, sourceSegmentationNode, sourceSegmentID, name, callback):
+    """ Copies a segment from another segmentation node into the container
+
+    :return: ID of the new segment
+    """
+    self._initializeMRMLNode()
+    segmentation = self.mrmlNode.GetSegmentation()
+    numberOfSegments = segmentation.GetNumberOfSegments()
+    segmentation.CopySegmentFromSegmentation(sourceSegmentationNode.GetSegmentation(), sourceSegmentID)
+    segmentID = segmentation.GetNthSegmentID(numberOfSegments)
+    segmentation.GetSegment(segmentID).SetName(name)
+    self._segmentObservers[segmentID] = callback
+    return segmentID
+
+  def removeSegment(self, segmentID):
+    """ Removes segment and releases the node to SegmentationNodePool if no segment is left """
+    self._segmentObservers.pop(segmentID, None)
+    if not self.mrmlNode:
+      return
+    self.mrmlNode.GetSegmentation().RemoveSegment(segmentID)
+    if not self._segmentObservers:
+      self.mrmlNode.RemoveObserver(self._segmentModifiedObserver)
+      SegmentationNodePool().release(self.mrmlNode, self._volumeNode)
+      self.mrmlNode = None
+      self._containers.pop(self._volumeNode.GetID(), None)
+
+  def setSegmentVisible(self, segmentID, visible):
+    if not self.mrmlNode:
+      return
+    displayNode = self.mrmlNode.GetDisplayNode()
+    if displayNode:
+      displayNode.SetSegmentVisibility(segmentID, visible)
+
+  def _initializeMRMLNode(self):
+    if self.mrmlNode:
+      return
+    import vtkSegmentationCorePython as vtkSegmentationCore
+    self.mrmlNode = SegmentationNodePool().acquire(self._volumeNode)
+    self.mrmlNode.SetName("{}_Findings".format(self._volumeNode.GetName()))
+    self.mrmlNode.CreateDefaultDisplayNodes()
+    self.mrmlNode.SetDisplayVisibility(True)
+    self._segmentModifiedObserver = self.mrmlNode.AddObserver(vtkSegmentationCore.vtkSegmentation.SegmentModified,
+                                                              self._onSegmentModified)
+
+  @vtk.calldata_type(vtk.VTK_STRING)
+  def _onSegmentModified(self, caller, event, segmentID):
+    callback = self._segmentObservers.get(segmentID)
+    if callback:
+      callback()
+
+
+class SharedSegmentation(Segmentation):
+  """ Segmentation subclass storing its segment in the SeriesSegmentationContainer of the master volume instead of using
+  one vtkMRMLSegmentationNode per finding and series.
+  """
+
+  @classmethod
+  def load(cls, volumeNode, fileName):
+    loaded = Segmentation.load(volumeNode, fileName)
+    if not loaded:
+      return None
+    annotation = cls(volumeNode)
+    container = SeriesSegmentationContainer.getOrCreate(volumeNode)
+    annotation.segmentID = container.importSegment(loaded.mrmlNode, loaded.segmentID, volumeNode.GetName(),
+                                                   annotation._onDataModified)
+    annotation.mrmlNode = container.mrmlNode
+    annotation._initialized = True
+    annotation._modified = True
+    loaded._releaseMRMLNode()
+    loaded.mrmlNode = None
+    return annotation
+
+  def _initializeMRMLNode(self):
+    container = SeriesSegmentationContainer.getOrCreate(self._masterVolume)
+    self.segmentID = container.addSegment(self._masterVolume.GetName(), self._onDataModified)
+    self.mrmlNode = container.mrmlNode
+
+  def _observeMRMLNode(self):
+    raise ValueError("{} does not support wrapping existing nodes. Use load() instead.".format(self.__class__.__name__))
+
+  def _releaseMRMLNode(self):
+    container = SeriesSegmentationContainer.get(self._masterVolume)
+    if container:
+      container.removeSegment(self.segmentID)
+    self.segmentID = None
+
+  def setVisible(self, visible):
+    container = SeriesSegmentationContainer.get(self._masterVolume)
+    if self.mrmlNode and container:
+      container.setSegmentVisible(self.segmentID, visible)
+
+  def save(self, directory, name):
+    """ Saves only the segment of this annotation """
+    if not self.mrmlNode or not self._modified:
+      return None
+    if not os.path.exists(directory):
+      os.makedirs(directory)
+    fileName = os.path.join(directory, name + self.FILE_EXTENSION)
+    tempNode = slicer.mrmlScene.AddNewNodeByClass(self.MRML_NODE_CLASS)
+    try:
+      tempNode.SetReferenceImageGeometryParameterFromVolumeNode(self._masterVolume)
+      tempNode.GetSegmentation().CopySegmentFromSegmentation(self.mrmlNode.GetSegmentation(), self.segmentID)
+      if not slicer.util.saveNode(tempNode, fileName):
+        logging.error("Failed to save annotation to {}".format(fileName))
+        return None
+      return fileName
+    finally:
+      slicer.mrmlScene.RemoveNode(tempNode)
 
 
 class Ruler(Annotation):
-  """ Annotation subclass using vtkMRMLAnnotationRulerNode """
+  """ Annotation subclass using vtkMRMLAnnotationRulerNode
+
+  Placement is tracked by observing EndPlacementEvent of the interaction node, so that node additions of the scene
+  (e.g. while loading data or segmenting) don't need to be inspected.
+  """
 
   AnnotationStartedEvent = vtk.vtkCommand.UserEvent + 202
   AnnotationFinishedEvent = vtk.vtkCommand.UserEvent + 203
+  AnnotationCanceledEvent = vtk.vtkCommand.UserEvent + 204
 
   MRML_NODE_CLASS = "vtkMRMLAnnotationRulerNode"
+  FILE_TYPE = "AnnotationFile"
+  FILE_EXTENSION = ".acsv"
+  CREATE_ON_DEMAND = False
 
-  def __init__(self, volumeNode):
+  def __init__(self, volumeNode, mrmlNode=None):
     self._annotationLogic = slicer.modules.annotations.logic()
-    self.rulerObserverTag = None
-    super(Ruler, self).__init__(volumeNode)
+    self._interactionNode = slicer.app.applicationLogic().GetInteractionNode()
+    self._placementObserverTag = None
+    self._rulerModifiedObserverTag = None
+    self._numberOfRulersBeforePlacement = 0
+    super(Ruler, self).__init__(volumeNode, mrmlNode)
 
   def cleanup(self):
     self.stopPlaceMode()
@@ -88,42 +440,62 @@ class Ruler(Annotation):
   def _initializeMRMLNode(self):
     # TODO: give instructions to user
     self.mrmlNode = None
-    self._addRulerObserver()
     self.startPlaceMode()
-    # self.mrmlNode.AddObserver(vtkSegmentationCore.vtkSegmentation.SegmentModified, self._onRulerModified)
+
+  def _observeMRMLNode(self):
+    self._rulerModifiedObserverTag = self.mrmlNode.AddObserver(vtk.vtkCommand.ModifiedEvent, self._onRulerModified)
+
+  def _releaseMRMLNode(self):
+    if self._rulerModifiedObserverTag:
+      self.mrmlNode.RemoveObserver(self._rulerModifiedObserverTag)
+      self._rulerModifiedObserverTag = None
+    super(Ruler, self)._releaseMRMLNode()
+
+  def isPlacing(self):
+    return self._placementObserverTag is not None
 
   def startPlaceMode(self):
     """ Starting place mode (non persistent) until user has created measurement """
     mrmlScene = self._annotationLogic.GetMRMLScene()
     selectionNode = mrmlScene.GetNthNodeByClass(0, "vtkMRMLSelectionNode")
     selectionNode.SetReferenceActivePlaceNodeClassName(self.MRML_NODE_CLASS)
+    self._numberOfRulersBeforePlacement = mrmlScene.GetNumberOfNodesByClass(self.MRML_NODE_CLASS)
+    self._removePlacementObserver()
+    self._placementObserverTag = self._interactionNode.AddObserver(self._interactionNode.EndPlacementEvent,
+                                                                   self._onEndPlacement)
     self._annotationLogic.StartPlaceMode(False)
+    self.invokeEvent(self.AnnotationStartedEvent)
 
   def stopPlaceMode(self):
-    """ Stopping place mode. Observer of ruler node gets removed """
-    self._removeRulerObserver()
+    """ Stopping place mode. Observer of the interaction node gets removed """
+    if not self.isPlacing():
+      return
+    self._removePlacementObserver()
     self._annotationLogic.StopPlaceMode(True)
 
-  def _addRulerObserver(self):
-    @vtk.calldata_type(vtk.VTK_OBJECT)
-    def onNodeAdded(caller, event, calldata):
-      node = calldata
-      if isinstance(node, getattr(slicer, self.MRML_NODE_CLASS)):
-        self.mrmlNode = node
-        self._removeRulerObserver()
-        self.invokeEvent(self.AnnotationFinishedEvent)
-
-    self._removeRulerObserver()
-    self.rulerObserverTag = slicer.mrmlScene.AddObserver(slicer.vtkMRMLScene.NodeAddedEvent, onNodeAdded)
-
-  def _removeRulerObserver(self):
-    if self.rulerObserverTag:
-      self.rulerObserverTag = slicer.mrmlScene.RemoveObserver(self.rulerObserverTag)
+  def _onEndPlacement(self, caller, event):
+    self._removePlacementObserver()
+    mrmlScene = self._annotationLogic.GetMRMLScene()
+    numberOfRulers = mrmlScene.GetNumberOfNodesByClass(self.MRML_NODE_CLASS)
+    if numberOfRulers <= self._numberOfRulersBeforePlacement:
+      self.invokeEvent(self.AnnotationCanceledEvent)
+      return
+    self.mrmlNode = mrmlScene.GetNthNodeByClass(numberOfRulers - 1, self.MRML_NODE_CLASS)
+    self._modified = True
+    self._observeMRMLNode()
+    self.invokeEvent(self.AnnotationFinishedEvent)
+
+  def _removePlacementObserver(self):
+    if self._placementObserverTag:
+      self._interactionNode.RemoveObserver(self._placementObserverTag)
+      self._placementObserverTag = None
 
   def _onRulerModified(self, caller, event):
-    self.invokeEvent(self.DataChangedEvent)
+    self._onDataModified()
 
-  # TODO: add method for retrieving measurement
+  def getLength(self):
+    """ Returns the distance between both ruler end points in mm or None if the ruler has not been placed yet """
+    return self.mrmlNode.GetDistanceMeasurement() if self.hasMRMLNode() else None
 
 
 class AnnotationFactory(object):
@@ -132,6 +504,15 @@ class AnnotationFactory(object):
   ANNOTATION_CLASSES = [Segmentation, Ruler]
   """ Currently available Annotation subclasses """
 
+  @staticmethod
+  def setSharedSegmentationEnabled(enabled):
+    """ Switches between one segmentation node per finding and series (default) and one segmentation node per series
+    holding one segment per finding (SharedSegmentation)
+    """
+    segmentationClass = SharedSegmentation if enabled else Segmentation
+    AnnotationFactory.ANNOTATION_CLASSES = [segmentationClass if issubclass(c, Segmentation) else c
+                                            for c in AnnotationFactory.ANNOTATION_CLASSES]
+
   @staticmethod
   def getAnnotationClassForMRMLNodeClass(mrmlNodeClass):
     """ Returns one of the registered Annotation subclasses if mrmlNodeClass can be handled by one otherwise None
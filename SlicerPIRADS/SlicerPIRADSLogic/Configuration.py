@@ -15,3 +15,12 @@ class SlicerPIRADSConfiguration(GeneralModuleMixin):
 
     self.setSetting("Study_Assessment_Forms", config.get('Assessment Forms', 'study_schema_files'))
     self.setSetting("Patient_Assessment_Forms", config.get('Assessment Forms', 'patient_schema_files'))
+    self.setSetting("Shared_Segmentation_Per_Series",
+                    config.getboolean('Annotations', 'shared_segmentation_per_series', fallback=False))
+    self.setSetting("Tracing_Enabled", config.getboolean('Tracing', 'enabled', fallback=False))
+    self.setSetting("QIICRX_Workspace_Maximum_Size",
+                    config.getfloat('QIICRX Workspace', 'maximum_size_mb', fallback=2048))
+    self.setSetting("QIICRX_Workspace_Maximum_Age",
+                    config.getfloat('QIICRX Workspace', 'maximum_age_days', fallback=14))
+    self.setSetting("Compute_Diffusion_Maps", config.getboolean('Diffusion', 'compute_missing_maps', fallback=True))
+    self.setSetting("High_B_Value", config.getfloat('Diffusion', 'high_b_value', fallback=1400))
@@ -0,0 +1,106 @@
+import os
+import shutil
+import logging
+
+import qt
+import ctk
+import slicer
+
+from SlicerDevelopmentToolboxUtils.decorators import singleton
+
+from SlicerPIRADSCore.Workspace import hashFile
+from SlicerPIRADSLogic.Tracing import Tracer
+
+
+def storeFile(fileName, directory):
+  """ Makes fileName available in directory under a name derived from its content hash
+
+  A hard link is created if possible (same file system). Otherwise the file gets copied. Nothing is stored if a file
+  with the same content already exists in directory.
+
+  Returns:
+    str: path of the stored file
+  """
+  if not os.path.exists(directory):
+    os.makedirs(directory)
+  storedFileName = os.path.join(directory, hashFile(fileName) + os.path.splitext(fileName)[1])
+  if os.path.exists(storedFileName):
+    return storedFileName
+  try:
+    os.link(fileName, storedFileName)
+  except (OSError, AttributeError):
+    shutil.copy2(fileName, storedFileName)
+  return storedFileName
+
+
+def isWithinDirectory(fileName, directory):
+  fileName, directory = os.path.abspath(fileName), os.path.abspath(directory)
+  return os.path.commonpath([fileName, directory]) == directory
+
+
+@singleton
+class DICOMIndexingQueue(object):
+  """ Collects DICOM files generated by SlicerPIRADS (e.g. QIICRX reports) and adds them to the DICOM database at once
+
+  Files within the Slicer temporary directory are hard linked (or copied if linking is not possible) into a persistent
+  directory next to the DICOM database, named by their content hash. All other files are indexed in place. Files that
+  are already indexed by the database are skipped. Pending files are indexed FLUSH_DELAY milliseconds after the last add
+  or when calling flush.
+
+  .. code-block:: python
+
+    DICOMIndexingQueue().add(outputSRPath)
+    DICOMIndexingQueue().flush()
+  """
+
+  FLUSH_DELAY = 500
+
+  @property
+  def storageDirectory(self):
+    """ Persistent directory next to the DICOM database holding files generated in the Slicer temporary directory """
+    return os.path.join(os.path.dirname(slicer.dicomDatabase.databaseFilename), "SlicerPIRADS", "Generated")
+
+  def __init__(self):
+    self._pendingFiles = []
+    self._timer = qt.QTimer()
+    self._timer.singleShot = True
+    self._timer.interval = self.FLUSH_DELAY
+    self._timer.timeout.connect(self.flush)
+
+  def __len__(self):
+    return len(self._pendingFiles)
+
+  def add(self, fileName):
+    """ Queues fileName for indexing """
+    if fileName not in self._pendingFiles:
+      self._pendingFiles.append(fileName)
+    self._timer.start()
+
+  def getPendingFiles(self):
+    return list(self._pendingFiles)
+
+  def flush(self):
+    """ Adds all pending files to the DICOM database with a single indexer call
+
+    Returns:
+      list: indexed file names
+    """
+    self._timer.stop()
+    if not self._pendingFiles:
+      return []
+    pendingFiles, self._pendingFiles = self._pendingFiles, []
+    with Tracer().span("DICOMIndexingQueue.flush", numberOfFiles=len(pendingFiles)):
+      temporaryPath = slicer.app.temporaryPath
+      files = []
+      for fileName in pendingFiles:
+        if not os.path.exists(fileName):
+          logging.error("Cannot index '%s': file does not exist" % fileName)
+          continue
+        if isWithinDirectory(fileName, temporaryPath):
+          fileName = storeFile(fileName, self.storageDirectory)
+        if fileName not in files and not slicer.dicomDatabase.instanceForFile(fileName):
+          files.append(fileName)
+      if files:
+        indexer = ctk.ctkDICOMIndexer()
+        indexer.addListOfFiles(slicer.dicomDatabase, files, "")
+    return files
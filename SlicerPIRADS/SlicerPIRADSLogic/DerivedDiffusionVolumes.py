@@ -0,0 +1,118 @@
+import logging
+import numpy as np
+from collections import OrderedDict
+
+import vtk
+import slicer
+
+from SlicerDevelopmentToolboxUtils.decorators import singleton
+
+from SlicerPIRADSCore.DiffusionMaps import DEFAULT_HIGH_B_VALUE, computeDiffusionMaps
+from SlicerPIRADSCore.SeriesType import B_VALUES_ATTRIBUTE, DERIVED_FROM_ATTRIBUTE, HIGH_B_VALUE_THRESHOLD, \
+  SERIES_TYPE_ATTRIBUTE
+from SlicerPIRADSLogic.SeriesType import getMultiVolumeBValues
+from SlicerPIRADSLogic.Tracing import Tracer
+
+
+@singleton
+class DerivedDiffusionVolumes(object):
+  """ Computes ADC maps and high b-value images of multi b-value DWI multivolumes and splits them into one volume per
+  b-value
+
+  Derived volumes get classified as ADC, DWIb or DWI through attribute SERIES_TYPE_ATTRIBUTE and are cached as long as
+  they are part of the scene and the DWI data did not change.
+
+  .. code-block:: python
+
+    for dwi in slicer.util.getNodesByClass('vtkMRMLMultiVolumeNode'):
+      derivedVolumes = DerivedDiffusionVolumes().getDerivedVolumes(dwi)
+      adcNode, highBNode = derivedVolumes["ADC"], derivedVolumes["DWIb"]
+      b800Node = DerivedDiffusionVolumes().getBValueVolume(dwi, 800)
+  """
+
+  def __init__(self):
+    self._derivedVolumes = dict()
+    self._bValueVolumes = dict()
+
+  @staticmethod
+  def canCompute(multiVolumeNode):
+    bValues = getMultiVolumeBValues(multiVolumeNode)
+    return bValues is not None and len(set(bValues)) > 1
+
+  def getDerivedVolumes(self, multiVolumeNode, seriesTypeNames=("ADC", "DWIb"), highBValue=DEFAULT_HIGH_B_VALUE):
+    """ Returns OrderedDict mapping seriesTypeNames ('ADC' and/or 'DWIb') to volume nodes computed from
+    multiVolumeNode. Missing volumes are computed and added to the scene.
+
+    Raises:
+      ValueError: if frames of multiVolumeNode are not identified by at least two b-values
+    """
+    derivedVolumes = self._getCachedVolumes(self._derivedVolumes, multiVolumeNode, highBValue)
+    missing = [name for name in seriesTypeNames if name not in derivedVolumes]
+    if missing:
+      derivedVolumes.update(self._computeDerivedVolumes(multiVolumeNode, missing, highBValue))
+    return OrderedDict((name, derivedVolumes[name]) for name in seriesTypeNames)
+
+  def getBValueVolume(self, multiVolumeNode, bValue):
+    """ Returns volume node holding the frame of multiVolumeNode acquired with bValue. It is classified as DWIb if
+    bValue is at least HIGH_B_VALUE_THRESHOLD and as DWI otherwise. The frame is only copied on first request.
+
+    Raises:
+      ValueError: if multiVolumeNode has no frame acquired with bValue
+    """
+    bValueVolumes = self._getCachedVolumes(self._bValueVolumes, multiVolumeNode)
+    bValue = float(bValue)
+    if bValue not in bValueVolumes:
+      bValues = getMultiVolumeBValues(multiVolumeNode) or []
+      if bValue not in bValues:
+        raise ValueError("'%s' has no frame with b-value %g" % (multiVolumeNode.GetName(), bValue))
+      array = slicer.util.arrayFromVolume(multiVolumeNode)[..., bValues.index(bValue)]
+      seriesTypeName = "DWIb" if bValue >= HIGH_B_VALUE_THRESHOLD else "DWI"
+      bValueVolumes[bValue] = self._createDerivedVolume(multiVolumeNode, array.copy(), seriesTypeName, [bValue],
+                                                        "{} b{:g}".format(multiVolumeNode.GetName(), bValue))
+    return bValueVolumes[bValue]
+
+  @staticmethod
+  def _getCachedVolumes(cache, multiVolumeNode, *parameters):
+    key = (multiVolumeNode.GetID(), multiVolumeNode.GetImageData().GetMTime()) + parameters
+    if key not in cache:
+      for outdatedKey in [k for k in cache.keys() if k[0] == key[0]]:
+        del cache[outdatedKey]
+      cache[key] = dict()
+    for name, node in list(cache[key].items()):
+      if not slicer.mrmlScene.IsNodePresent(node):
+        del cache[key][name]
+    return cache[key]
+
+  def _computeDerivedVolumes(self, multiVolumeNode, seriesTypeNames, highBValue):
+    bValues = getMultiVolumeBValues(multiVolumeNode)
+    if not bValues or len(set(bValues)) < 2:
+      raise ValueError("Frames of '%s' are not identified by at least two b-values" % multiVolumeNode.GetName())
+    with Tracer().span("DerivedDiffusionVolumes: compute", numberOfBValues=len(bValues)):
+      signals = np.moveaxis(slicer.util.arrayFromVolume(multiVolumeNode), -1, 0)
+      adc, highB = computeDiffusionMaps(signals, bValues, highBValue)
+    name = multiVolumeNode.GetName()
+    maps = {
+      "ADC": (adc, None, "{} Apparent Diffusion Coefficient (computed)".format(name)),
+      "DWIb": (highB, [highBValue], "{} b{:d} (computed)".format(name, int(highBValue)))
+    }
+    logging.debug("Computed %s of '%s' from b-values %s" % (seriesTypeNames, name, bValues))
+    return {seriesTypeName: self._createDerivedVolume(multiVolumeNode, maps[seriesTypeName][0], seriesTypeName,
+                                                      *maps[seriesTypeName][1:])
+            for seriesTypeName in seriesTypeNames}
+
+  @staticmethod
+  def _createDerivedVolume(multiVolumeNode, array, seriesTypeName, bValues, name):
+    volumeNode = slicer.vtkMRMLScalarVolumeNode()
+    volumeNode.SetName(slicer.mrmlScene.GenerateUniqueName(name))
+    # attributes need to be set before adding the node, because the scene observers classify on NodeAddedEvent
+    volumeNode.SetAttribute(SERIES_TYPE_ATTRIBUTE, seriesTypeName)
+    volumeNode.SetAttribute(DERIVED_FROM_ATTRIBUTE, multiVolumeNode.GetID())
+    if bValues:
+      volumeNode.SetAttribute(B_VALUES_ATTRIBUTE, ",".join("{:g}".format(b) for b in bValues))
+    ijkToRAS = vtk.vtkMatrix4x4()
+    multiVolumeNode.GetIJKToRASMatrix(ijkToRAS)
+    volumeNode.SetIJKToRASMatrix(ijkToRAS)
+    slicer.mrmlScene.AddNode(volumeNode)
+    volumeNode.CreateDefaultDisplayNodes()
+    slicer.util.updateVolumeFromArray(volumeNode, array)
+    return volumeNode
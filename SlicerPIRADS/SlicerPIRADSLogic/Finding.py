@@ -1,52 +1,180 @@
 import vtk
+from collections import OrderedDict
+from contextlib import contextmanager
+
 from .Annotation import AnnotationFactory
 from .LesionAssessmentRules import LesionAssessmentRuleFactory
+from SlicerPIRADSCore.PIRADSAssessmentCategory import getLesionDiameter
+from SlicerPIRADSCore.ProstateSector import ProstateSectorSet
 
 from SlicerDevelopmentToolboxUtils.mixins import ParameterNodeObservationMixin
 
 
+class FindingData(object):
+  """ Plain data of a finding (name, sectors and assessment scores) without any event handling
+
+  :param name: name of the finding
+  :param sectors: ProstateSectorSet or list of sector names
+  :param scores: dictionary mapping SeriesType instances to assessment scores
+  """
+
+  __slots__ = ("name", "sectors", "scores")
+
+  def __init__(self, name, sectors=None, scores=None):
+    self.name = name
+    self.sectors = ProstateSectorSet.coerce(sectors)
+    self.scores = dict(scores) if scores else dict()
+
+  def copy(self):
+    return FindingData(self.name, self.sectors, self.scores)
+
+
 class Finding(ParameterNodeObservationMixin):
+  """ Observable finding wrapping FindingData
+
+  Events invoked between startModify() and endModify() (or within the modifying() context) are coalesced and each
+  distinct event is invoked only once when the outermost modification ends.
+
+  :param name: name of the finding
+  """
 
   DataChangedEvent = vtk.vtkCommand.UserEvent + 201
   RuleChangedEvent = vtk.vtkCommand.UserEvent + 202
   SectorSelectionChangedEvent = vtk.vtkCommand.UserEvent + 203
   AssessmentScoreChanged = vtk.vtkCommand.UserEvent + 204
+  MeasurementsChangedEvent = vtk.vtkCommand.UserEvent + 205
 
   def __init__(self, name):
-    self._name = name
+    self._data = FindingData(name)
     self._assessmentRule = None
-    self._assessmentScores = dict()
-    self._sectors = []
     self._annotations = dict()
+    self._annotationReferences = dict()
+    self._measurements = OrderedDict()
+    self._modifyCount = 0
+    self._pendingEvents = OrderedDict()
 
   def __del__(self):
     for seriesType, annotations in self._annotations.items():
       for annotation in annotations.values():
         annotation.delete()
 
+  def invokeEvent(self, event, callData=None):
+    if self._modifyCount:
+      self._pendingEvents[event] = callData
+      return
+    ParameterNodeObservationMixin.invokeEvent(self, event, callData)
+
+  def startModify(self):
+    """ Postpones all events until the matching call of endModify() """
+    self._modifyCount += 1
+
+  def endModify(self):
+    """ Invokes each event that was postponed since the outermost startModify() exactly once """
+    self._modifyCount = max(0, self._modifyCount - 1)
+    if self._modifyCount:
+      return
+    pendingEvents, self._pendingEvents = self._pendingEvents, OrderedDict()
+    for event, callData in pendingEvents.items():
+      self.invokeEvent(event, callData)
+
+  @contextmanager
+  def modifying(self):
+    """ Context manager coalescing all events invoked within its scope """
+    self.startModify()
+    try:
+      yield self
+    finally:
+      self.endModify()
+
+  def getData(self):
+    """ Returns a copy of the plain finding data """
+    return self._data.copy()
+
+  def setData(self, data, assessmentRule=None):
+    """ Replaces name, sectors and scores at once invoking each changed event only once
+
+    :param data: FindingData
+    :param assessmentRule: optional LesionAssessmentRule to use instead of determining it from the sectors
+    """
+    with self.modifying():
+      self.setName(data.name)
+      self.setSectors(data.sectors, assessmentRule)
+      for seriesType in list(self._data.scores.keys()):
+        if seriesType not in data.scores:
+          self.removeScore(seriesType)
+      for seriesType, score in data.scores.items():
+        self.setScore(seriesType, score)
+
   def setName(self, name):
-    self._name = name
+    if name == self._data.name:
+      return
+    self._data.name = name
     self.invokeEvent(self.DataChangedEvent)
 
   def getName(self):
-    return self._name
+    return self._data.name
 
   def getOrCreateAnnotation(self, seriesType, mrmlNodeClass):
     try:
       annotation = self._annotations[seriesType][mrmlNodeClass]
     except KeyError:
-      volumeNode = seriesType.getVolume()
-      annotation = AnnotationFactory.getAnnotationClassForMRMLNodeClass(mrmlNodeClass)(volumeNode)
-      annotation.addEventObserver(self.DataChangedEvent, lambda caller, event: self.invokeEvent(event))
-      if not seriesType in self._annotations:
-        self._annotations[seriesType] = dict()
-      self._annotations[seriesType][mrmlNodeClass] = annotation
+      annotation = self._loadAnnotationReference(seriesType, mrmlNodeClass)
+      if not annotation:
+        volumeNode = seriesType.getVolume()
+        annotation = AnnotationFactory.getAnnotationClassForMRMLNodeClass(mrmlNodeClass)(volumeNode)
+      self._addAnnotation(seriesType, mrmlNodeClass, annotation)
     return annotation
 
+  def _addAnnotation(self, seriesType, mrmlNodeClass, annotation):
+    annotation.addEventObserver(self.DataChangedEvent, lambda caller, event: self.invokeEvent(event))
+    if not seriesType in self._annotations:
+      self._annotations[seriesType] = dict()
+    self._annotations[seriesType][mrmlNodeClass] = annotation
+
+  def getAnnotations(self):
+    """ Returns dictionary mapping seriesType to a dictionary of mrmlNodeClass to Annotation """
+    return self._annotations
+
+  def addAnnotationReference(self, seriesType, mrmlNodeClass, fileName):
+    """ Registers a saved annotation that will be loaded not before it is requested
+
+    :param seriesType: SeriesType instance the annotation was created for
+    :param mrmlNodeClass: MRML node class of the annotation
+    :param fileName: file the annotation was saved to
+    """
+    self._annotationReferences[(seriesType, mrmlNodeClass)] = fileName
+
+  def getAnnotationReferences(self):
+    """ Returns dictionary mapping (seriesType, mrmlNodeClass) to files of annotations that have not been loaded yet """
+    return self._annotationReferences
+
+  def loadAnnotationReferences(self):
+    """ Loads all annotations that have been registered by addAnnotationReference """
+    for seriesType, mrmlNodeClass in list(self._annotationReferences.keys()):
+      annotation = self._loadAnnotationReference(seriesType, mrmlNodeClass)
+      if annotation:
+        self._addAnnotation(seriesType, mrmlNodeClass, annotation)
+
+  def _loadAnnotationReference(self, seriesType, mrmlNodeClass):
+    try:
+      fileName = self._annotationReferences.pop((seriesType, mrmlNodeClass))
+    except KeyError:
+      return None
+    annotationClass = AnnotationFactory.getAnnotationClassForMRMLNodeClass(mrmlNodeClass)
+    return annotationClass.load(seriesType.getVolume(), fileName) if annotationClass else None
+
+  def getAnnotation(self, seriesType, mrmlNodeClass):
+    """ Returns the annotation for seriesType and mrmlNodeClass without creating it. Returns None if not existing. """
+    try:
+      return self._annotations[seriesType][mrmlNodeClass]
+    except KeyError:
+      return None
+
   def deleteAnnotation(self, seriesType, mrmlNodeClass):
     try:
       annotation = self._annotations[seriesType][mrmlNodeClass]
       annotation.cleanup()
+      annotation.delete()
       del self._annotations[seriesType][mrmlNodeClass]
       if not self._annotations[seriesType]:
         del self._annotations[seriesType]
@@ -54,12 +182,30 @@ class Finding(ParameterNodeObservationMixin):
       pass
 
   def getSectors(self):
-    return self._sectors
+    """ Returns the selected sectors as ProstateSectorSet, which iterates over sector names """
+    return self._data.sectors
+
+  def setSectors(self, sectors, assessmentRule=None):
+    """ Sets sectors and the resulting assessment rule. Scores that are not part of the new pick lists get removed.
 
-  def setSectors(self, sectors):
-    self._sectors = sectors
-    self._assessmentRule = LesionAssessmentRuleFactory.getEligibleLesionAssessmentRule(sectors)
-    self.invokeEvent(self.SectorSelectionChangedEvent)
+    :param sectors: ProstateSectorSet or list of sector names
+    :param assessmentRule: optional LesionAssessmentRule to use instead of determining it from the sectors
+    """
+    sectors = ProstateSectorSet.coerce(sectors)
+    if sectors == self._data.sectors and self._assessmentRule and not assessmentRule:
+      return
+    with self.modifying():
+      self._data.sectors = sectors
+      self._assessmentRule = assessmentRule if assessmentRule else \
+        LesionAssessmentRuleFactory.getEligibleLesionAssessmentRule(sectors)
+      for seriesType, score in list(self._data.scores.items()):
+        if str(score) not in [str(s) for s in self.getPickList(seriesType)]:
+          self.removeScore(seriesType)
+      self.invokeEvent(self.SectorSelectionChangedEvent)
+
+  def overlaps(self, finding):
+    """ Returns True if this finding shares at least one prostate sector with finding """
+    return self._data.sectors.overlaps(finding.getSectors())
 
   def setAllVisible(self, visible):
     for seriesType in self._annotations.keys():
@@ -68,11 +214,14 @@ class Finding(ParameterNodeObservationMixin):
   def setSeriesTypeVisible(self, seriesType, visible):
     try:
       for annotationClass, annotation in self._annotations[seriesType].items():
-        if annotation.mrmlNode:
+        if annotation.hasMRMLNode():
           annotation.setVisible(visible)
     except KeyError:
       pass
 
+  def getAssessmentRule(self):
+    return self._assessmentRule
+
   def getPickList(self, seriesType):
     if not self._assessmentRule: # TODO: think about situations where rule is not set but sectors are...
       return []
@@ -84,24 +233,44 @@ class Finding(ParameterNodeObservationMixin):
     return self._assessmentRule.getPickListTooltip(seriesType)
 
   def setScore(self, seriesType, score):
-    self._assessmentScores[seriesType] = score
+    if self._data.scores.get(seriesType) == score:
+      return
+    self._data.scores[seriesType] = score
     self.invokeEvent(self.AssessmentScoreChanged)
 
   def getScore(self, seriesType):
-    try:
-      return self._assessmentScores[seriesType]
-    except KeyError:
-      return None
+    return self._data.scores.get(seriesType)
 
   def removeScore(self, seriesType):
     try:
-      del self._assessmentScores[seriesType]
+      del self._data.scores[seriesType]
     except KeyError:
-      pass
+      return
     self.invokeEvent(self.AssessmentScoreChanged)
 
   def getAssessmentScores(self):
-    return self._assessmentScores
+    return self._data.scores
+
+  def setMeasurements(self, measurements):
+    """ Sets the LesionMeasurements of the segmentations of this finding
+
+    :param measurements: dictionary mapping SeriesType instances to LesionMeasurement
+    """
+    measurements = OrderedDict((seriesType, measurement) for seriesType, measurement in measurements.items()
+                               if measurement.voxelCount)
+    if measurements == self._measurements:
+      return
+    self._measurements = measurements
+    self.invokeEvent(self.MeasurementsChangedEvent)
+
+  def getMeasurements(self):
+    """ Returns dictionary mapping SeriesType instances to LesionMeasurement of non empty segmentations """
+    return self._measurements
+
+  def getMaximumDiameter(self):
+    """ Returns the maximum lesion diameter in mm measured on the dominant sequence or None if not segmented """
+    return getLesionDiameter(self._assessmentRule.ZONE if self._assessmentRule else None,
+                             {seriesType: m.maximumDiameter for seriesType, m in self._measurements.items()})
 
 
 class FindingAssessment(object):
@@ -0,0 +1,135 @@
+import re
+import logging
+
+from SlicerDevelopmentToolboxUtils.mixins import ModuleLogicMixin
+
+from SlicerPIRADSLogic.Finding import Finding, FindingData
+from SlicerPIRADSLogic.LesionAssessmentRules import LesionAssessmentRuleFactory
+from SlicerPIRADSCore.ProstateSector import ProstateSectorSet
+
+
+class FindingSerializer(object):
+  """ Converts findings into the compact 'findings' section of QIICRX meta data and rebuilds them from it
+
+  A serialized finding looks like:
+
+  .. code-block:: json
+
+    {
+      "name": "Finding 1",
+      "sectors": 3,
+      "rule": "PZ",
+      "scores": [{"seriesType": "T2a", "seriesInstanceUID": "1.2...", "score": "4"}],
+      "annotations": [{"seriesType": "T2a", "seriesInstanceUID": "1.2...",
+                       "mrmlNodeClass": "vtkMRMLSegmentationNode", "fileName": "/.../Finding_1_T2a.seg.nrrd"}]
+    }
+
+  Sectors are stored as ProstateSectorSet bitmask. Series are referenced by SeriesInstanceUID with the series type name
+  as fallback. The serialized findings are stored in the generated SR (see SlicerPIRADSCore.QIICRX.addFindings).
+  """
+
+  SERIES_INSTANCE_UID = "0020,000E"
+
+  @classmethod
+  def serialize(cls, findings, annotationDirectory=None):
+    """ Returns list of dictionaries describing findings
+
+    Args:
+      findings: list of Finding instances
+      annotationDirectory: directory to save annotations to. If None, annotations will not be saved
+
+    Returns:
+      list: serialized findings
+    """
+    return [cls.serializeFinding(finding, annotationDirectory) for finding in findings]
+
+  @classmethod
+  def serializeFinding(cls, finding, annotationDirectory=None):
+    data = finding.getData()
+    rule = finding.getAssessmentRule()
+    result = {
+      "name": data.name,
+      "sectors": data.sectors.mask,
+      "scores": [dict(cls._serializeSeriesType(seriesType), score=score) for seriesType, score in data.scores.items()]
+    }
+    if rule:
+      result["rule"] = rule.ZONE
+    if annotationDirectory:
+      result["annotations"] = cls._serializeAnnotations(finding, annotationDirectory)
+    return result
+
+  @classmethod
+  def _serializeAnnotations(cls, finding, annotationDirectory):
+    annotations = []
+    prefix = re.sub(r'[^\w\-]', '_', finding.getName())
+    for seriesType, annotationsForSeriesType in finding.getAnnotations().items():
+      for mrmlNodeClass, annotation in annotationsForSeriesType.items():
+        fileName = annotation.save(annotationDirectory, "{}_{}_{}".format(prefix, seriesType.getName(),
+                                                                          mrmlNodeClass))
+        if fileName:
+          annotations.append(dict(cls._serializeSeriesType(seriesType), mrmlNodeClass=mrmlNodeClass,
+                                  fileName=fileName))
+    for (seriesType, mrmlNodeClass), fileName in finding.getAnnotationReferences().items():
+      annotations.append(dict(cls._serializeSeriesType(seriesType), mrmlNodeClass=mrmlNodeClass, fileName=fileName))
+    return annotations
+
+  @classmethod
+  def getSeriesInstanceUID(cls, volumeNode):
+    return ModuleLogicMixin.getDICOMValue(volumeNode, cls.SERIES_INSTANCE_UID)
+
+  @classmethod
+  def _serializeSeriesType(cls, seriesType):
+    return {
+      "seriesType": seriesType.getName(),
+      "seriesInstanceUID": cls.getSeriesInstanceUID(seriesType.getVolume())
+    }
+
+  @classmethod
+  def deserialize(cls, data, seriesTypes):
+    """ Rebuilds findings from serialized data in a single step per finding
+
+    Annotations are only registered as references and get loaded when requested (see
+    Finding.loadAnnotationReferences).
+
+    Args:
+      data: list of dictionaries as returned by serialize
+      seriesTypes: list of SeriesType instances of the loaded volumes
+
+    Returns:
+      list: Finding instances
+    """
+    lookup = _SeriesTypeLookup(seriesTypes, cls.getSeriesInstanceUID)
+    findings = []
+    for entry in data:
+      finding = Finding(entry["name"])
+      scores = dict()
+      for scoreEntry in entry.get("scores", []):
+        seriesType = lookup.get(scoreEntry)
+        if seriesType:
+          scores[seriesType] = scoreEntry["score"]
+      rule = LesionAssessmentRuleFactory.getLesionAssessmentRuleForZone(entry.get("rule"))
+      finding.setData(FindingData(entry["name"], ProstateSectorSet.fromMask(entry.get("sectors", 0)), scores), rule)
+      for annotationEntry in entry.get("annotations", []):
+        seriesType = lookup.get(annotationEntry)
+        if seriesType:
+          finding.addAnnotationReference(seriesType, annotationEntry["mrmlNodeClass"], annotationEntry["fileName"])
+      findings.append(finding)
+    return findings
+
+
+class _SeriesTypeLookup(object):
+
+  def __init__(self, seriesTypes, getSeriesInstanceUID):
+    self._byUID = dict()
+    self._byName = dict()
+    for seriesType in seriesTypes:
+      uid = getSeriesInstanceUID(seriesType.getVolume())
+      if uid:
+        self._byUID[uid] = seriesType
+      self._byName.setdefault(seriesType.getName(), seriesType)
+
+  def get(self, entry):
+    seriesType = self._byUID.get(entry.get("seriesInstanceUID")) or self._byName.get(entry.get("seriesType"))
+    if not seriesType:
+      logging.warning("No loaded series matches serialized series type {}".format(entry.get("seriesType")))
+    return seriesType
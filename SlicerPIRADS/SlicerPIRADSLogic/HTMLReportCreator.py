@@ -6,6 +6,7 @@ import slicer
 from SlicerDevelopmentToolboxUtils.mixins import ModuleWidgetMixin, ModuleLogicMixin
 
 from SlicerPIRADSWidgets.ProstateSectorMapDialog import ProstateSectorMapDialog
+from SlicerPIRADSWidgets.UIRegistry import UIRegistry
 
 
 class HTMLReportCreator(object):
@@ -52,8 +53,10 @@ class HTMLReportCreator(object):
       </tr>
   '''
 
-  def __init__(self, assessmentCategory):
+  def __init__(self, assessmentCategory, prostateVolume=None, psa=None):
     self._assessmentCategory = assessmentCategory
+    self._prostateVolume = prostateVolume
+    self._psa = psa
     self.patientInfo = None
 
   def generateReport(self):
@@ -75,9 +78,9 @@ class HTMLReportCreator(object):
     webbrowser.open("file:///private" + outputHTML)
 
   def getData(self):
-    data = ""
+    data = self.getProstateData()
 
-    prostateMap = ProstateSectorMapDialog()
+    prostateMap = UIRegistry().getSharedWidget("ReportProstateSectorMap", ProstateSectorMapDialog)
     prostateMap.displayCheckboxBorder(visible=False)
 
     for finding in self._assessmentCategory.getFindings():
@@ -91,10 +94,40 @@ class HTMLReportCreator(object):
           <table border=1 width='100%' cellPadding=3 cellSpacing=0>
             {1}
           </table>
+          <table border=1 width='100%' cellPadding=3 cellSpacing=0>
+            {2}
+          </table>
           <br>
         </div>
         '''.format(finding.getName(),
+                   self.getFindingData(finding),
                    "".join([self.sectorMapScreenShot.format(ModuleWidgetMixin.pixelmapAsRaw(pixmap))
                               for pixmap in prostateMap.getScreenShots()]))
 
-    return data
\ No newline at end of file
+    return data
+
+  def getFindingData(self, finding):
+    category = self._assessmentCategory.getLesionCategory(finding)
+    rows = self.infoRow.format("PI-RADS assessment category", category if category is not None else "-")
+    for seriesType, measurement in finding.getMeasurements().items():
+      for label, value in measurement.getSummary().items():
+        rows += self.infoRow.format("{} ({})".format(label, seriesType.getName()), value)
+    return rows
+
+  def getProstateData(self):
+    if not self._prostateVolume:
+      return ""
+    rows = self.infoRow.format("Gland volume ({})".format(self._prostateVolume.method),
+                               "{:.1f} ml".format(self._prostateVolume.volume))
+    psaDensity = self._prostateVolume.getPSADensity(self._psa)
+    if psaDensity is not None:
+      rows += self.infoRow.format("PSA density", "{:.2f} ng/ml<sup>2</sup>".format(psaDensity))
+    return '''
+        <div class="print-friendly">
+          <h2>Prostate</h2>
+          <table border=1 width='100%' cellPadding=3 cellSpacing=0>
+            {0}
+          </table>
+          <br>
+        </div>
+        '''.format(rows)
@@ -1,54 +1,30 @@
-from abc import ABCMeta
 import slicer
 from SlicerDevelopmentToolboxUtils.decorators import singleton
 
-from SlicerPIRADSLogic.SeriesType import *
+from SlicerPIRADSCore.HangingProtocol import *
 
 
-class HangingProtocolFactory(object):
+ADAPTIVE_LAYOUT_BASE_ID = 5300
+""" Layout ID of an adaptive layout is ADAPTIVE_LAYOUT_BASE_ID + number of views """
 
-  @staticmethod
-  def getHangingProtocol(volumeNodes):
-    if len(volumeNodes) <= 4:
-      return PIRADSHangingProtocolP1
-    elif 4 < len(volumeNodes) < 7:
-      return PIRADSHangingProtocolP2
-    else:
-      return PIRADSHangingProtocolP3
 
+def getLayout(hangingProtocol):
+  """ Returns the vtkMRMLLayoutNode layout ID of hangingProtocol """
+  return getattr(slicer.vtkMRMLLayoutNode, hangingProtocol.LAYOUT_NAME)
 
-class HangingProtocol(object):
 
-  __metaclass__ = ABCMeta
+def getAdaptiveLayout(numberOfViews):
+  """ Returns the layout ID of a grid of min(numberOfViews, MAXIMUM_NUMBER_OF_VIEWS) slice views
 
-  SERIES_TYPES = None
-  LAYOUT = None
-
-  def __init__(self, volumeNodes):
-    if not self.SERIES_TYPES or not self.LAYOUT:
-      raise NotImplementedError
-    self._volumeNodes = volumeNodes
-
-  def canHandle(self, seriesTypes):
-    pass
-
-
-class PIRADSHangingProtocolP1(HangingProtocol):
-
-  SERIES_TYPES = [T2a, ADC, DWIb, SUB]
-  LAYOUT = slicer.vtkMRMLLayoutNode.SlicerLayoutTwoOverTwoView
-
-
-class PIRADSHangingProtocolP2(HangingProtocol):
-
-  SERIES_TYPES = [T2a, T2s, T2c, ADC, DWIb, SUB]
-  LAYOUT = slicer.vtkMRMLLayoutNode.SlicerLayoutThreeOverThreeView
-
-
-class PIRADSHangingProtocolP3(HangingProtocol):
-
-  SERIES_TYPES = [T2a, T2s, T2c, ADC, DWIb, SUB, DCE] # TODO: add , "curve"]
-  LAYOUT = slicer.vtkMRMLLayoutNode.SlicerLayoutThreeByThreeSliceView
+  The layout description gets registered with the layout node on first request only. All adaptive layouts use the
+  views named by getViewNames, so view nodes and slice widgets are created once and reused when switching studies.
+  """
+  numberOfViews = min(numberOfViews, MAXIMUM_NUMBER_OF_VIEWS)
+  layoutID = ADAPTIVE_LAYOUT_BASE_ID + numberOfViews
+  layoutNode = slicer.app.layoutManager().layoutLogic().GetLayoutNode()
+  if not layoutNode.IsLayoutDescription(layoutID):
+    layoutNode.AddLayoutDescription(layoutID, createLayoutDescription(numberOfViews))
+  return layoutID
 
 
 @singleton
@@ -56,4 +32,3 @@ class FocussedSliceWidget:
 
   def __init__(self):
     pass
-
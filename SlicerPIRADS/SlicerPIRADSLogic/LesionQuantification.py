@@ -0,0 +1,249 @@
+import numpy as np
+import vtk
+import slicer
+from collections import OrderedDict
+
+from SlicerPIRADSCore.Constants import PIRADS_SIZE_THRESHOLD_MM
+from SlicerPIRADSLogic.SeriesType import ADC, T2a, VolumeSeriesTypeSceneObserver
+
+
+class LesionMeasurement(object):
+  """ Quantitative description of one lesion segment
+
+  Attributes:
+    voxelCount: number of voxels in the segment
+    volume: lesion volume in mm^3
+    maximumDiameter: maximum 3D extent in mm measured between voxel centers
+    boundingBox: ((minR, minA, minS), (maxR, maxA, maxS)) of voxel centers in RAS
+    intensities: dictionary mapping an intensity name (e.g. 'ADC') to a dictionary with 'mean' and 'median'
+  """
+
+  __slots__ = ("voxelCount", "volume", "maximumDiameter", "boundingBox", "intensities")
+
+  def __init__(self, voxelCount=0, volume=0.0, maximumDiameter=0.0, boundingBox=None, intensities=None):
+    self.voxelCount = voxelCount
+    self.volume = volume
+    self.maximumDiameter = maximumDiameter
+    self.boundingBox = boundingBox
+    self.intensities = intensities if intensities else dict()
+
+  def exceedsSizeThreshold(self, threshold=PIRADS_SIZE_THRESHOLD_MM):
+    """ Returns True if the lesion reaches the PI-RADS size threshold separating category 4 and 5 """
+    return self.maximumDiameter >= threshold
+
+  def getSummary(self):
+    """ Returns OrderedDict mapping a label to the formatted value of each measurement. Empty for empty lesions. """
+    summary = OrderedDict()
+    if not self.voxelCount:
+      return summary
+    summary["Maximum diameter"] = "{:.1f} mm{}".format(
+      self.maximumDiameter, " (>= {:g} mm)".format(PIRADS_SIZE_THRESHOLD_MM) if self.exceedsSizeThreshold() else "")
+    summary["Volume"] = "{:.2f} ml".format(self.volume / 1000.0)
+    if self.boundingBox:
+      summary["Bounding box"] = " x ".join("{:.1f}".format(maximum - minimum)
+                                           for minimum, maximum in zip(*self.boundingBox)) + " mm"
+    for name, values in self.intensities.items():
+      summary["{} mean / median".format(name)] = "{:.1f} / {:.1f}".format(values["mean"], values["median"])
+    return summary
+
+
+def cropToMask(mask):
+  """ Returns the cropped mask and the (k, j, i) offset of its first voxel, or (None, None) for empty masks """
+  nonZero = [np.flatnonzero(mask.any(axis=axes)) for axes in [(1, 2), (0, 2), (0, 1)]]
+  if any(len(indices) == 0 for indices in nonZero):
+    return None, None
+  offset = tuple(int(indices[0]) for indices in nonZero)
+  slices = tuple(slice(indices[0], indices[-1] + 1) for indices in nonZero)
+  return mask[slices], offset
+
+
+def getLineEndpoints(mask):
+  """ Returns Nx3 (k, j, i) indices of the first and the last voxel of mask on each line along i
+
+  Every voxel of mask lies between the endpoints of its line, so the convex hull of the endpoints contains the whole
+  mask and the maximum distance between endpoints equals the maximum distance between any two voxels. An affine
+  transform to RAS preserves this. The number of endpoints grows with the number of lines instead of the voxel count.
+  """
+  mask = np.asarray(mask, dtype=bool)
+  lines = mask.any(axis=2)
+  first = mask.argmax(axis=2)[lines]
+  last = mask.shape[2] - 1 - mask[:, :, ::-1].argmax(axis=2)[lines]
+  kj = np.argwhere(lines)
+  return np.vstack([np.column_stack([kj, first]), np.column_stack([kj, last])])
+
+
+def getMaximumDistance(points, tileSize=1024):
+  """ Returns the maximum euclidean distance between any two of the given Nx3 points
+
+  Pairwise squared distances are computed for tiles of tileSize x tileSize points, so memory usage is bounded by
+  tileSize^2 independently of the number of points.
+  """
+  if len(points) < 2:
+    return 0.0
+  points = np.asarray(points, dtype=np.float64)
+  points = points - points.mean(axis=0)
+  squaredNorms = (points ** 2).sum(axis=1)
+  maximum = 0.0
+  for rowStart in range(0, len(points), tileSize):
+    rows = slice(rowStart, rowStart + tileSize)
+    for columnStart in range(rowStart, len(points), tileSize):
+      columns = slice(columnStart, columnStart + tileSize)
+      squared = squaredNorms[rows, np.newaxis] + squaredNorms[np.newaxis, columns] - \
+                2.0 * points[rows].dot(points[columns].T)
+      maximum = max(maximum, float(squared.max()))
+  return float(np.sqrt(maximum))
+
+
+def transformIndices(kji, matrix):
+  """ Transforms Nx3 (k, j, i) indices with a 4x4 matrix operating on (i, j, k, 1) and returns Nx3 (x, y, z) """
+  ijk1 = np.ones((len(kji), 4))
+  ijk1[:, :3] = kji[:, ::-1]
+  return ijk1.dot(np.asarray(matrix).T)[:, :3]
+
+
+def sampleIntensities(rasPoints, array, rasToIJK):
+  """ Returns values of array (k, j, i) at the nearest voxels of rasPoints. Points outside the array are skipped. """
+  ijk = np.rint(np.hstack([rasPoints, np.ones((len(rasPoints), 1))]).dot(np.asarray(rasToIJK).T)[:, :3]).astype(int)
+  shape = np.array(array.shape[::-1])
+  valid = np.all((ijk >= 0) & (ijk < shape), axis=1)
+  ijk = ijk[valid]
+  return array[ijk[:, 2], ijk[:, 1], ijk[:, 0]]
+
+
+def computeLesionMeasurement(mask, ijkToRAS, intensityArrays=None):
+  """ Computes a LesionMeasurement from a binary mask in a single vectorized pass
+
+  Args:
+    mask: 3D numpy array indexed (k, j, i); non zero voxels belong to the lesion
+    ijkToRAS: 4x4 matrix mapping (i, j, k, 1) of mask to RAS
+    intensityArrays: optional dictionary mapping a name to (array, rasToIJK) of volumes to sample
+
+  Returns:
+    LesionMeasurement
+  """
+  cropped, offset = cropToMask(np.asarray(mask) != 0)
+  if cropped is None:
+    return LesionMeasurement()
+  ijkToRAS = np.asarray(ijkToRAS, dtype=np.float64).dot(_translation(offset[::-1]))
+
+  voxelVolume = abs(np.linalg.det(ijkToRAS[:3, :3]))
+  lesionKJI = np.argwhere(cropped)
+  lesionRAS = transformIndices(lesionKJI, ijkToRAS)
+  endpointRAS = transformIndices(getLineEndpoints(cropped), ijkToRAS)
+
+  intensities = OrderedDict()
+  for name, (array, rasToIJK) in (intensityArrays or {}).items():
+    values = sampleIntensities(lesionRAS, array, rasToIJK)
+    if len(values):
+      intensities[name] = {"mean": float(values.mean()), "median": float(np.median(values))}
+
+  return LesionMeasurement(voxelCount=len(lesionKJI),
+                           volume=float(len(lesionKJI) * voxelVolume),
+                           maximumDiameter=getMaximumDistance(endpointRAS),
+                           boundingBox=(tuple(lesionRAS.min(axis=0)), tuple(lesionRAS.max(axis=0))),
+                           intensities=intensities)
+
+
+def _translation(ijk):
+  matrix = np.identity(4)
+  matrix[:3, 3] = ijk
+  return matrix
+
+
+def arrayFromVTKMatrix(vtkMatrix):
+  return np.array([[vtkMatrix.GetElement(row, col) for col in range(4)] for row in range(4)])
+
+
+class LesionQuantifier(object):
+  """ Computes LesionMeasurements for the segmentations of findings
+
+  Each segment is quantified once per series using the cropped binary labelmap of the segment. Results are cached until
+  the segment's labelmap or one of the sampled volumes gets modified.
+  """
+
+  INTENSITY_SERIES_TYPES = OrderedDict([("ADC", ADC), ("T2", T2a)])
+  """ Series types whose intensities get sampled within each lesion """
+
+  def __init__(self):
+    self._cache = dict()
+
+  def reset(self):
+    self._cache = dict()
+
+  def quantifyFinding(self, finding):
+    """ Returns dictionary mapping each seriesType with a segmentation of finding to its LesionMeasurement """
+    measurements = OrderedDict()
+    for seriesType, annotations in finding.getAnnotations().items():
+      annotation = annotations.get("vtkMRMLSegmentationNode")
+      if annotation and annotation.hasMRMLNode() and annotation.segmentID:
+        measurements[seriesType] = self.quantifySegment(annotation.mrmlNode, annotation.segmentID)
+    return measurements
+
+  def quantifySegment(self, segmentationNode, segmentID):
+    """ Returns LesionMeasurement of segmentID. Cached results are returned if nothing changed since. """
+    intensityVolumes = self.getIntensityVolumes()
+    key = (segmentationNode.GetID(), segmentID)
+    version = (self.getSegmentMTime(segmentationNode, segmentID),
+               tuple((name, v.GetID(), v.GetMTime()) for name, v in intensityVolumes.items()))
+    try:
+      cachedVersion, measurement = self._cache[key]
+      if cachedVersion == version:
+        return measurement
+    except KeyError:
+      pass
+
+    mask, ijkToRAS = self.getSegmentMask(segmentationNode, segmentID)
+    if mask is None:
+      measurement = LesionMeasurement()
+    else:
+      intensityArrays = OrderedDict()
+      for name, volumeNode in intensityVolumes.items():
+        array = slicer.util.arrayFromVolume(volumeNode)
+        if array.ndim == 3:
+          matrix = vtk.vtkMatrix4x4()
+          volumeNode.GetRASToIJKMatrix(matrix)
+          intensityArrays[name] = (array, arrayFromVTKMatrix(matrix))
+      measurement = computeLesionMeasurement(mask, ijkToRAS, intensityArrays)
+    self._cache[key] = (version, measurement)
+    return measurement
+
+  @staticmethod
+  def getSegmentMask(segmentationNode, segmentID):
+    """ Returns the binary labelmap of segmentID cropped to its extent as (k, j, i) array and its IJK to RAS matrix """
+    import vtkSegmentationCorePython as vtkSegmentationCore
+    from vtk.util import numpy_support
+    labelmap = vtkSegmentationCore.vtkOrientedImageData()
+    slicer.vtkSlicerSegmentationsModuleLogic.GetSegmentBinaryLabelmapRepresentation(segmentationNode, segmentID,
+                                                                                    labelmap)
+    extent = labelmap.GetExtent()
+    scalars = labelmap.GetPointData().GetScalars()
+    if scalars is None or extent[1] < extent[0] or extent[3] < extent[2] or extent[5] < extent[4]:
+      return None, None
+    dimensions = labelmap.GetDimensions()
+    mask = numpy_support.vtk_to_numpy(scalars).reshape(dimensions[::-1])
+    matrix = vtk.vtkMatrix4x4()
+    labelmap.GetImageToWorldMatrix(matrix)
+    return mask, arrayFromVTKMatrix(matrix).dot(_translation((extent[0], extent[2], extent[4])))
+
+  @staticmethod
+  def getSegmentMTime(segmentationNode, segmentID):
+    """ Returns modification time of the binary labelmap of segmentID or None if not existing """
+    import vtkSegmentationCorePython as vtkSegmentationCore
+    segment = segmentationNode.GetSegmentation().GetSegment(segmentID)
+    if not segment:
+      return None
+    representation = segment.GetRepresentation(
+      vtkSegmentationCore.vtkSegmentationConverter.GetSegmentationBinaryLabelmapRepresentationName())
+    return representation.GetMTime() if representation else None
+
+  @classmethod
+  def getIntensityVolumes(cls):
+    """ Returns dictionary mapping the names of INTENSITY_SERIES_TYPES to the first loaded volume of that type """
+    volumes = OrderedDict()
+    volumeSeriesTypes = VolumeSeriesTypeSceneObserver().volumeSeriesTypes
+    for name, seriesTypeClass in cls.INTENSITY_SERIES_TYPES.items():
+      for volume, seriesType in volumeSeriesTypes.items():
+        if isinstance(seriesType, seriesTypeClass):
+          volumes[name] = volume
+          break
+    return volumes
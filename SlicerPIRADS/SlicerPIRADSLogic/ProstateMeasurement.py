@@ -0,0 +1,136 @@
+import math
+import numpy as np
+
+from SlicerPIRADSLogic.LesionQuantification import LesionQuantifier
+
+
+class ProstateVolume(object):
+  """ Result of a prostate gland volume measurement
+
+  Attributes:
+    method: LINEAR for the ellipsoid formula applied to three rulers or VOLUMETRIC for a gland segmentation
+    volume: gland volume in ml
+    dimensions: ruler lengths in mm (LINEAR only)
+  """
+
+  LINEAR = "Linear"
+  VOLUMETRIC = "Volumetric"
+
+  __slots__ = ("method", "volume", "dimensions")
+
+  def __init__(self, method, volume, dimensions=None):
+    self.method = method
+    self.volume = volume
+    self.dimensions = dimensions if dimensions else ()
+
+  def getPSADensity(self, psa):
+    """ Returns PSA density in ng/ml^2 for the given PSA value in ng/ml """
+    return calculatePSADensity(psa, self.volume)
+
+  def toDict(self, psa=None):
+    """ Returns the measurement as JSON serializable dictionary including PSA and PSA density if psa is given """
+    return {"method": self.method,
+            "volume": self.volume,
+            "dimensions": list(self.dimensions),
+            "psa": psa,
+            "psaDensity": self.getPSADensity(psa)}
+
+  @classmethod
+  def fromDict(cls, data):
+    """ Returns ProstateVolume from a dictionary created by toDict or None if data is empty """
+    if not data:
+      return None
+    return cls(data["method"], data["volume"], tuple(data.get("dimensions", ())))
+
+
+def calculateEllipsoidVolume(length, width, height):
+  """ Returns pi/6 * length * width * height which is the volume of an ellipsoid with the given diameters """
+  return math.pi / 6.0 * length * width * height
+
+
+def calculatePSADensity(psa, glandVolume):
+  """ Returns psa (ng/ml) divided by glandVolume (ml) or None if either of them is missing """
+  if psa is None or not glandVolume:
+    return None
+  return float(psa) / glandVolume
+
+
+def getRulerLength(rulerNode):
+  """ Returns the distance between both end points of a vtkMRMLAnnotationRulerNode in world coordinates """
+  endPoints = np.zeros((2, 4))
+  rulerNode.GetPositionWorldCoordinates1(endPoints[0])
+  rulerNode.GetPositionWorldCoordinates2(endPoints[1])
+  return float(np.linalg.norm(endPoints[0, :3] - endPoints[1, :3]))
+
+
+def findPSAValue(data):
+  """ Returns the last PSA value found in (nested) assessment form data or None """
+  for key, value in data.items():
+    if isinstance(value, dict):
+      psa = findPSAValue(value)
+      if psa is not None:
+        return psa
+    elif key.startswith("PSA last value") and value not in (None, ""):
+      try:
+        return float(value)
+      except (TypeError, ValueError):
+        return None
+  return None
+
+
+class ProstateVolumeCalculator(object):
+  """ Computes prostate gland volumes from three orthogonal rulers or from a gland segmentation
+
+  Results are cached per set of nodes and only get recomputed after one of the nodes was modified.
+  """
+
+  def __init__(self):
+    self._cache = dict()
+
+  def reset(self):
+    self._cache = dict()
+
+  def calculateFromRulers(self, rulerNodes):
+    """ Returns ProstateVolume using the ellipsoid formula
+
+    :param rulerNodes: three vtkMRMLAnnotationRulerNodes placed on axial, sagittal and coronal views
+    :return: ProstateVolume or None if not exactly three rulers were passed
+    """
+    rulerNodes = [node for node in rulerNodes if node]
+    if len(rulerNodes) != 3:
+      return None
+
+    def compute():
+      dimensions = tuple(getRulerLength(node) for node in rulerNodes)
+      return ProstateVolume(ProstateVolume.LINEAR, calculateEllipsoidVolume(*dimensions) / 1000.0, dimensions)
+
+    return self._getOrCompute(tuple(node.GetID() for node in rulerNodes),
+                              tuple(node.GetMTime() for node in rulerNodes), compute)
+
+  def calculateFromSegmentation(self, segmentationNode, segmentID):
+    """ Returns ProstateVolume by counting the voxels of the gland segment
+
+    :param segmentationNode: vtkMRMLSegmentationNode holding the gland segment
+    :param segmentID: ID of the gland segment
+    :return: ProstateVolume
+    """
+    def compute():
+      mask, ijkToRAS = LesionQuantifier.getSegmentMask(segmentationNode, segmentID)
+      if mask is None:
+        return ProstateVolume(ProstateVolume.VOLUMETRIC, 0.0)
+      voxelVolume = abs(np.linalg.det(ijkToRAS[:3, :3]))
+      return ProstateVolume(ProstateVolume.VOLUMETRIC, np.count_nonzero(mask) * voxelVolume / 1000.0)
+
+    return self._getOrCompute((segmentationNode.GetID(), segmentID),
+                              LesionQuantifier.getSegmentMTime(segmentationNode, segmentID), compute)
+
+  def _getOrCompute(self, key, version, compute):
+    try:
+      cachedVersion, result = self._cache[key]
+      if cachedVersion == version:
+        return result
+    except KeyError:
+      pass
+    result = compute()
+    self._cache[key] = (version, result)
+    return result
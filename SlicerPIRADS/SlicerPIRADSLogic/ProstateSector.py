@@ -0,0 +1 @@
+from SlicerPIRADSCore.ProstateSector import *
@@ -0,0 +1,275 @@
+import qt
+import vtk
+import numpy as np
+from collections import OrderedDict
+
+from SlicerDevelopmentToolboxUtils.mixins import ParameterNodeObservationMixin
+
+from SlicerPIRADSLogic.LesionQuantification import transformIndices, sampleIntensities, arrayFromVTKMatrix
+
+
+class SegmentStatistics(object):
+  """ Running voxel count and intensity sums of one segment
+
+  Attributes:
+    voxelCount: number of voxels in the segment
+    voxelVolume: volume of a single voxel in mm^3
+    intensitySums: dictionary mapping an intensity name (e.g. 'ADC') to the sum of sampled intensities
+    intensityCounts: dictionary mapping an intensity name to the number of sampled voxels
+  """
+
+  __slots__ = ("voxelCount", "voxelVolume", "intensitySums", "intensityCounts")
+
+  def __init__(self, voxelVolume=0.0):
+    self.voxelCount = 0
+    self.voxelVolume = voxelVolume
+    self.intensitySums = OrderedDict()
+    self.intensityCounts = OrderedDict()
+
+  @property
+  def volume(self):
+    """ Segment volume in mm^3 """
+    return self.voxelCount * self.voxelVolume
+
+  def getMeanIntensity(self, name):
+    """ Returns mean intensity of name or None if no voxel was sampled """
+    count = self.intensityCounts.get(name, 0)
+    return self.intensitySums[name] / count if count else None
+
+  def add(self, name, values, sign=1):
+    """ Adds (sign=1) or subtracts (sign=-1) sampled intensity values of name """
+    self.intensitySums[name] = self.intensitySums.get(name, 0.0) + sign * float(np.sum(values, dtype=np.float64))
+    self.intensityCounts[name] = self.intensityCounts.get(name, 0) + sign * len(values)
+
+
+def getExtentRegion(modifiedExtent, extent):
+  """ Returns the (k, j, i) slices of modifiedExtent within an array covering extent
+
+  Both extents are VTK extents (iMin, iMax, jMin, jMax, kMin, kMax). modifiedExtent gets clipped to extent. Returns None
+  if the extents do not intersect.
+  """
+  region = []
+  for axis in [2, 1, 0]:
+    start = max(modifiedExtent[2 * axis], extent[2 * axis])
+    stop = min(modifiedExtent[2 * axis + 1], extent[2 * axis + 1])
+    if stop < start:
+      return None
+    region.append(slice(start - extent[2 * axis], stop - extent[2 * axis] + 1))
+  return tuple(region)
+
+
+def getExtentUnion(extent, otherExtent):
+  """ Returns the smallest VTK extent containing both extents. None stands for an empty extent. """
+  if extent is None or otherExtent is None:
+    return otherExtent if extent is None else extent
+  return tuple(min(extent[i], otherExtent[i]) if i % 2 == 0 else max(extent[i], otherExtent[i]) for i in range(6))
+
+
+def updateMaskInRegion(mask, regionMask, region):
+  """ Replaces the voxels of mask within region by regionMask and returns the voxels that were added and removed
+
+  Only voxels within region get compared, so the cost depends on the size of region instead of the size of mask.
+
+  Args:
+    mask: boolean (k, j, i) array that gets updated in place
+    regionMask: boolean array with the shape of mask[region]
+    region: tuple of (k, j, i) slices with explicit start
+
+  Returns:
+    tuple: Nx3 (k, j, i) indices of added voxels, Mx3 (k, j, i) indices of removed voxels
+  """
+  previous = mask[region]
+  changed = previous ^ regionMask
+  start = [s.start for s in region]
+  added = np.argwhere(changed & regionMask) + start
+  removed = np.argwhere(changed & previous) + start
+  mask[region] = regionMask
+  return added, removed
+
+
+class SegmentStatisticsTracker(ParameterNodeObservationMixin):
+  """ Keeps SegmentStatistics of one segment up to date while it gets edited
+
+  The tracker keeps a copy of the segment mask and accumulates a dirty extent of the labelmap. Callers that know what
+  they modified report it by addModifiedExtent(). For modifications by the slice based segment editor effects
+  (EDITOR_SLICE_EFFECTS) the dirty extent is the slab of the labelmap intersecting the slice under the cursor. Once the
+  debounce interval passed without further modifications only the dirty extent gets compared and sampled, so the cost
+  of an update depends on the size of the edited region instead of the size of the labelmap. Modifications of unknown
+  extent (e.g. undo or other effects) and changes of the labelmap geometry compare the whole labelmap.
+  StatisticsChangedEvent is invoked after each update that changed the statistics.
+
+  :param segmentationNode: vtkMRMLSegmentationNode holding the segment
+  :param segmentID: ID of the tracked segment
+  :param intensityVolumes: optional dictionary mapping an intensity name (e.g. 'ADC') to a scalar volume node
+  :param debounceInterval: milliseconds to wait for further modifications before updating
+  """
+
+  StatisticsChangedEvent = vtk.vtkCommand.UserEvent + 301
+
+  DEFAULT_DEBOUNCE_INTERVAL = 10
+
+  EDITOR_SLICE_EFFECTS = ["Paint", "Erase", "Draw"]
+  """ Segment editor effects that only modify the labelmap around the slice they are applied on """
+
+  @property
+  def statistics(self):
+    return self._statistics
+
+  def __init__(self, segmentationNode, segmentID, intensityVolumes=None, debounceInterval=DEFAULT_DEBOUNCE_INTERVAL):
+    import vtkSegmentationCorePython as vtkSegmentationCore
+    self.segmentationNode = segmentationNode
+    self.segmentID = segmentID
+    self._intensityVolumes = intensityVolumes if intensityVolumes else OrderedDict()
+    self._statistics = SegmentStatistics()
+    self._labelmap = None
+    self._extent = None
+    self._imageToWorld = None
+    self._mask = None
+    self._dirtyExtent = None
+    self._fullUpdateRequired = True
+    self._timer = qt.QTimer()
+    self._timer.singleShot = True
+    self._timer.interval = debounceInterval
+    self._timer.timeout.connect(self.update)
+    self._segmentModifiedObserver = segmentationNode.AddObserver(vtkSegmentationCore.vtkSegmentation.SegmentModified,
+                                                                 self._onSegmentModified)
+    self._timer.start()
+
+  def cleanup(self):
+    """ Stops observing the segmentation node """
+    self._timer.stop()
+    if self._segmentModifiedObserver:
+      self.segmentationNode.RemoveObserver(self._segmentModifiedObserver)
+      self._segmentModifiedObserver = None
+
+  def isTracking(self, segmentationNode, segmentID):
+    return self.segmentationNode is segmentationNode and self.segmentID == segmentID
+
+  def addModifiedExtent(self, extent):
+    """ Marks a region of the labelmap as modified and schedules an update
+
+    :param extent: modified VTK extent (iMin, iMax, jMin, jMax, kMin, kMax) in the labelmap index space or None if the
+      modified region is unknown
+    """
+    if extent is None:
+      self._fullUpdateRequired = True
+    else:
+      self._dirtyExtent = getExtentUnion(self._dirtyExtent, extent)
+    self._timer.start()
+
+  @vtk.calldata_type(vtk.VTK_STRING)
+  def _onSegmentModified(self, caller, event, segmentID):
+    if segmentID == self.segmentID:
+      self.addModifiedExtent(self._getEditedExtent())
+
+  def update(self):
+    """ Applies all modifications since the last update to the statistics and invokes StatisticsChangedEvent """
+    self._timer.stop()
+    dirtyExtent, self._dirtyExtent = self._dirtyExtent, None
+    fullUpdateRequired, self._fullUpdateRequired = self._fullUpdateRequired, False
+    labelmap, array, imageToWorld, labelValue = self._getLabelmap()
+    if labelmap is None:
+      if self._mask is not None:
+        self._labelmap, self._extent, self._mask = None, None, None
+        self._statistics = SegmentStatistics(self._statistics.voxelVolume)
+        self.invokeEvent(self.StatisticsChangedEvent)
+      return
+
+    extent = labelmap.GetExtent()
+    if self._mask is None or labelmap is not self._labelmap or extent != self._extent or \
+       not np.array_equal(imageToWorld, self._imageToWorld):
+      # new labelmap or geometry: everything has to be sampled again
+      self._statistics = SegmentStatistics(abs(np.linalg.det(imageToWorld[:3, :3])))
+      self._labelmap, self._extent, self._imageToWorld = labelmap, extent, imageToWorld
+      self._mask = np.zeros(array.shape, dtype=bool)
+      fullUpdateRequired = True
+    if fullUpdateRequired:
+      dirtyExtent = extent
+    region = getExtentRegion(dirtyExtent, extent) if dirtyExtent else None
+    if region is None:
+      return
+
+    # labelmaps might be shared between segments, each one using its own label value
+    regionMask = array[region] == labelValue if labelValue is not None else array[region] != 0
+    added, removed = updateMaskInRegion(self._mask, regionMask, region)
+    if not fullUpdateRequired and not len(added) and not len(removed):
+      return
+    origin = (extent[4], extent[2], extent[0])
+    self._statistics.voxelCount += len(added) - len(removed)
+    self._updateIntensities(added + origin, 1)
+    self._updateIntensities(removed + origin, -1)
+    self.invokeEvent(self.StatisticsChangedEvent)
+
+  def _updateIntensities(self, kji, sign):
+    if not len(kji):
+      return
+    import slicer
+    ras = transformIndices(kji, self._imageToWorld)
+    for name, volumeNode in self._intensityVolumes.items():
+      array = slicer.util.arrayFromVolume(volumeNode)
+      if array.ndim != 3:
+        continue
+      matrix = vtk.vtkMatrix4x4()
+      volumeNode.GetRASToIJKMatrix(matrix)
+      self._statistics.add(name, sampleIntensities(ras, array, arrayFromVTKMatrix(matrix)), sign)
+
+  def _getBinaryLabelmap(self):
+    import vtkSegmentationCorePython as vtkSegmentationCore
+    segment = self.segmentationNode.GetSegmentation().GetSegment(self.segmentID)
+    if not segment:
+      return None, None
+    labelmap = segment.GetRepresentation(
+      vtkSegmentationCore.vtkSegmentationConverter.GetSegmentationBinaryLabelmapRepresentationName())
+    return segment, labelmap
+
+  def _getLabelmap(self):
+    """ Returns the binary labelmap of the segment, its scalars as (k, j, i) array, its image to world matrix and the
+    label value of the segment. The labelmap is accessed without copying it.
+    """
+    from vtk.util import numpy_support
+    segment, labelmap = self._getBinaryLabelmap()
+    scalars = labelmap.GetPointData().GetScalars() if labelmap else None
+    if scalars is None:
+      return None, None, None, None
+    matrix = vtk.vtkMatrix4x4()
+    labelmap.GetImageToWorldMatrix(matrix)
+    array = numpy_support.vtk_to_numpy(scalars).reshape(labelmap.GetDimensions()[::-1])
+    labelValue = segment.GetLabelValue() if hasattr(segment, "GetLabelValue") else None
+    return labelmap, array, arrayFromVTKMatrix(matrix), labelValue
+
+  def _getEditedExtent(self):
+    """ Returns the labelmap extent an editor slice effect might have modified on the slice view under the cursor
+
+    The extent covers the whole labelmap within the slice plane and the brush radius of sphere brushes perpendicular to
+    it. Returns None if the modified region cannot be determined, e.g. for other effects or oblique slices.
+    """
+    import slicer
+    editorNode = slicer.mrmlScene.GetSingletonNode("SegmentEditor", "vtkMRMLSegmentEditorNode")
+    if not editorNode or editorNode.GetActiveEffectName() not in self.EDITOR_SLICE_EFFECTS:
+      return None
+    crosshairNode = slicer.mrmlScene.GetFirstNodeByClass("vtkMRMLCrosshairNode")
+    sliceNode = crosshairNode.GetCursorPositionXYZ([0.0] * 3) if crosshairNode else None
+    _, labelmap = self._getBinaryLabelmap()
+    if not sliceNode or not labelmap or labelmap is not self._labelmap:
+      return None
+
+    sliceToIJK = np.linalg.inv(self._imageToWorld).dot(arrayFromVTKMatrix(sliceNode.GetSliceToRAS()))
+    normal = sliceToIJK[:3, 2] / np.linalg.norm(sliceToIJK[:3, 2])
+    axis = int(np.argmax(np.abs(normal)))
+    if abs(normal[axis]) < 1.0 - 1e-6:
+      return None
+    radius = 0.0
+    if editorNode.GetActiveEffectName() != "Draw" and editorNode.GetAttribute("BrushSphere") in ("1", "true"):
+      try:
+        if editorNode.GetAttribute("BrushDiameterIsRelative") in ("1", "true"):
+          diameter = float(editorNode.GetAttribute("BrushRelativeDiameter")) * sliceNode.GetFieldOfView()[0] / 100.0
+        else:
+          diameter = float(editorNode.GetAttribute("BrushAbsoluteDiameter"))
+      except (TypeError, ValueError):
+        return None
+      radius = diameter / 2.0 / np.linalg.norm(self._imageToWorld[:3, axis])
+    center = sliceToIJK[axis, 3]
+    extent = list(self._extent)
+    extent[2 * axis] = int(np.floor(center - radius)) - 1
+    extent[2 * axis + 1] = int(np.ceil(center + radius)) + 1
+    return tuple(extent)
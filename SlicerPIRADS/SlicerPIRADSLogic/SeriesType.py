@@ -1,7 +1,4 @@
-from abc import ABCMeta
-import os
-import re
-import pydicom
+import qt
 import vtk
 import slicer
 from collections import OrderedDict
@@ -9,138 +6,20 @@ from collections import OrderedDict
 from SlicerDevelopmentToolboxUtils.mixins import ParameterNodeObservationMixin
 from SlicerDevelopmentToolboxUtils.decorators import singleton
 
+from SlicerPIRADSCore.DICOMDatabaseQueries import getFilesForInstances
+from SlicerPIRADSCore.SeriesType import *
 
-class SeriesType(object):
 
-  __metaclass__ = ABCMeta
-
-  @classmethod
-  def canHandle(cls, obj):
-    if type(obj) is str:
-      assert os.path.exists(obj)
-      return cls.canHandleFile(obj)
-    else:
-      #TODO: check if volumeNode
-      return cls.canHandleVolumeNode(obj)
-
-  @classmethod
-  def getName(cls):
-    return cls.__name__
-
-  @classmethod
-  def canHandleFile(cls, filename):
-    try:
-      # TODO: if is imported in DICOMDatabase, use database mechanism for checking tag else use dicom
-      dataset = pydicom.read_file(filename)
-      return cls.hasEligibleDescription(dataset.SeriesDescription.lower())
-    except AttributeError:
-      return False
-
-  @classmethod
-  def canHandleVolumeNode(cls, volumeNode):
-    description = volumeNode.GetName().lower()
-    return cls.hasEligibleDescription(description)
-
-  @classmethod
-  def hasEligibleDescription(cls, description):
-    raise NotImplementedError
-
-  def __init__(self, volume):
-    self._volume = volume
-
-  def getVolume(self):
-    return self._volume
-
-
-class T2BasedSeriesType(SeriesType):
-
-  @classmethod
-  def hasEligibleDescription(cls, description):
-    return 't2' in description
-
-
-class DiffusionBasedSeriesType(SeriesType):
-  pass
-
-
-class DCEBasedSeriesType(SeriesType):
-  pass
-
-
-class T1a(SeriesType):
-
-  @classmethod
-  def hasEligibleDescription(cls, description):
-    return all(term in description for term in ['ax', 't1'])
-
-
-class T2a(T2BasedSeriesType):
-
-  @classmethod
-  def hasEligibleDescription(cls, description):
-    return T2BasedSeriesType.hasEligibleDescription(description) and 'ax' in description
-
-
-class T2s(T2BasedSeriesType):
-
-  @classmethod
-  def hasEligibleDescription(cls, description):
-    return T2BasedSeriesType.hasEligibleDescription(description) and 'sag' in description
-
-
-class T2c(T2BasedSeriesType):
-
-  @classmethod
-  def hasEligibleDescription(cls, description):
-    return T2BasedSeriesType.hasEligibleDescription(description) and 'cor' in description
-
-
-class ADC(DiffusionBasedSeriesType):
-
-  @classmethod
-  def hasEligibleDescription(cls, description):
-    return 'apparent diffusion coeff' in description
-
-
-class DWIb(DiffusionBasedSeriesType):
-  # TODO: need more rules especially regarding b-values
-
-  @classmethod
-  def hasEligibleDescription(cls, description):
-    return re.search(r'dwi', description)
-
-
-class DWI(DiffusionBasedSeriesType):
-  # TODO: need more rules
-
-  @classmethod
-  def hasEligibleDescription(cls, description):
-    return re.search(r'dwi', description)
-
-
-class DCE(DCEBasedSeriesType):
-
-  @classmethod
-  def hasEligibleDescription(cls, description):
-    return any(re.search(term, description) for term in [r'ax dynamic', r'3d dce'])
-
-
-class SUB(DCEBasedSeriesType):
-
-  @classmethod
-  def hasEligibleDescription(cls, description):
-    return re.search(r'[a-zA-Z]', description) is None
-
-
-class SeriesTypeFactory(object):
-
-  SERIES_TYPE_CLASSES = [T1a, T2a, T2s, T2c, ADC, DWI, DWIb, SUB, DCE]
-
-  @staticmethod
-  def getSeriesType(obj):
-    for seriesTypeClass in SeriesTypeFactory.SERIES_TYPE_CLASSES:
-      if seriesTypeClass.canHandle(obj):
-        return seriesTypeClass
+def getMultiVolumeBValues(multiVolumeNode):
+  """ Returns list of b-values of a DWI multivolume (one per frame) or None if its frames are not identified by b-value
+  """
+  tagName = multiVolumeNode.GetAttribute("MultiVolume.FrameIdentifyingDICOMTagName") or ""
+  frameLabels = multiVolumeNode.GetAttribute("MultiVolume.FrameLabels")
+  if "bvalue" not in tagName.replace("-", "").replace("_", "").lower() or not frameLabels:
+    return None
+  try:
+    return [float(label) for label in frameLabels.split(",")]
+  except ValueError:
     return None
 
 
@@ -148,6 +27,9 @@ class SeriesTypeFactory(object):
 class VolumeSeriesTypeSceneObserver(ParameterNodeObservationMixin):
   """ This class keeps track of all volume nodes that have been added to the mrmlScene classifying each one with a
       a SeriesType if possible
+
+      B-values of volumes with a DWI description are taken from the frame labels of multivolumes, from attribute
+      B_VALUES_ATTRIBUTE of computed volumes or else read from the DICOM files once per loaded series.
   """
 
   @property
@@ -156,6 +38,7 @@ class VolumeSeriesTypeSceneObserver(ParameterNodeObservationMixin):
 
   def __init__(self):
     self._volumeSeriesTypes = dict()
+    self._bValues = dict()
     self._nodeAddedObserver = slicer.mrmlScene.AddObserver(slicer.mrmlScene.NodeAddedEvent,
                                                            self._onVolumeNodeAdded)
     self._nodeRemovedObserver = slicer.mrmlScene.AddObserver(slicer.mrmlScene.NodeRemovedEvent,
@@ -175,18 +58,45 @@ class VolumeSeriesTypeSceneObserver(ParameterNodeObservationMixin):
       try:
         self._volumeSeriesTypes[volume]
       except KeyError:
-        seriesTypeClass = SeriesTypeFactory.getSeriesType(volume)
-        if seriesTypeClass:
-          seriesType = seriesTypeClass(volume)
-          self._volumeSeriesTypes[volume] = seriesType
+        self._classify(volume)
+
+  def getBValues(self, volume):
+    """ Returns sorted list of distinct b-values of volume or None if unknown or volume is no DWI """
+    if not DWI.hasEligibleDescription(volume.GetName().lower()) and not volume.GetAttribute(B_VALUES_ATTRIBUTE):
+      return None
+    if volume.GetAttribute(B_VALUES_ATTRIBUTE):
+      return sorted(set(float(b) for b in volume.GetAttribute(B_VALUES_ATTRIBUTE).split(",")))
+    if volume.IsA('vtkMRMLMultiVolumeNode'):
+      bValues = getMultiVolumeBValues(volume)
+      return sorted(set(bValues)) if bValues else None
+    instanceUIDs = volume.GetAttribute("DICOM.instanceUIDs")
+    if not instanceUIDs or not slicer.dicomDatabase:
+      return None
+    try:
+      return self._bValues[instanceUIDs]
+    except KeyError:
+      files = getFilesForInstances(slicer.dicomDatabase, instanceUIDs.split(" ")).values()
+      bValues = self._bValues[instanceUIDs] = readBValues([f for f in files if f])
+      return bValues
+
+  def _classify(self, volume):
+    bValues = self.getBValues(volume)
+    seriesTypeClass = SeriesTypeFactory.getSeriesType(volume, bValues)
+    if seriesTypeClass:
+      self._volumeSeriesTypes[volume] = seriesTypeClass(volume, bValues)
+
+  def _reclassify(self, volume):
+    if slicer.mrmlScene.IsNodePresent(volume):
+      self._volumeSeriesTypes.pop(volume, None)
+      self._classify(volume)
 
   @vtk.calldata_type(vtk.VTK_OBJECT)
   def _onVolumeNodeAdded(self, caller, event, callData):
     if isinstance(callData, slicer.vtkMRMLScalarVolumeNode):
-      seriesTypeClass = SeriesTypeFactory.getSeriesType(callData)
-      if seriesTypeClass:
-        seriesType = seriesTypeClass(callData)
-        self._volumeSeriesTypes[callData] = seriesType
+      self._classify(callData)
+      if self.getBValues(callData) is None and DWI.hasEligibleDescription(callData.GetName().lower()):
+        # DICOM plugins set the attributes identifying the loaded files after adding the node
+        qt.QTimer.singleShot(0, lambda: self._reclassify(callData))
 
   @vtk.calldata_type(vtk.VTK_OBJECT)
   def _onVolumeNodeRemoved(self, caller, event, callData):
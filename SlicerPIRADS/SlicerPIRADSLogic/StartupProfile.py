@@ -0,0 +1,82 @@
+import time
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from SlicerDevelopmentToolboxUtils.decorators import singleton
+
+from SlicerPIRADSLogic.Tracing import Tracer
+
+
+@singleton
+class StartupProfile(object):
+  """ Records how long each stage of importing and setting up SlicerPIRADS takes
+
+  Stages are timed with the stage context manager. Repeated stages accumulate. Milestones store the time passed since
+  the profile was created (i.e. since SlicerPIRADS was imported) e.g. until the first study was loaded. If tracing is
+  enabled, each stage is recorded as Tracer span as well.
+
+  .. code-block:: python
+
+    with StartupProfile().stage("import SegmentEditor"):
+      from SegmentEditor import SegmentEditorWidget
+    logging.info(StartupProfile().getReport())
+  """
+
+  def __init__(self):
+    self._startTime = time.time()
+    self._stages = OrderedDict()
+    self._milestones = OrderedDict()
+
+  def reset(self):
+    self.__init__()
+
+  @contextmanager
+  def stage(self, name):
+    """ Times the enclosed block and adds its duration to stage name """
+    startTime = time.time()
+    try:
+      with Tracer().span(name):
+        yield
+    finally:
+      self.addStageDuration(name, time.time() - startTime)
+
+  def addStageDuration(self, name, seconds):
+    count, total = self._stages.get(name, (0, 0.0))
+    self._stages[name] = (count + 1, total + seconds)
+
+  def getStageDuration(self, name):
+    """ Returns accumulated duration of stage name in seconds or None if the stage was never recorded """
+    try:
+      return self._stages[name][1]
+    except KeyError:
+      return None
+
+  def getStages(self):
+    """ Returns list of (name, number of calls, accumulated seconds) in order of first occurrence """
+    return [(name, count, total) for name, (count, total) in self._stages.items()]
+
+  def markMilestone(self, name):
+    """ Stores the time passed since creation of the profile for name. Only the first call per name counts. """
+    if name not in self._milestones:
+      self._milestones[name] = self.getElapsedTime()
+      return True
+    return False
+
+  def getMilestone(self, name):
+    return self._milestones.get(name)
+
+  def getElapsedTime(self):
+    return time.time() - self._startTime
+
+  def getReport(self):
+    """ Returns a printable table of all stages and milestones in milliseconds """
+    lines = ["SlicerPIRADS startup profile", "{:<50}{:>8}{:>12}".format("Stage", "Calls", "Time [ms]")]
+    for name, count, total in self.getStages():
+      lines.append("{:<50}{:>8}{:>12.1f}".format(name, count, total * 1000.0))
+    for name, elapsed in self._milestones.items():
+      lines.append("{:<58}{:>12.1f}".format("{} (since import)".format(name), elapsed * 1000.0))
+    return "\n".join(lines)
+
+  def logReport(self):
+    logging.info(self.getReport())
@@ -0,0 +1,203 @@
+import os
+import csv
+import json
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+from SlicerDevelopmentToolboxUtils.decorators import singleton
+
+
+DATABASE_QUERIES = "database queries"
+FILES_READ = "files read"
+BYTES_DECODED = "bytes decoded"
+SCENE_NODES_ADDED = "scene nodes added"
+""" Names of the counters recorded by SlicerPIRADS """
+
+
+class Span(object):
+  """ Timed section of work recorded by the Tracer
+
+  Attributes:
+    name: name of the span e.g. 'DataSelectionDialog: fill series list'
+    start: start time in seconds relative to creation/reset of the Tracer
+    duration: duration in seconds
+    depth: nesting level within its thread (0 for top level spans)
+    threadID: identifier of the thread the span was recorded in
+    counters: dictionary mapping counter names to values accumulated while the span was open (including nested spans)
+    args: additional information passed when opening the span
+  """
+
+  __slots__ = ("name", "start", "duration", "depth", "threadID", "counters", "args")
+
+  def __init__(self, name, start, depth, threadID, args=None):
+    self.name = name
+    self.start = start
+    self.duration = 0.0
+    self.depth = depth
+    self.threadID = threadID
+    self.counters = OrderedDict()
+    self.args = args if args else dict()
+
+
+class _CallCounter(object):
+  """ Proxy counting each method call of obj as one unit of counterName """
+
+  def __init__(self, obj, counterName):
+    self._obj = obj
+    self._counterName = counterName
+
+  def __getattr__(self, name):
+    attribute = getattr(self._obj, name)
+    if not callable(attribute):
+      return attribute
+
+    @wraps(attribute)
+    def counted(*args, **kwargs):
+      Tracer().count(self._counterName)
+      return attribute(*args, **kwargs)
+    return counted
+
+
+@singleton
+class Tracer(object):
+  """ Records hierarchical timing spans and counters of SlicerPIRADS
+
+  Tracing is disabled by default (see [Tracing] section of default.cfg). While disabled span and count return
+  immediately without recording anything. Recorded spans can be exported as Chrome trace (chrome://tracing or
+  https://ui.perfetto.dev) or as CSV.
+
+  .. code-block:: python
+
+    with Tracer().span("load report", seriesUID=uid):
+      dataset = pydicom.read_file(fileName)
+      Tracer().count(FILES_READ)
+      Tracer().count(BYTES_DECODED, os.path.getsize(fileName))
+  """
+
+  MAXIMUM_NUMBER_OF_SPANS = 100000
+  """ Oldest spans get dropped once this number is exceeded """
+
+  def __init__(self):
+    self.enabled = False
+    self._lock = threading.Lock()
+    self._local = threading.local()
+    self.reset()
+
+  def reset(self):
+    """ Removes all recorded spans and counters """
+    with self._lock:
+      self._startTime = time.time()
+      self._spans = []
+      self._counters = OrderedDict()
+
+  def _getStack(self):
+    try:
+      return self._local.stack
+    except AttributeError:
+      self._local.stack = []
+      return self._local.stack
+
+  @contextmanager
+  def span(self, name, **args):
+    """ Records the enclosed block as span name. Keyword arguments are stored with the span. """
+    if not self.enabled:
+      yield
+      return
+    stack = self._getStack()
+    span = Span(name, time.time() - self._startTime, len(stack), threading.current_thread().ident, args)
+    stack.append(span)
+    try:
+      yield span
+    finally:
+      stack.pop()
+      span.duration = time.time() - self._startTime - span.start
+      with self._lock:
+        self._spans.append(span)
+        if len(self._spans) > self.MAXIMUM_NUMBER_OF_SPANS:
+          del self._spans[0]
+
+  def traced(self, name=None):
+    """ Decorator recording each call of the decorated function as span (default name: qualified function name) """
+    def decorator(func):
+      spanName = name if name else func.__qualname__
+
+      @wraps(func)
+      def wrapper(*args, **kwargs):
+        with self.span(spanName):
+          return func(*args, **kwargs)
+      return wrapper
+    return decorator
+
+  def count(self, name, value=1):
+    """ Adds value to counter name of all currently open spans of this thread and to the totals """
+    if not self.enabled:
+      return
+    for span in self._getStack():
+      span.counters[name] = span.counters.get(name, 0) + value
+    with self._lock:
+      self._counters[name] = self._counters.get(name, 0) + value
+
+  def countCalls(self, obj, counterName=DATABASE_QUERIES):
+    """ Returns obj itself if tracing is disabled, otherwise a proxy counting each method call as counterName
+
+    .. code-block:: python
+
+      db = Tracer().countCalls(slicer.dicomDatabase)
+    """
+    return _CallCounter(obj, counterName) if self.enabled else obj
+
+  def getSpans(self):
+    """ Returns finished spans ordered by start time """
+    with self._lock:
+      return sorted(self._spans, key=lambda s: s.start)
+
+  def getCounters(self):
+    """ Returns dictionary of all counter totals """
+    with self._lock:
+      return OrderedDict(self._counters)
+
+  def getCounterNames(self):
+    names = list(self.getCounters().keys())
+    for span in self.getSpans():
+      names += [name for name in span.counters.keys() if name not in names]
+    return names
+
+  def toChromeTrace(self):
+    """ Returns recorded spans in Chrome trace event format as dictionary """
+    pid = os.getpid()
+    events = []
+    for span in self.getSpans():
+      args = OrderedDict(span.args)
+      args.update(span.counters)
+      events.append({
+        "name": span.name,
+        "cat": "SlicerPIRADS",
+        "ph": "X",
+        "ts": round(span.start * 1e6, 3),
+        "dur": round(span.duration * 1e6, 3),
+        "pid": pid,
+        "tid": span.threadID,
+        "args": args
+      })
+    return {
+      "traceEvents": events,
+      "displayTimeUnit": "ms",
+      "otherData": {"counters": self.getCounters()}
+    }
+
+  def exportChromeTrace(self, fileName):
+    with open(fileName, 'w') as f:
+      json.dump(self.toChromeTrace(), f, indent=1)
+
+  def exportCSV(self, fileName):
+    """ Writes one row per span with start and duration in milliseconds and one column per counter """
+    counterNames = self.getCounterNames()
+    with open(fileName, 'w', newline='') as f:
+      writer = csv.writer(f)
+      writer.writerow(["name", "depth", "thread", "start_ms", "duration_ms"] + counterNames)
+      for span in self.getSpans():
+        writer.writerow([span.name, span.depth, span.threadID, "%.3f" % (span.start * 1000.0),
+                         "%.3f" % (span.duration * 1000.0)] + [span.counters.get(name, 0) for name in counterNames])
@@ -1,15 +1,15 @@
 import qt
-import ctk
-import os
-import vtk
-import slicer
-
-from SegmentEditor import SegmentEditorWidget
+import importlib
 
 from SlicerDevelopmentToolboxUtils.mixins import ParameterNodeObservationMixin, ModuleLogicMixin
 from SlicerDevelopmentToolboxUtils.constants import DICOMTAGS
 from SlicerDevelopmentToolboxUtils.icons import Icons
 
+from SlicerPIRADSLogic.LesionQuantification import LesionQuantifier
+from SlicerPIRADSLogic.SegmentStatistics import SegmentStatisticsTracker
+from SlicerPIRADSLogic.StartupProfile import StartupProfile
+from SlicerPIRADSWidgets.UIRegistry import UIRegistry
+
 
 class AnnotationItemWidget(qt.QWidget, ParameterNodeObservationMixin):
   """ The AnnotationItemWidget provides functionality for displaying annotation specific information
@@ -25,25 +25,46 @@ class AnnotationItemWidget(qt.QWidget, ParameterNodeObservationMixin):
 
   def __init__(self, finding, seriesType, parent=None):
     qt.QWidget.__init__(self, parent)
-    self.modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
     self._seriesType = seriesType
+    self._finding = None
+    self._statisticsTracker = None
+    self.setup()
+    self._processData()
+    self.setFinding(finding)
+
+  def setFinding(self, finding):
+    """ Binds the widget to another finding without reloading its user interface
+
+    Params:
+      finding(Finding): finding instance that the annotation will be created for
+    """
+    if finding is self._finding:
+      return
+    if self._finding:
+      self._removeFindingObservers()
     self._finding = finding
     self._finding.addEventObserver(finding.SectorSelectionChangedEvent, self._onFindingSectorSelectionChanged)
     self._finding.addEventObserver(finding.AssessmentScoreChanged, self._onFindingAssessmentScoreChanged)
-    self.setup()
-    self._processData()
+    self._finding.addEventObserver(finding.DataChangedEvent, self._onFindingDataChanged)
+    self._removeStatisticsTracker()
+    self._measurementLabel.text = ""
+    self._visibilityButton.blockSignals(True)
+    self._visibilityButton.checked = True
+    self._visibilityButton.setIcon(Icons.visible_on)
+    self._visibilityButton.blockSignals(False)
+    self._onFindingSectorSelectionChanged()
+    self._onFindingDataChanged()
 
   def setup(self):
     self.setLayout(qt.QGridLayout())
-    path = os.path.join(self.modulePath, 'Resources', 'UI', 'AnnotationItemWidget.ui')
-    self.ui = slicer.util.loadUI(path)
+    self.ui = UIRegistry().loadUI('AnnotationItemWidget.ui')
     self._visibilityButton = self.ui.findChild(qt.QPushButton, "visibilityButton")
     self._pickList = self.ui.findChild(qt.QComboBox, "picklist")
-    self._onFindingSectorSelectionChanged()
     self._visibilityButton.setIcon(Icons.visible_on)
     self._visibilityButton.checkable = True
     self._visibilityButton.checked = True
     self._seriesTypeLabel = self.ui.findChild(qt.QLabel, "seriesTypeLabel")
+    self._measurementLabel = self.ui.findChild(qt.QLabel, "measurementLabel")
     self.layout().addWidget(self.ui)
     self._setupConnections()
 
@@ -59,14 +80,48 @@ class AnnotationItemWidget(qt.QWidget, ParameterNodeObservationMixin):
   def _cleanupConnections(self, obj):
     self._visibilityButton.toggled.disconnect()
     self._pickList.currentTextChanged.disconnect()
+    if self._finding:
+      self._removeFindingObservers()
+    self._removeStatisticsTracker()
+
+  def _removeFindingObservers(self):
     self._finding.removeEventObserver(self._finding.SectorSelectionChangedEvent, self._onFindingSectorSelectionChanged)
     self._finding.removeEventObserver(self._finding.AssessmentScoreChanged, self._onFindingAssessmentScoreChanged)
+    self._finding.removeEventObserver(self._finding.DataChangedEvent, self._onFindingDataChanged)
 
   def _processData(self, caller=None, event=None):
     self._seriesTypeLabel.text = "{}: {}".format(ModuleLogicMixin.getDICOMValue(self._seriesType.getVolume(),
                                                                                 DICOMTAGS.SERIES_NUMBER),
                                                  self._seriesType.getName())
 
+  def _onFindingDataChanged(self, caller=None, event=None):
+    annotation = self._finding.getAnnotation(self._seriesType, "vtkMRMLSegmentationNode")
+    if not annotation or not annotation.hasMRMLNode() or not annotation.segmentID:
+      self._removeStatisticsTracker()
+      self._measurementLabel.text = ""
+      return
+    if self._statisticsTracker and self._statisticsTracker.isTracking(annotation.mrmlNode, annotation.segmentID):
+      return
+    self._removeStatisticsTracker()
+    self._statisticsTracker = SegmentStatisticsTracker(annotation.mrmlNode, annotation.segmentID,
+                                                       LesionQuantifier.getIntensityVolumes())
+    self._statisticsTracker.addEventObserver(SegmentStatisticsTracker.StatisticsChangedEvent,
+                                             self._onStatisticsChanged)
+
+  def _removeStatisticsTracker(self):
+    if self._statisticsTracker:
+      self._statisticsTracker.removeEventObserver(SegmentStatisticsTracker.StatisticsChangedEvent,
+                                                  self._onStatisticsChanged)
+      self._statisticsTracker.cleanup()
+      self._statisticsTracker = None
+
+  def _onStatisticsChanged(self, caller=None, event=None):
+    statistics = self._statisticsTracker.statistics
+    self._measurementLabel.text = "{:.2f} ml".format(statistics.volume / 1000.0) if statistics.voxelCount else ""
+    self._measurementLabel.toolTip = "\n".join("mean {}: {:.1f}".format(name, statistics.getMeanIntensity(name))
+                                                for name in statistics.intensitySums.keys()
+                                                if statistics.getMeanIntensity(name) is not None)
+
   def _onFindingSectorSelectionChanged(self, caller=None, event=None):
     # TODO: Note that according to PI-RADS, there is preferred sequence for measuring lesions, depending on the lesion
     # location, but the reader can override the suggested sequence
@@ -74,16 +129,8 @@ class AnnotationItemWidget(qt.QWidget, ParameterNodeObservationMixin):
     self._pickList.clear()
     self._pickList.addItems([" "]+ self._finding.getPickList(self._seriesType))
     self._pickList.setToolTip(self._finding.getPickListTooltip(self._seriesType))
-    score = self._finding.getScore(self._seriesType)
-    if score:
-      index = self._pickList.findText(score)
-      if index != -1:
-        self._pickList.setCurrentIndex(index)
-      else:
-        # remove score if it couldn't be found
-        self._finding.removeScore(self._seriesType)
-    self._onFindingAssessmentScoreChanged()
     self._pickList.blockSignals(False)
+    self._onFindingAssessmentScoreChanged()
 
   def _onScoreSelectionChanged(self, score):
     if score == " ":
@@ -92,6 +139,11 @@ class AnnotationItemWidget(qt.QWidget, ParameterNodeObservationMixin):
       self._finding.setScore(self._seriesType, score)
 
   def _onFindingAssessmentScoreChanged(self, caller=None, event=None):
+    # scores that don't match the pick list are removed by Finding.setSectors
+    score = self._finding.getScore(self._seriesType)
+    self._pickList.blockSignals(True)
+    self._pickList.setCurrentIndex(max(0, self._pickList.findText(str(score))) if score else 0)
+    self._pickList.blockSignals(False)
     assessedSeriesTypes = self._finding.getAssessmentScores().keys()
     enabled = self._pickList.count > 1
     if enabled and self._seriesType in assessedSeriesTypes:
@@ -152,53 +204,9 @@ class AnnotationToolWidget:
     """ Resets the interaction. This can be very helpful if the user decides to cancel current action."""
     raise NotImplementedError
 
-
-class CustomSegmentEditorWidget(AnnotationToolWidget, SegmentEditorWidget):
-  """ CustomSegmentEditorWidget is a subclass of Slicer SegmentEditor displaying only most important UI components
-
-    Params:
-      parent(qt.QWidget): parent widget of the custom SegmentEditor
-      finding(Finding): finding instance that the segmentation will be created for
-      seriesType(SeriesType): seriesType that the segmentation will be created for
-  """
-
-  MRML_NODE_CLASS = "vtkMRMLSegmentationNode"
-
-  def __init__(self, parent, finding, seriesType):
-    AnnotationToolWidget.__init__(self, finding, seriesType)
-    SegmentEditorWidget.__init__(self, parent)
-    self.setup()
-
-  def setupDeveloperSection(self):
-    return
-
-  def resourcePath(self, filename):
-    scriptedModulesPath = os.path.dirname(slicer.util.modulePath("CustomSegmentEditorWidget"))
-    return os.path.join(scriptedModulesPath, 'Resources', filename)
-
-  def _updateFromData(self):
-    self.editor.setSegmentationNode(self.annotation.mrmlNode)
-
-  def setup(self):
-    SegmentEditorWidget.setup(self)
-    self.editor.setAutoShowMasterVolumeNode(False)
-    self.editor.switchToSegmentationsButtonVisible = False
-    self.editor.segmentationNodeSelectorVisible = False
-    self.editor.masterVolumeNodeSelectorVisible = False
-    self.editor.setEffectButtonStyle(qt.Qt.ToolButtonIconOnly)
-    self.editor.setEffectNameOrder(['Paint', 'Erase', 'Draw'])
-    self.editor.unorderedEffectsVisible = False
-    self.editor.findChild(qt.QPushButton, "AddSegmentButton").hide()
-    self.editor.findChild(qt.QPushButton, "RemoveSegmentButton").hide()
-    self.editor.findChild(ctk.ctkMenuButton, "Show3DButton").hide()
-    self.editor.findChild(ctk.ctkExpandableWidget, "SegmentsTableResizableFrame").hide()
-    self._updateFromData()
-
-  def delete(self):
-    self.editor.delete()
-
-  def resetInteraction(self):
-    self.editor.setActiveEffectByName("Selection")
+  def clearData(self):
+    """ Releases references to the annotation's mrmlNode so that it can be deleted or recycled"""
+    raise NotImplementedError
 
 
 class AnnotationWidgetFactory(object):
@@ -207,8 +215,12 @@ class AnnotationWidgetFactory(object):
     NOTE: Not all mrmlNodes are provided with a tool widget
   """
 
-  SUPPORTED_MRML_NODE_WIDGETS = [CustomSegmentEditorWidget]
-  """ All supported MRML node class that provide a user interface """
+  SUPPORTED_MRML_NODE_WIDGETS = {
+    "vtkMRMLSegmentationNode": ("SlicerPIRADSWidgets.CustomSegmentEditorWidget", "CustomSegmentEditorWidget")
+  }
+  """ All supported MRML node classes that provide a user interface mapped to (module name, widget class name).
+      Widget modules are only imported on first request since they depend on heavy Slicer modules (e.g. SegmentEditor).
+  """
 
   @staticmethod
   def getEligibleAnnotationWidgetClass(mrmlNode):
@@ -220,7 +232,21 @@ class AnnotationWidgetFactory(object):
       Returns:
         widget(qt.QWidget): widget if eligible class was found, otherwise None
     """
-    for mrmlNodeWidgetClass in AnnotationWidgetFactory.SUPPORTED_MRML_NODE_WIDGETS:
-      if mrmlNode.__class__.__name__ == mrmlNodeWidgetClass.MRML_NODE_CLASS:
-        return mrmlNodeWidgetClass
-    return None
\ No newline at end of file
+    return AnnotationWidgetFactory.getEligibleAnnotationWidgetClassForMRMLNodeClass(mrmlNode.__class__.__name__)
+
+  @staticmethod
+  def getEligibleAnnotationWidgetClassForMRMLNodeClass(mrmlNodeClass):
+    """ Returns one of the registered annotation tool widget classes supporting mrmlNodeClass otherwise None
+
+      Params:
+        mrmlNodeClass(str): name of the mrmlNode class e.g. 'vtkMRMLSegmentationNode'
+
+      Returns:
+        widget(qt.QWidget): widget if eligible class was found, otherwise None
+    """
+    try:
+      moduleName, className = AnnotationWidgetFactory.SUPPORTED_MRML_NODE_WIDGETS[mrmlNodeClass]
+    except KeyError:
+      return None
+    with StartupProfile().stage("import %s" % moduleName):
+      return getattr(importlib.import_module(moduleName), className)
\ No newline at end of file
@@ -1,12 +1,11 @@
 import qt
 import ctk
-import os
-import slicer
 import logging
 
 from SlicerDevelopmentToolboxUtils.forms.FormsDialog import FormsDialog
 from SlicerDevelopmentToolboxUtils.mixins import GeneralModuleMixin
 from SlicerDevelopmentToolboxUtils.icons import Icons
+from SlicerPIRADSWidgets.UIRegistry import UIRegistry
 
 
 class AssessmentWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
@@ -21,7 +20,6 @@ class AssessmentWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
     ctk.ctkCollapsibleButton.__init__(self, parent)
     self._forms = forms
     self.text = title
-    self.modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
     self.setup()
 
   def setup(self):
@@ -32,8 +30,7 @@ class AssessmentWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
     self._setupConnections()
 
   def _loadUI(self):
-    path = os.path.join(self.modulePath, 'Resources', 'UI', 'AssessmentWidget.ui')
-    self.ui = slicer.util.loadUI(path)
+    self.ui = UIRegistry().loadUI('AssessmentWidget.ui')
     self._assessmentButton = self.ui.findChild(qt.QPushButton, "assessmentButton")
     self._assessmentStatusLabel = self.ui.findChild(qt.QLabel, "assessmentStatusLabel")
 
@@ -47,7 +44,7 @@ class AssessmentWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
   def _onAssessmentButtonClicked(self):
     # TODO: take care of situations when number of forms get changed in between
     if not self._assessmentFormWidget:
-        forms = [os.path.join(self.modulePath, 'Resources', 'Forms', f) for f in self._forms.split(" ")]
+        forms = [UIRegistry().getResourcePath('Forms', f) for f in self._forms.split(" ")]
         self._assessmentFormWidget = FormsDialog(forms)
     if self._assessmentFormWidget.exec_():
       self._assessmentButton.icon = Icons.edit
@@ -0,0 +1,62 @@
+import qt
+import ctk
+import os
+import slicer
+
+from SegmentEditor import SegmentEditorWidget
+
+from SlicerPIRADSWidgets.AnnotationWidget import AnnotationToolWidget
+
+
+class CustomSegmentEditorWidget(AnnotationToolWidget, SegmentEditorWidget):
+  """ CustomSegmentEditorWidget is a subclass of Slicer SegmentEditor displaying only most important UI components
+
+    Params:
+      parent(qt.QWidget): parent widget of the custom SegmentEditor
+      finding(Finding): finding instance that the segmentation will be created for
+      seriesType(SeriesType): seriesType that the segmentation will be created for
+  """
+
+  MRML_NODE_CLASS = "vtkMRMLSegmentationNode"
+
+  def __init__(self, parent, finding, seriesType):
+    AnnotationToolWidget.__init__(self, finding, seriesType)
+    SegmentEditorWidget.__init__(self, parent)
+    self.setup()
+
+  def setupDeveloperSection(self):
+    return
+
+  def resourcePath(self, filename):
+    scriptedModulesPath = os.path.dirname(slicer.util.modulePath("CustomSegmentEditorWidget"))
+    return os.path.join(scriptedModulesPath, 'Resources', filename)
+
+  def _updateFromData(self):
+    annotation = self.annotation
+    self.editor.setSegmentationNode(annotation.getOrCreateMRMLNode())
+    if annotation.segmentID:
+      self.editor.setCurrentSegmentID(annotation.segmentID)
+
+  def setup(self):
+    SegmentEditorWidget.setup(self)
+    self.editor.setAutoShowMasterVolumeNode(False)
+    self.editor.switchToSegmentationsButtonVisible = False
+    self.editor.segmentationNodeSelectorVisible = False
+    self.editor.masterVolumeNodeSelectorVisible = False
+    self.editor.setEffectButtonStyle(qt.Qt.ToolButtonIconOnly)
+    self.editor.setEffectNameOrder(['Paint', 'Erase', 'Draw'])
+    self.editor.unorderedEffectsVisible = False
+    self.editor.findChild(qt.QPushButton, "AddSegmentButton").hide()
+    self.editor.findChild(qt.QPushButton, "RemoveSegmentButton").hide()
+    self.editor.findChild(ctk.ctkMenuButton, "Show3DButton").hide()
+    self.editor.findChild(ctk.ctkExpandableWidget, "SegmentsTableResizableFrame").hide()
+    self._updateFromData()
+
+  def delete(self):
+    self.editor.delete()
+
+  def resetInteraction(self):
+    self.editor.setActiveEffectByName("Selection")
+
+  def clearData(self):
+    self.editor.setSegmentationNode(None)
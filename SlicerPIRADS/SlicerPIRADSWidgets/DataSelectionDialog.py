@@ -1,8 +1,9 @@
 import qt
-import os
 import slicer
 import logging
 from DICOMQIICRXLoaderPlugin import *
+from SlicerPIRADSLogic.Tracing import Tracer
+from SlicerPIRADSWidgets.UIRegistry import UIRegistry
 
 
 class DataSelectionDialog(qt.QDialog):
@@ -10,14 +11,14 @@ class DataSelectionDialog(qt.QDialog):
 
   def __init__(self, parent=None):
     qt.QDialog.__init__(self, parent)
-    self.modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
-    self.db = slicer.dicomDatabase
+    self.db = Tracer().countCalls(slicer.dicomDatabase)
     self.modal = True
+    self._loadedFindings = []
+    self._loadedProstateVolume = None
     self.setup()
 
   def setup(self):
-    path = os.path.join(self.modulePath, 'Resources', 'UI', 'DataSelectionDialog.ui')
-    self.ui = slicer.util.loadUI(path)
+    self.ui = UIRegistry().loadUI('DataSelectionDialog.ui')
     self._browseButton = self.ui.findChild(qt.QPushButton, "browseButton")
     self._loadButton = self.ui.findChild(qt.QPushButton, "loadButton")
     self._selectAllButton = self.ui.findChild(qt.QPushButton, "selectAllButton")
@@ -96,6 +97,7 @@ class DataSelectionDialog(qt.QDialog):
     modelIndex = self._studiesTableModel.index(0, 0)
     self._studiesTable.selectionModel().select(modelIndex, qt.QItemSelectionModel.Select | qt.QItemSelectionModel.Rows)
 
+  @Tracer().traced("DataSelectionDialog._fillStudiesList")
   def _fillStudiesList(self, pid):
     self._studiesTableModel.removeRows(0, self._studiesTableModel.rowCount())
     studies = self._patientTableModel.getStudiesForPatient(pid)
@@ -106,6 +108,7 @@ class DataSelectionDialog(qt.QDialog):
                                                                             "0008,0020") if len(series) else "")])
     self._studiesTable.horizontalHeader().setSectionResizeMode(1, qt.QHeaderView.ResizeToContents)
 
+  @Tracer().traced("DataSelectionDialog._fillSeriesList")
   def _fillSeriesList(self, studyID):
     # TODO: add smart logic for row selection SR selection only one! if SR selected, don't allow selection of other series
     self._clearSeriesList()
@@ -149,6 +152,7 @@ class DataSelectionDialog(qt.QDialog):
     selectedRows = set([index.row() for index in indexes])
     self._loadButton.enabled = len(selectedRows)
 
+  @Tracer().traced("DataSelectionDialog._onLoadButtonClicked")
   def _onLoadButtonClicked(self):
     indexes = self._seriesTable.selectionModel().selectedIndexes
     m = self._seriesTableModel
@@ -174,6 +178,7 @@ class DataSelectionDialog(qt.QDialog):
       #   slicer.app.processEvents()
       #   DICOMQIICRXLoaderPluginClass.loadSeries(files)
 
+  @Tracer().traced("DataSelectionDialog._loadReport")
   def _loadReport(self, qiicrxReportSeries):
     """ Load report from existing qiicrx report series
 
@@ -192,9 +197,26 @@ class DataSelectionDialog(qt.QDialog):
       logging.info("Found multiple QIICRX reports: loading latest one.")
 
     loader = DICOMQIICRXLoaderPluginClass()
-    loadables = loader.examineFiles(slicer.dicomDatabase.filesForSeries(qiicrxReportSeries[0]))
-    if loadables:
-      loader.load(loadables[0])
+    loadables = loader.examineFiles(self.db.filesForSeries(qiicrxReportSeries[0]))
+    if loadables and loader.load(loadables[0]):
+      self._loadedFindings = loader.findings
+      self._loadedProstateVolume = loader.glandVolume
+
+  def getLoadedFindings(self):
+    """ Returns findings that were restored from the loaded qiicrx report
+
+    Returns:
+      list: Finding instances (annotations not loaded yet)
+    """
+    return self._loadedFindings
+
+  def getLoadedProstateVolume(self):
+    """ Returns the gland volume that was restored from the loaded qiicrx report
+
+    Returns:
+      ProstateVolume: or None if no report was loaded or it does not contain a gland volume
+    """
+    return self._loadedProstateVolume
 
   def _onBrowseButtonClicked(self):
     path = qt.QFileDialog.getExistingDirectory(self.window(), "Select folder")
@@ -214,7 +236,7 @@ class PatientsTableModel(qt.QAbstractTableModel):
 
   @property
   def db(self):
-    return slicer.dicomDatabase
+    return Tracer().countCalls(slicer.dicomDatabase)
 
   def __init__(self, parent=None, *args):
     qt.QAbstractTableModel.__init__(self, parent, *args)
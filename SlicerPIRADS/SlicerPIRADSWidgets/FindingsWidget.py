@@ -1,7 +1,5 @@
 import qt
-import vtk
 import ctk
-import os
 import slicer
 import logging
 
@@ -10,10 +8,12 @@ from SlicerDevelopmentToolboxUtils.icons import Icons
 from SlicerDevelopmentToolboxUtils.decorators import onExceptionReturnNone
 
 from SlicerPIRADSLogic.Finding import Finding
+from SlicerPIRADSLogic.LesionQuantification import LesionQuantifier
 from SlicerPIRADSLogic.SeriesType import VolumeSeriesTypeSceneObserver
 from SlicerPIRADSLogic.PIRADSAssessmentCategory import PIRADSAssessmentCategory
 from SlicerPIRADSWidgets.AnnotationWidget import AnnotationWidgetFactory, AnnotationItemWidget
 from SlicerPIRADSWidgets.ProstateSectorMapDialog import ProstateSectorMapDialog
+from SlicerPIRADSWidgets.UIRegistry import UIRegistry
 
 
 class FindingsWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
@@ -21,7 +21,6 @@ class FindingsWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
   def __init__(self, maximumNumber=None, parent=None):
     ctk.ctkCollapsibleButton.__init__(self, parent)
     self.text = "Findings"
-    self.modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
     self._maximumFindingCount = maximumNumber
     self.setup()
 
@@ -34,8 +33,7 @@ class FindingsWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
     self._setupConnections()
 
   def _loadUI(self):
-    path = os.path.join(self.modulePath, 'Resources', 'UI', 'FindingsWidget.ui')
-    self.ui = slicer.util.loadUI(path)
+    self.ui = UIRegistry().loadUI('FindingsWidget.ui')
     self._prostateMapDialog = None
     self._addFindingsButton = self.ui.findChild(qt.QPushButton, "addFindingsButton")
     self._removeFindingsButton = self.ui.findChild(qt.QPushButton, "removeFindingsButton")
@@ -119,6 +117,8 @@ class FindingsWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
     self._updateButtons()
 
   def _displayFindingInformationWidget(self, finding):
+    finding.loadAnnotationReferences()
+    self._findingsListModel.scheduleQuantification(finding)
     if not self._findingInformationWidget:
       self._findingInformationWidget = FindingInformationWidget(finding)
     else:
@@ -141,8 +141,35 @@ class FindingsWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
   def getAssessmentCalculator(self):
     return self._findingsListModel.getAssessmentCalculator()
 
+  def updateMeasurements(self):
+    """ Loads the saved annotations of all findings and quantifies their segmentations e.g. before reporting """
+    for finding in self.getFindings():
+      finding.loadAnnotationReferences()
+    self._findingsListModel.quantify(self.getFindings())
+
+  def getFindings(self):
+    return self._findingsListModel.findings
+
+  def setFindings(self, findings):
+    """ Replaces all findings at once e.g. when restoring them from a qiicrx report
+
+    Params:
+      findings(list): Finding instances
+    """
+    self._findingsListView.selectionModel().clear()
+    self._deleteFindingInformationWidget()
+    self._findingsListModel.setFindings(findings)
+    self._updateButtons()
+
 
 class FindingsListModel(qt.QAbstractListModel):
+  """ List model of findings displaying each finding with the maximum diameter of its segmented lesion
+
+  Segmentations of findings are quantified with a LesionQuantifier once modifications paused for QUANTIFICATION_DELAY
+  milliseconds. Measurements get stored in the findings and are used for the size threshold of the assessment category.
+  """
+
+  QUANTIFICATION_DELAY = 500
 
   @property
   def findings(self):
@@ -151,16 +178,42 @@ class FindingsListModel(qt.QAbstractListModel):
   def __init__(self, parent=None, *args):
     qt.QAbstractListModel.__init__(self, parent, *args)
     self._assessmentCategoryCalculator = PIRADSAssessmentCategory()
+    self._quantifier = LesionQuantifier()
+    self._pendingFindings = []
+    self._quantificationTimer = qt.QTimer()
+    self._quantificationTimer.singleShot = True
+    self._quantificationTimer.interval = self.QUANTIFICATION_DELAY
+    self._quantificationTimer.timeout.connect(self._onQuantificationTimeout)
 
   def getAssessmentCalculator(self):
     return self._assessmentCategoryCalculator
 
   def addFinding(self, finding):
     self._assessmentCategoryCalculator.addFinding(finding)
-    finding.addEventObserver(finding.DataChangedEvent, lambda caller, event: self._onFindingDataChanged(finding))
+    self._observeFinding(finding)
     self.dataChanged(self.index(self.rowCount()-1, 0), self.index(self.rowCount()-1, 0))
 
+  def setFindings(self, findings):
+    self.beginResetModel()
+    self._pendingFindings = []
+    self._quantifier.reset()
+    self._assessmentCategoryCalculator.setFindings(list(findings))
+    for finding in findings:
+      self._observeFinding(finding)
+    self.endResetModel()
+
+  def _observeFinding(self, finding):
+    finding.addEventObserver(finding.DataChangedEvent, lambda caller, event: self._onFindingDataChanged(finding))
+    finding.addEventObserver(finding.MeasurementsChangedEvent,
+                             lambda caller, event: self._onFindingAssessmentChanged(finding))
+    finding.addEventObserver(finding.AssessmentScoreChanged,
+                             lambda caller, event: self._onFindingAssessmentChanged(finding))
+    finding.addEventObserver(finding.SectorSelectionChangedEvent,
+                             lambda caller, event: self._onFindingAssessmentChanged(finding))
+
   def removeFinding(self, finding):
+    if finding in self._pendingFindings:
+      self._pendingFindings.remove(finding)
     index = self._assessmentCategoryCalculator.removeFinding(finding)
     self.removeRow(index)
     self.dataChanged(self.index(index, 0), self.index(index, 0))
@@ -169,11 +222,44 @@ class FindingsListModel(qt.QAbstractListModel):
     return len(self._assessmentCategoryCalculator)
 
   def data(self, index, role):
-    if role != qt.Qt.DisplayRole:
-      return None
-    return self.findings[index.row()].getName()
+    finding = self.findings[index.row()]
+    if role == qt.Qt.DisplayRole:
+      diameter = finding.getMaximumDiameter()
+      return finding.getName() if diameter is None else "{} ({:.1f} mm)".format(finding.getName(), diameter)
+    if role == qt.Qt.ToolTipRole:
+      return self.getMeasurementsToolTip(finding)
+    return None
+
+  @staticmethod
+  def getMeasurementsToolTip(finding):
+    lines = []
+    for seriesType, measurement in finding.getMeasurements().items():
+      lines.append("<b>{}</b>".format(seriesType.getName()))
+      lines += ["{}: {}".format(label, value) for label, value in measurement.getSummary().items()]
+    return "<br>".join(lines) if lines else None
+
+  def scheduleQuantification(self, finding):
+    """ Quantifies the segmentations of finding once no further modification happened for QUANTIFICATION_DELAY """
+    if finding not in self._pendingFindings:
+      self._pendingFindings.append(finding)
+    self._quantificationTimer.start()
+
+  def quantify(self, findings):
+    """ Immediately quantifies the segmentations of findings and stores the measurements in each finding """
+    for finding in findings:
+      if finding in self._pendingFindings:
+        self._pendingFindings.remove(finding)
+      finding.setMeasurements(self._quantifier.quantifyFinding(finding))
+
+  def _onQuantificationTimeout(self):
+    self.quantify([finding for finding in self._pendingFindings if finding in self.findings])
 
   def _onFindingDataChanged(self, finding):
+    self.scheduleQuantification(finding)
+    self._onFindingAssessmentChanged(finding)
+
+  def _onFindingAssessmentChanged(self, finding):
+    self._assessmentCategoryCalculator.invalidate()
     row = self.findings.index(finding)
     self.dataChanged(self.index(row, 0), self.index(row, 0))
 
@@ -186,8 +272,7 @@ class FindingInformationWidget(qt.QWidget):
 
   @staticmethod
   def getIconFromMRMLNodeClass(name):
-    modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
-    return qt.QIcon(os.path.join(modulePath, 'Resources', 'Icons', FindingInformationWidget.ICON_MAP[name]))
+    return UIRegistry().getIcon('Icons', FindingInformationWidget.ICON_MAP[name])
 
   @staticmethod
   def getIconFromMRMLNode(mrmlNode):
@@ -196,12 +281,10 @@ class FindingInformationWidget(qt.QWidget):
   def __init__(self, finding, parent=None):
     qt.QWidget.__init__(self, parent)
     self._finding = finding
-    self.modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
-    self._volumeNodes = slicer.util.getNodesByClass('vtkMRMLScalarVolumeNode')
+    self._annotationSeriesTypes = None
     self.setup()
 
   def setFinding(self, finding):
-    # TODO: restore data
     self._finding = finding
     self._fillAnnotationTable()
     self._removeAnnotationToolWidget()
@@ -213,8 +296,7 @@ class FindingInformationWidget(qt.QWidget):
     self._setupConnections()
 
   def _loadUI(self):
-    path = os.path.join(self.modulePath, 'Resources', 'UI', 'FindingInformationWidget.ui')
-    self.ui = slicer.util.loadUI(path)
+    self.ui = UIRegistry().loadUI('FindingInformationWidget.ui')
     self._annotationListWidget = self.ui.findChild(qt.QListWidget, "annotationsListWidget")
     self._annotationToolFrame = self.ui.findChild(qt.QFrame, "annotationToolFrame")
     self._annotationToolFrame.setLayout(qt.QGridLayout())
@@ -269,11 +351,20 @@ class FindingInformationWidget(qt.QWidget):
       self._removeAnnotationToolWidget()
 
   def _fillAnnotationTable(self):
+    volumeSeriesTypes = VolumeSeriesTypeSceneObserver().volumeSeriesTypes
+    volumes = slicer.util.getNodesByClass('vtkMRMLScalarVolumeNode')
+    seriesTypes = [volumeSeriesTypes.get(volume) for volume in volumes]
+    if seriesTypes == self._annotationSeriesTypes:
+      # same study: only the finding changed, so existing rows get bound to it
+      self._annotationListWidget.setCurrentRow(-1)
+      self._annotationListWidget.clearSelection()
+      for row in range(self._annotationListWidget.count):
+        self._annotationListWidget.itemWidget(self._annotationListWidget.item(row)).setFinding(self._finding)
+      return
+    self._annotationSeriesTypes = seriesTypes
     self._annotationListWidget.clear()
-    for volume in self._volumeNodes:
-      volumeSeriesTypes = VolumeSeriesTypeSceneObserver().volumeSeriesTypes
-      if volume in volumeSeriesTypes:
-        seriesType = volumeSeriesTypes[volume]
+    for volume, seriesType in zip(volumes, seriesTypes):
+      if seriesType:
         listWidgetItem = qt.QListWidgetItem(self._annotationListWidget)
         self._annotationListWidget.addItem(listWidgetItem)
         annotationItemWidget = AnnotationItemWidget(self._finding, seriesType)
@@ -284,8 +375,8 @@ class FindingInformationWidget(qt.QWidget):
 
   def _onAnnotationToolSelected(self, seriesType, mrmlNodeCLass):
     self._removeAnnotationToolWidget()
-    annotation = self._finding.getOrCreateAnnotation(seriesType, mrmlNodeCLass)
-    annotationWidgetClass = AnnotationWidgetFactory.getEligibleAnnotationWidgetClass(annotation.mrmlNode)
+    self._finding.getOrCreateAnnotation(seriesType, mrmlNodeCLass)
+    annotationWidgetClass = AnnotationWidgetFactory.getEligibleAnnotationWidgetClassForMRMLNodeClass(mrmlNodeCLass)
     if annotationWidgetClass:
       self._currentAnnotationToolWidget = self._getOrCreateAnnotationToolWidget(annotationWidgetClass, seriesType)
 
@@ -298,15 +389,16 @@ class FindingInformationWidget(qt.QWidget):
     return None
 
   def _onAnnotationToolDeselected(self, seriesType, mrmlNodeCLass):
-    annotation = self._finding.getOrCreateAnnotation(seriesType, mrmlNodeCLass)
-    if not annotation.mrmlNode:
-      self._finding.deleteAnnotation(seriesType, mrmlNodeCLass)
     self._removeAnnotationToolWidget()
+    annotation = self._finding.getAnnotation(seriesType, mrmlNodeCLass)
+    if annotation and not annotation.isModified():
+      self._finding.deleteAnnotation(seriesType, mrmlNodeCLass)
 
   def _removeAnnotationToolWidget(self):
     # TODO: this is too specific for the segment editor
     if self._currentAnnotationToolWidget:
       self._currentAnnotationToolWidget.resetInteraction()
+      self._currentAnnotationToolWidget.clearData()
       self._annotationToolFrame.layout().removeWidget(self._currentAnnotationToolWidget.editor)
       self._currentAnnotationToolWidget = None
 
@@ -0,0 +1,39 @@
+from qSlicerMultiVolumeExplorerModuleWidget import qSlicerMultiVolumeExplorerSimplifiedModuleWidget
+
+
+class SlicerPIRADSMultiVolumeExplorer(qSlicerMultiVolumeExplorerSimplifiedModuleWidget):
+
+  def getCurrentSeriesNumber(self):
+    import string
+    ref = -1
+    if self._bgMultiVolumeNode:
+      name = self._bgMultiVolumeNode.GetName()
+      ref = string.split(name,':')[0]
+    return ref
+
+  def showInputMultiVolumeSelector(self, show):
+    if show:
+      self._bgMultiVolumeSelectorLabel.show()
+      self.bgMultiVolumeSelector.show()
+    else:
+      self._bgMultiVolumeSelectorLabel.hide()
+      self.bgMultiVolumeSelector.hide()
+
+  def setMultiVolume(self, node):
+    self.bgMultiVolumeSelector.setCurrentNode(node)
+
+  def createChart(self, sliceWidget, position):
+    self._multiVolumeIntensityChart.createChart(sliceWidget, position, ignoreCurrentBackground=True)
+
+  def refreshGUIForNewBackgroundImage(self):
+    self._multiVolumeIntensityChart.reset()
+    self.setFramesEnabled(True)
+    self.refreshFrameSlider()
+    self._multiVolumeIntensityChart.bgMultiVolumeNode = self._bgMultiVolumeNode
+
+  def onBackgroundInputChanged(self, node):
+    qSlicerMultiVolumeExplorerSimplifiedModuleWidget.onBackgroundInputChanged(self)
+    self.popupChartButton.setEnabled(self._bgMultiVolumeNode is not None)
+
+  def onSliderChanged(self, frameId):
+    return
@@ -1,6 +1,7 @@
 import qt
-import os
-import slicer
+
+from SlicerPIRADSCore.ProstateSector import ProstateSectorSet
+from SlicerPIRADSWidgets.UIRegistry import UIRegistry
 
 
 class ScreenShotMixin(object):
@@ -22,23 +23,20 @@ class ScreenShotMixin(object):
     return pixmaps
 
   def getRegionRectangles(self):
-    selectedRegions = set([sector.split("_")[1] for sector in self.getSelectedSectors()])
-    return [self.REGIONS[selRegion] for selRegion in selectedRegions]
+    return [self.REGIONS[level] for level in self.getSelectedSectors().levels()]
 
 
 class ProstateSectorMapDialog(ScreenShotMixin):
 
   def __init__(self):
-    self.modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
     self.setup()
 
   def setup(self):
-    path = os.path.join(self.modulePath, 'Resources', 'UI', 'ProstateSectorMapDialog.ui')
-    self.ui = slicer.util.loadUI(path)
+    self.ui = UIRegistry().loadUI('ProstateSectorMapDialog.ui')
     self._backgroundLabel = self.ui.findChild(qt.QLabel, "prostateSectorMap")
     self._sectorButtonGroup = self.ui.findChild(qt.QButtonGroup, "sectorButtonGroup")
     self._dialogButtonBox = self.ui.findChild(qt.QDialogButtonBox, "dialogButtonBox")
-    icon = qt.QIcon(os.path.join(self.modulePath, 'Resources', 'Images', 'prostate_sector_map.png'))
+    icon = UIRegistry().getIcon('Images', 'prostate_sector_map.png')
     self._backgroundLabel.setPixmap(icon.pixmap(qt.QSize(500, 683)))
     self._setupConnections()
 
@@ -49,9 +47,10 @@ class ProstateSectorMapDialog(ScreenShotMixin):
     self._dialogButtonBox.clicked.connect(self._onButtonClicked)
 
   def getSelectedSectors(self):
-    return [b.objectName for b in self._sectorButtonGroup.buttons() if b.checked]
+    return ProstateSectorSet.fromNames(b.objectName for b in self._sectorButtonGroup.buttons() if b.checked)
 
   def setSelectedSectors(self, sectors):
+    sectors = ProstateSectorSet.coerce(sectors)
     for b in self._sectorButtonGroup.buttons():
       b.checked = b.objectName in sectors
 
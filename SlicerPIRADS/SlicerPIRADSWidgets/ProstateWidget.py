@@ -1,34 +1,71 @@
 import ctk
-import os
 import slicer
 import qt
-from random import random
+import logging
+from collections import OrderedDict
+from SlicerDevelopmentToolboxUtils.events import SlicerDevelopmentToolboxEvents as events
 
+from SlicerDevelopmentToolboxUtils.mixins import ParameterNodeObservationMixin, GeneralModuleMixin
 
-from SlicerDevelopmentToolboxUtils.mixins import GeneralModuleMixin
+from SlicerPIRADSLogic.Annotation import Ruler
 from SlicerPIRADSLogic.Finding import Finding
+from SlicerPIRADSLogic.ProstateMeasurement import ProstateVolume, ProstateVolumeCalculator
+from SlicerPIRADSLogic.SeriesType import *
+from SlicerPIRADSWidgets.AnnotationWidget import AnnotationWidgetFactory
+from SlicerPIRADSWidgets.UIRegistry import UIRegistry
+
+
+def getFirstVolumeOfSeriesType(seriesTypeClass):
+  for volume, seriesType in VolumeSeriesTypeSceneObserver().volumeSeriesTypes.items():
+    if isinstance(seriesType, seriesTypeClass):
+      return volume, seriesType
+  return None, None
 
 
 class ProstateWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
 
+  LINEAR_MEASUREMENT = "Linear Measurement"
+  VOLUMETRIC_MEASUREMENT= "Volumetric Measurement"
+  REPORTED_MEASUREMENT = "Reported Measurement"
+
+  StartedEvent = events.StartedEvent
+  FinishedEvent = events.FinishedEvent
+  CanceledEvent = events.CanceledEvent
+
+  GLAND_SERIES_TYPE = T2a
+  """ Series type the gland gets segmented on for volumetric measurements """
+
+  GLAND_MRML_NODE_CLASS = "vtkMRMLSegmentationNode"
+
   def __init__(self, parent=None):
     ctk.ctkCollapsibleButton.__init__(self, parent)
     self.text = "Prostate Gland Measurements"
-    self.modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
+    self._volumeCalculator = ProstateVolumeCalculator()
+    self._linearMeasurementSession = None
+    self._linearMeasurementItem = None
+    self._reportedMeasurementItem = None
+    self._glandFinding = None
+    self._glandSegmentEditorWidget = None
     self.setup()
 
   def setup(self):
     self.setLayout(qt.QGridLayout())
     self._loadUI()
     self.layout().addWidget(self.ui)
+    self._glandSegmentationFrame = qt.QFrame()
+    self._glandSegmentationFrame.setLayout(qt.QVBoxLayout())
+    self._glandSegmentationFrame.hide()
+    self.layout().addWidget(self._glandSegmentationFrame)
     self._setupConnections()
 
   def _loadUI(self):
-    path = os.path.join(self.modulePath, 'Resources', 'UI', 'ProstateWidget.ui')
-    self.ui = slicer.util.loadUI(path)
+    self.ui = UIRegistry().loadUI('ProstateWidget.ui')
     self._addMeasurementsButton = self.ui.findChild(qt.QPushButton, "addMeasurementButton")
     self._addMenu(self._addMeasurementsButton)
     self._measurementsListWidget = self.ui.findChild(qt.QListWidget, "listWidget")
+    self._instructionLabel = self.ui.findChild(qt.QLabel, "instructionLabel")
+    self._cancelButton = self.ui.findChild(qt.QPushButton, "cancelButton")
+    self._undoButton = self.ui.findChild(qt.QPushButton, "undoButton")
     self._updateButtons()
 
   def _addMenu(self, button):
@@ -39,108 +76,368 @@ class ProstateWidget(ctk.ctkCollapsibleButton, GeneralModuleMixin):
     actionGroup = qt.QActionGroup(menu)
     actionGroup.setExclusive(False)
 
-    for name, enabled in [("Linear Measurement", True), ("Volumetric Measurement", False)]:
+    self._actions = dict()
+    for name in [self.LINEAR_MEASUREMENT, self.VOLUMETRIC_MEASUREMENT]:
       action = qt.QAction(name, actionGroup)
-      action.setEnabled(enabled)
       menu.addAction(action)
       actionGroup.addAction(action)
       action.triggered.connect(lambda triggered, a=action: self._onActionTriggered(a))
+      self._actions[name] = action
 
   def _onActionTriggered(self, action):
     action.setEnabled(False)
-    print(action)
-    # Depending on type
-    # finding = Finding("Finding %s" % random.randint(0, 10))
-    # self._findingsListModel.addFinding(finding)
-    # self._measurementsListWidget.selectionModel().clear()
-    # model = self._measurementsListWidget.model()
-    # self._measurementsListWidget.selectionModel().setCurrentIndex(model.index(model.rowCount() - 1, 0),
-    #                                                               qt.QItemSelectionModel.Select)
-    # self._updateButtons()
+
+    if action.text == self.LINEAR_MEASUREMENT:
+      logging.debug("Starting creation of linear measurement for prostate in ax, sag, and cor orientations")
+      self._startLinearMeasurement()
+    elif action.text == self.VOLUMETRIC_MEASUREMENT:
+      self._startVolumetricMeasurement()
+    self._updateButtons()
+
+  def _startLinearMeasurement(self):
+    session = LinearMeasurementSession()
+    for event, callback in [(session.DataChangedEvent, self._onLinearMeasurementChanged),
+                            (session.FinishedEvent, self._onLinearMeasurementChanged),
+                            (session.CanceledEvent, self._onLinearMeasurementCanceled)]:
+      session.addEventObserver(event, callback)
+    self._linearMeasurementSession = session
+    session.start()
+
+  def _onLinearMeasurementChanged(self, caller=None, event=None):
+    session = self._linearMeasurementSession
+    if session.state == session.FINISHED:
+      if not self._linearMeasurementItem:
+        self._linearMeasurementItem = self._addMeasurementItem(self.LINEAR_MEASUREMENT, "Ruler.png")
+      self._linearMeasurementItem.setProstateVolume(
+        self._volumeCalculator.calculateFromRulers(session.getRulerNodes()))
+    elif self._linearMeasurementItem:
+      self._linearMeasurementItem.setProstateVolume(None)
+    self._updateInstructions()
+    self._updateButtons()
+
+  def _onLinearMeasurementCanceled(self, caller=None, event=None):
+    if self._linearMeasurementItem:
+      self._measurementsListWidget.takeItem(self._getRow(self._linearMeasurementItem))
+      self._linearMeasurementItem = None
+    self._linearMeasurementSession = None
+    self._actions[self.LINEAR_MEASUREMENT].setEnabled(True)
+    self._updateInstructions()
+    self._updateButtons()
+
+  def _onCancelButtonClicked(self):
+    if self._linearMeasurementSession:
+      self._linearMeasurementSession.cancel()
+
+  def _onUndoButtonClicked(self):
+    if self._linearMeasurementSession:
+      self._linearMeasurementSession.undo()
+
+  def _updateInstructions(self):
+    session = self._linearMeasurementSession
+    orientation = session.getPendingOrientation() if session else None
+    if orientation:
+      self._instructionLabel.text = "Place ruler in {} view of {}".format(orientation.lower(),
+                                                                          session.getVolume(orientation).GetName())
+    else:
+      self._instructionLabel.text = ""
+
+  def _startVolumetricMeasurement(self):
+    volume, seriesType = getFirstVolumeOfSeriesType(self.GLAND_SERIES_TYPE)
+    if not volume:
+      logging.error("Volume with series type %s for volumetric measurement not found" %
+                    self.GLAND_SERIES_TYPE.getName())
+      self._actions[self.VOLUMETRIC_MEASUREMENT].setEnabled(True)
+      return
+    self._glandFinding = Finding("Prostate Gland")
+    self._glandSeriesType = seriesType
+    self._glandFinding.addEventObserver(Finding.DataChangedEvent, self._onGlandSegmentationChanged)
+    segmentEditorWidgetClass = \
+      AnnotationWidgetFactory.getEligibleAnnotationWidgetClassForMRMLNodeClass(self.GLAND_MRML_NODE_CLASS)
+    self._glandSegmentEditorWidget = segmentEditorWidgetClass(parent=self._glandSegmentationFrame,
+                                                              finding=self._glandFinding, seriesType=seriesType)
+    self._glandSegmentationFrame.show()
+    self._glandItem = self._addMeasurementItem(self.VOLUMETRIC_MEASUREMENT, "SegmentEditor.png")
+
+  def _onGlandSegmentationChanged(self, caller=None, event=None):
+    annotation = self._glandFinding.getAnnotation(self._glandSeriesType, self.GLAND_MRML_NODE_CLASS)
+    if annotation and annotation.hasMRMLNode() and annotation.segmentID:
+      self._glandItem.setProstateVolume(self._volumeCalculator.calculateFromSegmentation(annotation.mrmlNode,
+                                                                                         annotation.segmentID))
+
+  def _addMeasurementItem(self, name, iconFileName):
+    listWidgetItem = qt.QListWidgetItem(self._measurementsListWidget)
+    self._measurementsListWidget.addItem(listWidgetItem)
+    measurementItemWidget = ProstateMeasurementItemWidget(name, UIRegistry().getIcon('Icons', iconFileName))
+    listWidgetItem.setSizeHint(measurementItemWidget.sizeHint)
+    self._measurementsListWidget.setItemWidget(listWidgetItem, measurementItemWidget)
+    self._updateButtons()
+    return measurementItemWidget
+
+  def setReportedProstateVolume(self, prostateVolume):
+    """ Displays the gland volume restored from a previously saved report. Measurements added afterwards take precedence.
+
+    :param prostateVolume: ProstateVolume or None for removing the displayed one
+    """
+    if self._reportedMeasurementItem:
+      self._measurementsListWidget.takeItem(self._getRow(self._reportedMeasurementItem))
+      self._reportedMeasurementItem = None
+    if prostateVolume:
+      iconFileName = "Ruler.png" if prostateVolume.method == ProstateVolume.LINEAR else "SegmentEditor.png"
+      self._reportedMeasurementItem = self._addMeasurementItem(self.REPORTED_MEASUREMENT, iconFileName)
+      self._reportedMeasurementItem.setProstateVolume(prostateVolume)
+    self._updateButtons()
+
+  def getProstateVolume(self):
+    """ Returns the ProstateVolume of the most recent measurement or None if there is none """
+    for row in reversed(range(self._measurementsListWidget.count)):
+      prostateVolume = self._getItemWidget(row).getProstateVolume()
+      if prostateVolume:
+        return prostateVolume
+    return None
+
+  def _getItemWidget(self, row):
+    return self._measurementsListWidget.itemWidget(self._measurementsListWidget.item(row))
+
+  def _getRow(self, itemWidget):
+    for row in range(self._measurementsListWidget.count):
+      if self._getItemWidget(row) is itemWidget:
+        return row
+    return -1
 
   def _setupConnections(self):
     def setupConnections(funcName="connect"):
-      getattr(self._measurementsListWidget, funcName)("customContextMenuRequested(QPoint)", self._onFindingItemRightClicked)
-      getattr(self._measurementsListWidget.selectionModel(), funcName)("currentRowChanged(QModelIndex, QModelIndex)",
-                                                                       self._onFindingSelectionChanged)
+      getattr(self._measurementsListWidget, funcName)("customContextMenuRequested(QPoint)", self._onMeasurementItemRightClicked)
+      getattr(self._cancelButton.clicked, funcName)(self._onCancelButtonClicked)
+      getattr(self._undoButton.clicked, funcName)(self._onUndoButtonClicked)
 
     setupConnections()
     slicer.app.connect('aboutToQuit()', self.deleteLater)
     self.destroyed.connect(lambda : setupConnections(funcName="disconnect"))
 
-  def _onFindingItemRightClicked(self, point):
+  def _onMeasurementItemRightClicked(self, point):
     if not self._measurementsListWidget.currentIndex() or not self._measurementsListWidget.model().rowCount():
       return
     self.listMenu = qt.QMenu()
     menu_item = self.listMenu.addAction("Remove Item")
-    menu_item.triggered.connect(self._onRemoveFindingRequested)
+    menu_item.triggered.connect(self._onRemoveMeasurementRequested)
     parentPosition = self._measurementsListWidget.mapToGlobal(qt.QPoint(0, 0))
     self.listMenu.move(parentPosition + point)
     self.listMenu.show()
 
-  def _onRemoveFindingRequested(self):
-    currentIndex = self._measurementsListWidget.currentIndex()
-    finding = self._findingsListModel.getFindings()[currentIndex.row()]
-    if slicer.util.confirmYesNoDisplay("Finding '{}' is about to be deleted. "
-                                       "Do you want to proceed?".format(finding.getName())):
-      self._findingsListModel.removeFinding(finding)
-      self._deleteFindingInformationWidget()
-      self._updateButtons()
+  def _onRemoveMeasurementRequested(self):
+    row = self._measurementsListWidget.currentRow
+    itemWidget = self._getItemWidget(row)
+    if not slicer.util.confirmYesNoDisplay("Measurement '{}' is about to be deleted. "
+                                           "Do you want to proceed?".format(itemWidget.getName())):
+      return
+    if itemWidget is self._reportedMeasurementItem:
+      self.setReportedProstateVolume(None)
+      return
+    if itemWidget.getName() == self.LINEAR_MEASUREMENT:
+      # removes the list item as well
+      self._linearMeasurementSession.cancel()
+      return
+    self._removeGlandSegmentation()
+    self._actions[itemWidget.getName()].setEnabled(True)
+    self._measurementsListWidget.takeItem(row)
+    self._updateButtons()
 
-  def _onFindingSelectionChanged(self, current, previous):
-    self._deleteFindingInformationWidget()
+  def _removeGlandSegmentation(self):
+    self._glandSegmentEditorWidget.clearData()
+    self._glandSegmentationFrame.layout().removeWidget(self._glandSegmentEditorWidget.editor)
+    self._glandSegmentEditorWidget = None
+    self._glandSegmentationFrame.hide()
+    self._glandFinding.removeEventObserver(Finding.DataChangedEvent, self._onGlandSegmentationChanged)
+    self._glandFinding.deleteAnnotation(self._glandSeriesType, self.GLAND_MRML_NODE_CLASS)
+    self._glandFinding = None
 
-    row = current.row()
-    if row >= 0:
-      finding =  self._findingsListModel.getFindings()[row]
-      # TODO: jump to centroid of lesion
+  def _updateButtons(self):
+    self._addMeasurementsButton.setEnabled(any(action.enabled for action in self._actions.values()))
+    placing = self._linearMeasurementSession is not None and \
+              self._linearMeasurementSession.state == LinearMeasurementSession.PLACING
+    self._cancelButton.visible = placing
+    self._undoButton.visible = placing
+    self._undoButton.enabled = placing and len(self._linearMeasurementSession.getMeasurements()) > 0
 
-    self._updateButtons()
 
-  def _onAddMeasurementButtonClicked(self):
-    # TODO: findings assessment
-    # TODO: add segmentation and enable editor
-    listWidgetItem = qt.QListWidgetItem(self._measurementsListWidget)
-    self._measurementsListWidget.addItem(listWidgetItem)
-    findingsItemWidget = ProstateMeasurementItemWidget()
-    listWidgetItem.setSizeHint(findingsItemWidget.sizeHint)
-    self._findingsListWidget.setItemWidget(listWidgetItem, findingsItemWidget)
+class LinearMeasurementSession(ParameterNodeObservationMixin):
+  """ Guides the user through placing one ruler per orientation for a linear gland measurement
 
-    self._findingsListWidget.selectionModel().clear()
-    model = self._findingsListWidget.model()
-    self._findingsListWidget.selectionModel().setCurrentIndex(model.index(model.rowCount()-1, 0),
-                                                              qt.QItemSelectionModel.Select)
+  The volume used for each orientation is determined once when the session gets created. Rulers are placed one after
+  another and the session can be canceled or the last placement can be undone at any time.
 
-    self.updateButtons()
+  :param volumeSeriesTypes: dictionary mapping volume nodes to SeriesType instances. Defaults to the volumes observed
+                            by VolumeSeriesTypeSceneObserver.
+  """
 
-  def _updateButtons(self):
-    pass
-    # self._addMeasurementsButton.setEnabled(self._findingsListModel.rowCount() < self._maximumFindingCount)
+  ORIENTATIONS = ["Axial", "Sagittal", "Coronal"]
+  DEFAULT_SERIES_TYPES = {"Axial": T2a, "Sagittal": T2s, "Coronal": T2c}
+  ALTERNATIVE_SERIES_TYPE = T2a
+
+  IDLE = "Idle"
+  PLACING = "Placing"
+  FINISHED = "Finished"
+  CANCELED = "Canceled"
+
+  StartedEvent = events.StartedEvent
+  FinishedEvent = events.FinishedEvent
+  CanceledEvent = events.CanceledEvent
+  DataChangedEvent = events.DataChangedEvent
+
+  @property
+  def state(self):
+    return self._state
+
+  def __init__(self, volumeSeriesTypes=None):
+    if volumeSeriesTypes is None:
+      volumeSeriesTypes = VolumeSeriesTypeSceneObserver().volumeSeriesTypes
+    self._volumes = self._mapOrientationsToVolumes(volumeSeriesTypes)
+    self._rulers = OrderedDict()
+    self._pendingOrientation = None
+    self._pendingRuler = None
+    self._state = self.IDLE
+
+  def _mapOrientationsToVolumes(self, volumeSeriesTypes):
+    volumesBySeriesType = dict()
+    for volume, seriesType in volumeSeriesTypes.items():
+      volumesBySeriesType.setdefault(seriesType.__class__, volume)
+    volumes = OrderedDict()
+    for orientation in self.ORIENTATIONS:
+      volume = volumesBySeriesType.get(self.DEFAULT_SERIES_TYPES[orientation]) or \
+               volumesBySeriesType.get(self.ALTERNATIVE_SERIES_TYPE)
+      if volume:
+        volumes[orientation] = volume
+      else:
+        logging.error("Volume with series type %s for %s measurement not found" %
+                      (self.DEFAULT_SERIES_TYPES[orientation].getName(), orientation.lower()))
+    return volumes
+
+  def getVolume(self, orientation):
+    return self._volumes.get(orientation)
+
+  def getPendingOrientation(self):
+    """ Returns the orientation that currently needs to be measured or None if no placement is in progress """
+    return self._pendingOrientation
+
+  def getMeasurements(self):
+    """ Returns dictionary mapping orientations to placed Ruler annotations """
+    return self._rulers
+
+  def getRulerNodes(self):
+    return [ruler.mrmlNode for ruler in self._rulers.values()]
+
+  def start(self):
+    self._state = self.PLACING
+    self.invokeEvent(self.StartedEvent)
+    self._placeNext()
+
+  def cancel(self):
+    """ Stops placement and removes all rulers of this session """
+    self.reset()
+    self._state = self.CANCELED
+    self.invokeEvent(self.CanceledEvent)
+
+  def undo(self):
+    """ Removes the most recently placed ruler and restarts placement for its orientation """
+    if not self._rulers:
+      return
+    self._removePendingRuler()
+    _, ruler = self._rulers.popitem()
+    self._deleteRuler(ruler)
+    self._state = self.PLACING
+    self.invokeEvent(self.DataChangedEvent)
+    self._placeNext()
+
+  def reset(self):
+    self._removePendingRuler()
+    for ruler in self._rulers.values():
+      self._deleteRuler(ruler)
+    self._rulers = OrderedDict()
+    self._state = self.IDLE
+
+  def _placeNext(self):
+    for orientation, volume in self._volumes.items():
+      if orientation not in self._rulers:
+        # TODO: set orientations!
+        # TODO: enable only the viewer to create annotation in
+        self._pendingOrientation = orientation
+        self._pendingRuler = Ruler(volume)
+        self._pendingRuler.addEventObserver(Ruler.AnnotationFinishedEvent, self._onRulerPlaced)
+        self._pendingRuler.addEventObserver(Ruler.AnnotationCanceledEvent, self._onRulerPlacementCanceled)
+        self.invokeEvent(self.DataChangedEvent)
+        return
+    self._state = self.FINISHED
+    self.invokeEvent(self.FinishedEvent)
+
+  def _onRulerPlaced(self, caller=None, event=None):
+    ruler = self._pendingRuler
+    self._removeRulerObservers(ruler)
+    self._rulers[self._pendingOrientation] = ruler
+    self._pendingRuler = None
+    self._pendingOrientation = None
+    ruler.addEventObserver(Ruler.DataChangedEvent, self._onRulerModified)
+    self._placeNext()
+
+  def _onRulerPlacementCanceled(self, caller=None, event=None):
+    self.cancel()
+
+  def _onRulerModified(self, caller=None, event=None):
+    self.invokeEvent(self.DataChangedEvent)
+
+  def _removePendingRuler(self):
+    if self._pendingRuler:
+      self._removeRulerObservers(self._pendingRuler)
+      self._pendingRuler.cleanup()
+      self._pendingRuler.delete()
+      self._pendingRuler = None
+      self._pendingOrientation = None
+
+  def _removeRulerObservers(self, ruler):
+    ruler.removeEventObserver(Ruler.AnnotationFinishedEvent, self._onRulerPlaced)
+    ruler.removeEventObserver(Ruler.AnnotationCanceledEvent, self._onRulerPlacementCanceled)
+
+  def _deleteRuler(self, ruler):
+    ruler.removeEventObserver(Ruler.DataChangedEvent, self._onRulerModified)
+    ruler.delete()
 
 
 class ProstateMeasurementItemWidget(qt.QWidget):
+  """ List item displaying the gland volume of one prostate measurement
 
-  def __init__(self):
+  :param name: measurement type e.g. ProstateWidget.LINEAR_MEASUREMENT
+  :param icon: QIcon representing the measurement type
+  """
+
+  def __init__(self, name, icon):
     super(ProstateMeasurementItemWidget, self).__init__()
-    self.modulePath = os.path.dirname(slicer.util.modulePath("SlicerPIRADS"))
+    self._name = name
+    self._icon = icon
+    self._prostateVolume = None
     self.setup()
     self._processData()
 
   def setup(self):
-    self.setLayout(qt.QGridLayout())
-    path = os.path.join(self.modulePath, 'Resources', 'UI', 'ProstateMeasurementItemWidget.ui')
-    self.ui = slicer.util.loadUI(path)
+    self.setLayout(qt.QHBoxLayout())
+    self._measurementIconLabel = qt.QLabel()
+    self._measurementIconLabel.setPixmap(self._icon.pixmap(qt.QSize(24, 24)))
+    self._measurementLabel = qt.QLabel()
+    self.layout().addWidget(self._measurementIconLabel)
+    self.layout().addWidget(self._measurementLabel, 1)
 
-    self._measurementIconLabel = self.ui.findChild(qt.QLabel, "measurementTypeLabel")
-    self._measurementLabel = self.ui.findChild(qt.QLabel, "measurementLabel")
+  def getName(self):
+    return self._name
 
-    self.layout().addWidget(self.ui)
+  def getProstateVolume(self):
+    return self._prostateVolume
+
+  def setProstateVolume(self, prostateVolume):
+    self._prostateVolume = prostateVolume
+    self._processData()
 
   def _processData(self):
-    return
-    icon = self._finding.getIcon()
-    # self._measurementTypeLabel.setPixmap(icon.pixmap(qt.QSize(32, 32)))
-    #
-    # self._findingNameLabel.text = self._finding.getName()
-    # self._locationLabel.text = self._finding.getLocation()
-    # self._measurementLabel.text = str(self._finding.getMeasurementValue())
\ No newline at end of file
+    if not self._prostateVolume:
+      self._measurementLabel.text = "{}: pending".format(self._name)
+      return
+    self._measurementLabel.text = "{}: {:.1f} ml".format(self._name, self._prostateVolume.volume)
+    if self._prostateVolume.method == ProstateVolume.LINEAR:
+      self._measurementLabel.toolTip = " x ".join("{:.1f} mm".format(d) for d in self._prostateVolume.dimensions)
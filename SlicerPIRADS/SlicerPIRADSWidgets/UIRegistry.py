@@ -0,0 +1,92 @@
+import os
+import qt
+import slicer
+
+from SlicerDevelopmentToolboxUtils.decorators import singleton
+
+
+@singleton
+class UIRegistry(object):
+  """ Loads user interface files and icons of SlicerPIRADS
+
+  The module path is resolved once, every .ui file is read from disk once and all widgets are created by one shared
+  QUiLoader from the cached file content. Widgets that can safely be shared (e.g. off-screen dialogs used for
+  rendering) are handed out by getSharedWidget.
+  """
+
+  MODULE_NAME = "SlicerPIRADS"
+
+  @property
+  def modulePath(self):
+    if not self._modulePath:
+      self._modulePath = os.path.dirname(slicer.util.modulePath(self.MODULE_NAME))
+    return self._modulePath
+
+  def __init__(self):
+    self._modulePath = None
+    self._loader = None
+    self._templates = dict()
+    self._icons = dict()
+    self._sharedWidgets = dict()
+
+  def getResourcePath(self, *parts):
+    """ Returns absolute path of a file within the Resources directory of the module """
+    return os.path.join(self.modulePath, 'Resources', *parts)
+
+  def getTemplate(self, fileName):
+    """ Returns content of Resources/UI/<fileName> as QByteArray. The file is only read on first request. """
+    try:
+      return self._templates[fileName]
+    except KeyError:
+      with open(self.getResourcePath('UI', fileName), 'rb') as f:
+        template = qt.QByteArray(f.read())
+      self._templates[fileName] = template
+      return template
+
+  def preload(self, fileNames=None):
+    """ Reads all (or the given) .ui files into the cache """
+    if fileNames is None:
+      fileNames = [f for f in os.listdir(self.getResourcePath('UI')) if f.endswith('.ui')]
+    for fileName in fileNames:
+      self.getTemplate(fileName)
+
+  def loadUI(self, fileName):
+    """ Creates a new widget from Resources/UI/<fileName>
+
+    :param fileName: name of the .ui file e.g. 'FindingsWidget.ui'
+    :return: widget
+    """
+    buffer = qt.QBuffer()
+    buffer.setData(self.getTemplate(fileName))
+    buffer.open(qt.QIODevice.ReadOnly)
+    try:
+      return self._getLoader().load(buffer)
+    finally:
+      buffer.close()
+
+  def _getLoader(self):
+    if not self._loader:
+      self._loader = qt.QUiLoader()
+      self._loader.setWorkingDirectory(qt.QDir(self.getResourcePath('UI')))
+    return self._loader
+
+  def getIcon(self, *parts):
+    """ Returns cached QIcon of Resources/<parts> e.g. getIcon('Icons', 'Ruler.png') """
+    try:
+      return self._icons[parts]
+    except KeyError:
+      icon = qt.QIcon(self.getResourcePath(*parts))
+      self._icons[parts] = icon
+      return icon
+
+  def getSharedWidget(self, key, factory):
+    """ Returns the widget registered for key and creates it by calling factory on first request
+
+    Only use this for widgets that are not displayed permanently and whose state gets set by each user.
+    """
+    try:
+      return self._sharedWidgets[key]
+    except KeyError:
+      widget = factory()
+      self._sharedWidgets[key] = widget
+      return widget
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import unittest
+import logging
+import inspect
+import shutil
+import tempfile
+
+from SlicerPIRADSCore import DICOMDatabaseQueries
+from SlicerPIRADSCore.Cache import LRUCache
+from SlicerPIRADSCore.DICOMDatabaseQueries import getFilesForInstances, queryFilesForInstances, \
+  queryModalitiesForFiles, querySeriesModalities
+
+
+class DICOMDatabaseStub(object):
+
+  def __init__(self, databaseFilename):
+    self.databaseFilename = databaseFilename
+    self.requestedInstances = []
+
+  def fileForInstance(self, uid):
+    self.requestedInstances.append(uid)
+    return "/memory/%s.dcm" % uid
+
+
+class DICOMDatabaseQueriesTests(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.databaseFilename = os.path.join(self.directory, "ctkDICOM.sql")
+    connection = sqlite3.connect(self.databaseFilename)
+    connection.execute("CREATE TABLE Images (SOPInstanceUID VARCHAR(64), Filename VARCHAR(1024), SeriesInstanceUID "
+                       "VARCHAR(64), InsertTimestamp VARCHAR(20))")
+    connection.executemany("INSERT INTO Images VALUES (?, ?, '1.2', '')",
+                           [("1.2.%d" % i, "/data/%d.dcm" % i) for i in range(20)] + [("1.3", "dicom/1.3.dcm")])
+    connection.execute("CREATE TABLE Series (SeriesInstanceUID VARCHAR(64), Modality VARCHAR(20))")
+    connection.executemany("INSERT INTO Series VALUES (?, ?)", [("1.2", "MR"), ("2.2", "SR")])
+    connection.commit()
+    connection.close()
+
+  def tearDown(self):
+    shutil.rmtree(self.directory, ignore_errors=True)
+
+  def test_query_files_for_instances(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    maximumNumberOfQueryParameters = DICOMDatabaseQueries.MAXIMUM_NUMBER_OF_QUERY_PARAMETERS
+    DICOMDatabaseQueries.MAXIMUM_NUMBER_OF_QUERY_PARAMETERS = 3
+    try:
+      files = queryFilesForInstances(self.databaseFilename, ["1.2.%d" % i for i in range(10)] + ["1.2.0", "9.9"])
+    finally:
+      DICOMDatabaseQueries.MAXIMUM_NUMBER_OF_QUERY_PARAMETERS = maximumNumberOfQueryParameters
+    self.assertEqual(len(files), 10)
+    self.assertEqual(files["1.2.7"], "/data/7.dcm")
+    self.assertNotIn("9.9", files)
+
+  def test_relative_file_names(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    files = queryFilesForInstances(self.databaseFilename, ["1.3"])
+    self.assertEqual(files["1.3"], os.path.join(self.directory, "dicom", "1.3.dcm"))
+
+  def test_missing_database(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    with self.assertRaises(sqlite3.Error):
+      queryFilesForInstances(os.path.join(self.directory, "missing.sql"), ["1.3"])
+
+  def test_files_for_instances_fallback(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    database = DICOMDatabaseStub(self.databaseFilename)
+    files = getFilesForInstances(database, ["1.2.3", "9.9"])
+    self.assertEqual(files, {"1.2.3": "/data/3.dcm", "9.9": "/memory/9.9.dcm"})
+    self.assertEqual(database.requestedInstances, ["9.9"])
+
+    database = DICOMDatabaseStub(":memory:")
+    self.assertEqual(getFilesForInstances(database, ["1.2.3"]), {"1.2.3": "/memory/1.2.3.dcm"})
+
+  def test_query_modalities(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.assertEqual(querySeriesModalities(self.databaseFilename, ["1.2", "2.2", "3.3"]), {"1.2": "MR", "2.2": "SR"})
+    relativeFile = os.path.join(self.directory, "dicom", "1.3.dcm")
+    modalities = queryModalitiesForFiles(self.databaseFilename, ["/data/3.dcm", relativeFile, "/data/unknown.dcm"])
+    self.assertEqual(modalities, {"/data/3.dcm": "MR", relativeFile: "MR"})
+
+  def test_lru_cache(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    cache = LRUCache(maximumSize=2)
+    cache.put(("1.2", 1.0), "a")
+    cache.put(("1.3", 1.0), "b")
+    self.assertEqual(cache.get(("1.2", 1.0)), "a")
+    cache.put(("1.4", 1.0), "c")
+    self.assertNotIn(("1.3", 1.0), cache)
+    self.assertIsNone(cache.get(("1.2", 2.0)))
+    self.assertEqual(len(cache), 2)
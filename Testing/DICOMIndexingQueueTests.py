@@ -0,0 +1,47 @@
+import os
+import unittest
+import logging
+import inspect
+import shutil
+import tempfile
+
+from SlicerPIRADSCore.Workspace import hashFile
+from SlicerPIRADSLogic.DICOMIndexingQueue import storeFile, isWithinDirectory
+
+
+class DICOMIndexingQueueTests(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.fileName = os.path.join(self.directory, "sr.dcm")
+    with open(self.fileName, 'wb') as f:
+      f.write(b"\0" * 132)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory, ignore_errors=True)
+
+  def test_store_file(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    storageDirectory = os.path.join(self.directory, "Generated")
+    first = storeFile(self.fileName, storageDirectory)
+    second = storeFile(self.fileName, storageDirectory)
+
+    self.assertEqual(first, second)
+    self.assertEqual(os.path.basename(first), hashFile(self.fileName) + ".dcm")
+    self.assertEqual(os.path.dirname(first), storageDirectory)
+    self.assertTrue(os.path.samefile(first, self.fileName))
+    self.assertListEqual(os.listdir(storageDirectory), [os.path.basename(first)])
+    os.remove(self.fileName)
+    self.assertEqual(os.path.getsize(second), 132)
+
+    with open(self.fileName, 'wb') as f:
+      f.write(b"\1" * 132)
+    self.assertNotEqual(storeFile(self.fileName, storageDirectory), first)
+
+  def test_is_within_directory(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.assertTrue(isWithinDirectory(self.fileName, self.directory))
+    self.assertFalse(isWithinDirectory(self.fileName, self.directory + "2"))
+    self.assertFalse(isWithinDirectory(self.directory, self.fileName))
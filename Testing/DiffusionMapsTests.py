@@ -0,0 +1,66 @@
+import unittest
+import logging
+import inspect
+
+import numpy as np
+
+from SlicerPIRADSCore.DiffusionMaps import ADC_SCALE, computeDiffusionMaps, computeHighBValueImage, \
+  fitMonoExponential
+
+
+class DiffusionMapsTests(unittest.TestCase):
+
+  B_VALUES = [0, 100, 400, 800]
+
+  def _createSignals(self, s0, adc, bValues=None):
+    bValues = self.B_VALUES if bValues is None else bValues
+    return np.stack([s0 * np.exp(-b * adc) for b in bValues]).astype(np.float32)
+
+  def setUp(self):
+    shape = (5, 4, 3)
+    random = np.random.RandomState(42)
+    self.s0 = random.uniform(500, 1500, shape)
+    self.adc = random.uniform(0.5e-3, 2.5e-3, shape)
+    self.signals = self._createSignals(self.s0, self.adc)
+
+  def test_fit_mono_exponential(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    s0, adc = fitMonoExponential(self.signals, self.B_VALUES)
+    self.assertEqual(s0.dtype, np.float32)
+    self.assertEqual(adc.shape, self.adc.shape)
+    np.testing.assert_allclose(s0, self.s0, rtol=1e-3)
+    np.testing.assert_allclose(adc, self.adc, rtol=1e-3)
+
+  def test_chunk_size_independence(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    expected = fitMonoExponential(self.signals, self.B_VALUES, chunkSize=self.signals.shape[1])
+    for chunkSize in [1, 2, 3]:
+      for actual, reference in zip(fitMonoExponential(self.signals, self.B_VALUES, chunkSize=chunkSize), expected):
+        np.testing.assert_array_equal(actual, reference)
+
+  def test_compute_diffusion_maps(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    adc, highB = computeDiffusionMaps(self.signals, self.B_VALUES, highBValue=1400)
+    np.testing.assert_allclose(adc, self.adc * ADC_SCALE, rtol=1e-3)
+    np.testing.assert_allclose(highB, self.s0 * np.exp(-1400 * self.adc), rtol=1e-2)
+    np.testing.assert_allclose(computeHighBValueImage(self.s0, self.adc, 0), self.s0, rtol=1e-6)
+
+  def test_negative_diffusion_and_background(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    signals = self._createSignals(np.array([[[100.0, 0.0]]]), np.array([[[-1e-3, 1e-3]]]))
+    s0, adc = fitMonoExponential(signals, self.B_VALUES)
+    self.assertEqual(adc[0, 0, 0], 0)
+    self.assertTrue(np.all(np.isfinite(s0)))
+    self.assertTrue(np.all(np.isfinite(adc)))
+
+  def test_invalid_b_values(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    with self.assertRaises(ValueError):
+      fitMonoExponential(self.signals, [800] * len(self.B_VALUES))
+    with self.assertRaises(ValueError):
+      fitMonoExponential(self.signals, self.B_VALUES[:2])
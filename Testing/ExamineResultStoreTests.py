@@ -0,0 +1,68 @@
+import os
+import unittest
+import logging
+import inspect
+import shutil
+import tempfile
+
+from SlicerPIRADSCore.ExamineResultStore import ExamineResult, ExamineResultStore
+
+
+class ExamineResultStoreTests(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.storeFileName = os.path.join(self.directory, "SlicerPIRADS", "ExamineResults.sql")
+    self.files = []
+    for i in range(3):
+      fileName = os.path.join(self.directory, "%d.dcm" % i)
+      with open(fileName, 'wb') as f:
+        f.write(b"\0" * 132)
+      self.files.append(fileName)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory, ignore_errors=True)
+
+  def test_results_persist_across_sessions(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    store = ExamineResultStore(self.storeFileName)
+    store.put([ExamineResult(self.files[0], "1.2.3", "PI-RADS Report", True),
+               ExamineResult(self.files[1], "", "Unknown", False)])
+    store.close()
+
+    store = ExamineResultStore(self.storeFileName)
+    results = store.get(self.files)
+    store.close()
+    self.assertEqual(sorted(results.keys()), self.files[:2])
+    self.assertTrue(results[self.files[0]].isQIICRX)
+    self.assertEqual(results[self.files[0]].sopInstanceUID, "1.2.3")
+    self.assertEqual(results[self.files[1]].sopInstanceUID, "")
+
+  def test_modified_and_missing_files(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    store = ExamineResultStore(self.storeFileName)
+    store.put([ExamineResult(f, "1.2.%d" % i, "", False) for i, f in enumerate(self.files)])
+    with open(self.files[0], 'ab') as f:
+      f.write(b"DICM")
+    os.remove(self.files[1])
+
+    results = store.get(self.files)
+    store.close()
+    self.assertEqual(list(results.keys()), [self.files[2]])
+
+  def test_schema_version_change(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    store = ExamineResultStore(self.storeFileName)
+    store.put([ExamineResult(self.files[0], "1.2.3", "", True)])
+    store.close()
+
+    ExamineResultStore.SCHEMA_VERSION += 1
+    try:
+      store = ExamineResultStore(self.storeFileName)
+      self.assertEqual(store.get(self.files), {})
+      store.close()
+    finally:
+      ExamineResultStore.SCHEMA_VERSION -= 1
@@ -0,0 +1,151 @@
+import os
+import json
+import unittest
+import logging
+import inspect
+import shutil
+import tempfile
+
+import pydicom
+from pydicom.dataset import Dataset, FileDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+from SlicerPIRADSCore.QIICRX import UID_ENHANCED_SR_STORAGE, addFindings, readFindings, readGlandVolume
+from SlicerPIRADSCore.SeriesType import ADC, DWIb, T2a
+from SlicerPIRADSLogic.Finding import Finding, FindingData
+from SlicerPIRADSLogic.FindingSerializer import FindingSerializer
+from SlicerPIRADSLogic.LesionAssessmentRules import LesionAssessmentRuleFactory
+from SlicerPIRADSLogic.ProstateMeasurement import ProstateVolume
+
+from SyntheticStudyGenerator import SyntheticStudyGenerator
+
+try:
+  from pydicom.dataset import FileMetaDataset
+except ImportError:
+  # pydicom < 2.0
+  FileMetaDataset = Dataset
+
+
+class VolumeNodeStub(object):
+
+  def __init__(self, name, seriesInstanceUID):
+    self._name = name
+    self.seriesInstanceUID = seriesInstanceUID
+
+  def GetName(self):
+    return self._name
+
+  def GetAttribute(self, name):
+    return None
+
+
+class SeriesInstanceUIDFindingSerializer(FindingSerializer):
+  """ Takes the SeriesInstanceUID from VolumeNodeStub instead of the DICOM database """
+
+  @classmethod
+  def getSeriesInstanceUID(cls, volumeNode):
+    return volumeNode.seriesInstanceUID
+
+
+class FindingSerializerTests(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.seriesTypes = [T2a(VolumeNodeStub("t2_tse_ax", "1.2.3.1")), ADC(VolumeNodeStub("adc", "1.2.3.2")),
+                        DWIb(VolumeNodeStub("dwi b1400", "1.2.3.3"))]
+    t2a, adc, dwib = self.seriesTypes
+
+    self.pzFinding = Finding("Finding 1")
+    self.pzFinding.setData(FindingData("Finding 1", ["PZpl_Base_R", "PZpm_Mid_R"], {t2a: 3, dwib: 4}))
+    self.pzFinding.addAnnotationReference(t2a, "vtkMRMLSegmentationNode", "/annotations/Finding_1_T2a.seg.nrrd")
+
+    self.tzFinding = Finding("Finding 2")
+    self.tzFinding.setData(FindingData("Finding 2", ["TZa_Mid_L", "PZa_Mid_L"], {adc: 5}),
+                           LesionAssessmentRuleFactory.getLesionAssessmentRuleForZone("TZ"))
+
+  def tearDown(self):
+    shutil.rmtree(self.directory, ignore_errors=True)
+
+  def _writeSR(self):
+    fileName = os.path.join(self.directory, "sr.dcm")
+    fileMeta = FileMetaDataset()
+    fileMeta.MediaStorageSOPClassUID = UID_ENHANCED_SR_STORAGE
+    fileMeta.MediaStorageSOPInstanceUID = generate_uid()
+    fileMeta.TransferSyntaxUID = ExplicitVRLittleEndian
+    dataset = FileDataset(fileName, {}, file_meta=fileMeta, preamble=b"\0" * 128)
+    dataset.SOPClassUID = UID_ENHANCED_SR_STORAGE
+    dataset.SOPInstanceUID = fileMeta.MediaStorageSOPInstanceUID
+    dataset.Modality = "SR"
+    dataset.ValueType = "CONTAINER"
+    item = Dataset()
+    item.RelationshipType = "CONTAINS"
+    item.ValueType = "TEXT"
+    item.TextValue = "other content"
+    dataset.ContentSequence = [item]
+    SyntheticStudyGenerator._write(dataset, fileName)
+    return fileName
+
+  def _assertEqualFindings(self, expected, actual):
+    self.assertEqual([f.getName() for f in actual], [f.getName() for f in expected])
+    for expectedFinding, actualFinding in zip(expected, actual):
+      self.assertEqual(actualFinding.getSectors(), expectedFinding.getSectors())
+      self.assertEqual(actualFinding.getAssessmentRule().ZONE, expectedFinding.getAssessmentRule().ZONE)
+      self.assertEqual({s: str(v) for s, v in actualFinding.getAssessmentScores().items()},
+                       {s: str(v) for s, v in expectedFinding.getAssessmentScores().items()})
+      self.assertEqual(actualFinding.getAnnotationReferences(), expectedFinding.getAnnotationReferences())
+
+  def test_serialize_deserialize(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    findings = [self.pzFinding, self.tzFinding]
+    data = SeriesInstanceUIDFindingSerializer.serialize(findings, annotationDirectory=self.directory)
+    self.assertEqual(data[0]["annotations"][0]["seriesInstanceUID"], "1.2.3.1")
+    self.assertEqual(data[1]["rule"], "TZ")
+
+    restored = SeriesInstanceUIDFindingSerializer.deserialize(json.loads(json.dumps(data)), self.seriesTypes)
+    self._assertEqualFindings(findings, restored)
+
+  def test_series_type_fallback(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    data = SeriesInstanceUIDFindingSerializer.serialize([self.pzFinding], annotationDirectory=self.directory)
+    seriesTypes = [T2a(VolumeNodeStub("t2_tse_ax", "2.3.4.1")), DWIb(VolumeNodeStub("dwi b1400", "2.3.4.3"))]
+    restored = SeriesInstanceUIDFindingSerializer.deserialize(data, seriesTypes)
+    self.assertEqual(sorted(restored[0].getAssessmentScores().values()), [3, 4])
+    self.assertEqual(list(restored[0].getAnnotationReferences().keys()), [(seriesTypes[0], "vtkMRMLSegmentationNode")])
+
+  def test_round_trip_through_report(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    findings = [self.pzFinding, self.tzFinding]
+    fileName = self._writeSR()
+    self.assertEqual(readFindings(pydicom.dcmread(fileName)), [])
+
+    addFindings(fileName, SeriesInstanceUIDFindingSerializer.serialize(findings, annotationDirectory=self.directory))
+    addFindings(fileName, SeriesInstanceUIDFindingSerializer.serialize(findings, annotationDirectory=self.directory))
+    dataset = pydicom.dcmread(fileName)
+    self.assertEqual(len(dataset.ContentSequence), 2)
+    self.assertEqual(dataset.ContentSequence[0].TextValue, "other content")
+
+    restored = SeriesInstanceUIDFindingSerializer.deserialize(readFindings(dataset), self.seriesTypes)
+    self._assertEqualFindings(findings, restored)
+
+  def test_gland_volume_round_trip_through_report(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    fileName = self._writeSR()
+    self.assertIsNone(readGlandVolume(pydicom.dcmread(fileName)))
+
+    prostateVolume = ProstateVolume(ProstateVolume.LINEAR, 37.7, (42.0, 45.0, 38.0))
+    addFindings(fileName, [], ProstateVolume(ProstateVolume.VOLUMETRIC, 12.0).toDict())
+    addFindings(fileName, [], prostateVolume.toDict(psa=7.54))
+    dataset = pydicom.dcmread(fileName)
+    self.assertEqual(len(dataset.ContentSequence), 3)
+
+    glandVolume = readGlandVolume(dataset)
+    self.assertAlmostEqual(glandVolume["psaDensity"], 0.2)
+    restored = ProstateVolume.fromDict(glandVolume)
+    self.assertEqual(restored.method, ProstateVolume.LINEAR)
+    self.assertEqual(restored.volume, 37.7)
+    self.assertEqual(restored.dimensions, (42.0, 45.0, 38.0))
+    self.assertIsNone(ProstateVolume.fromDict(None))
@@ -0,0 +1,75 @@
+import unittest
+import logging
+import inspect
+
+import numpy as np
+
+from SlicerPIRADSLogic.LesionQuantification import computeLesionMeasurement, getLineEndpoints, getMaximumDistance
+
+
+class LesionQuantificationTests(unittest.TestCase):
+
+  def setUp(self):
+    self.mask = np.zeros((10, 20, 30), dtype=np.uint8)
+    self.mask[2:5, 3:7, 4:9] = 1
+    self.ijkToRAS = np.diag([0.5, 0.5, 3.0, 1.0])
+
+  def test_volume_and_bounding_box(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    measurement = computeLesionMeasurement(self.mask, self.ijkToRAS)
+    self.assertEqual(measurement.voxelCount, 3 * 4 * 5)
+    self.assertAlmostEqual(measurement.volume, 60 * 0.5 * 0.5 * 3.0)
+    self.assertEqual(measurement.boundingBox, ((2.0, 1.5, 6.0), (4.0, 3.0, 12.0)))
+
+  def test_maximum_diameter(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    measurement = computeLesionMeasurement(self.mask, self.ijkToRAS)
+    self.assertAlmostEqual(measurement.maximumDiameter, np.sqrt(2.0 ** 2 + 1.5 ** 2 + 6.0 ** 2))
+    self.assertFalse(measurement.exceedsSizeThreshold())
+    self.assertTrue(measurement.exceedsSizeThreshold(5.0))
+
+    points = np.random.RandomState(0).rand(100, 3)
+    expected = max(np.linalg.norm(a - b) for a in points for b in points)
+    self.assertAlmostEqual(getMaximumDistance(points, tileSize=7), expected)
+
+  def test_line_endpoints(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    mask = np.ones((3, 3, 3), dtype=bool)
+    mask[1, 1, 1:] = False
+    endpoints = getLineEndpoints(mask)
+    self.assertEqual(len(endpoints), 2 * 9)
+    self.assertIn([1, 1, 0], endpoints.tolist())
+    self.assertNotIn([1, 1, 2], endpoints.tolist())
+
+    mask = np.random.RandomState(0).rand(6, 7, 8) > 0.7
+    allVoxels = np.argwhere(mask).astype(np.float64)
+    self.assertAlmostEqual(getMaximumDistance(getLineEndpoints(mask)), getMaximumDistance(allVoxels))
+
+  def test_summary(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    summary = computeLesionMeasurement(self.mask, self.ijkToRAS).getSummary()
+    self.assertEqual(list(summary.keys()), ["Maximum diameter", "Volume", "Bounding box"])
+    self.assertEqual(summary["Bounding box"], "2.0 x 1.5 x 6.0 mm")
+    self.assertEqual(computeLesionMeasurement(np.zeros((3, 3, 3)), np.identity(4)).getSummary(), {})
+
+  def test_intensities(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    adc = np.arange(10 * 20 * 30, dtype=np.float32).reshape((10, 20, 30))
+    rasToIJK = np.linalg.inv(self.ijkToRAS)
+    measurement = computeLesionMeasurement(self.mask, self.ijkToRAS, {"ADC": (adc, rasToIJK)})
+    values = adc[2:5, 3:7, 4:9]
+    self.assertAlmostEqual(measurement.intensities["ADC"]["mean"], float(values.mean()))
+    self.assertAlmostEqual(measurement.intensities["ADC"]["median"], float(np.median(values)))
+
+  def test_empty_mask(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    measurement = computeLesionMeasurement(np.zeros((3, 3, 3)), np.identity(4))
+    self.assertEqual(measurement.voxelCount, 0)
+    self.assertEqual(measurement.maximumDiameter, 0.0)
+    self.assertIsNone(measurement.boundingBox)
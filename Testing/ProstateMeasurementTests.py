@@ -0,0 +1,31 @@
+import unittest
+import logging
+import inspect
+import math
+
+from SlicerPIRADSLogic.ProstateMeasurement import ProstateVolume, calculateEllipsoidVolume, calculatePSADensity, \
+  findPSAValue
+
+
+class ProstateMeasurementTests(unittest.TestCase):
+
+  def test_ellipsoid_volume(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.assertAlmostEqual(calculateEllipsoidVolume(40.0, 50.0, 30.0), math.pi / 6.0 * 60000.0)
+    self.assertAlmostEqual(calculateEllipsoidVolume(10.0, 10.0, 10.0), 523.5987755982989)
+
+  def test_psa_density(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.assertAlmostEqual(calculatePSADensity(6.0, 40.0), 0.15)
+    self.assertIsNone(calculatePSADensity(None, 40.0))
+    self.assertIsNone(calculatePSADensity(6.0, 0.0))
+    self.assertAlmostEqual(ProstateVolume(ProstateVolume.VOLUMETRIC, 30.0).getPSADensity(4.5), 0.15)
+
+  def test_psa_from_form_data(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    data = {"Patient Clinical Information": {"PSA history": {"PSA last value [ng/mL]": 7.2, "Date": ""}}}
+    self.assertEqual(findPSAValue(data), 7.2)
+    self.assertIsNone(findPSAValue({"PSA history": {"PSA last value [ng/mL]": ""}}))
@@ -0,0 +1,53 @@
+import unittest
+import logging
+import inspect
+
+from SlicerPIRADSLogic.ProstateSector import ProstateSector, ProstateSectorSet
+
+
+class ProstateSectorTests(unittest.TestCase):
+
+  def test_enumeration_size(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.assertEqual(len(ProstateSector.NAMES), 39)
+    self.assertEqual(ProstateSector.ALL_MASK, (1 << 39) - 1)
+
+  def test_names_round_trip(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    sectors = ProstateSectorSet(["TZa_Mid_L", "PZpl_Base_R"])
+    self.assertListEqual(sectors.toNames(), ["PZpl_Base_R", "TZa_Mid_L"])
+    self.assertEqual(ProstateSectorSet.fromMask(sectors.mask), sectors)
+    self.assertIn("TZa_Mid_L", sectors)
+    self.assertNotIn("TZa_Mid_R", sectors)
+    self.assertEqual(len(sectors), 2)
+
+  def test_unknown_sector(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    with self.assertRaises(ValueError):
+      ProstateSectorSet(["XZ_Base_R"])
+
+  def test_set_operations(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    first = ProstateSectorSet(["PZpl_Base_R", "PZpl_Mid_R"])
+    second = ProstateSectorSet(["PZpl_Mid_R", "TZp_Mid_R"])
+    self.assertTrue(first.overlaps(second))
+    self.assertListEqual((first & second).toNames(), ["PZpl_Mid_R"])
+    self.assertEqual(len(first | second), 3)
+    self.assertListEqual((first - second).toNames(), ["PZpl_Base_R"])
+    self.assertFalse(first.overlaps(["AS_Apex_L"]))
+
+  def test_projections(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    sectors = ProstateSectorSet(["PZpl_Base_R", "TZa_Apex_L", "Seminal_Vesicle_L"])
+    self.assertListEqual(sectors.zones(), ["PZpl", "TZa", "SV"])
+    self.assertListEqual(sectors.zoneGroups(), ["PZ", "TZ", "SV"])
+    self.assertListEqual(sectors.levels(), ["Vesicle", "Base", "Apex"])
+    self.assertTrue(sectors.isInZone("PZ"))
+    self.assertFalse(sectors.isInZone("CZ"))
+    self.assertEqual(len(ProstateSectorSet.fromZone("PZ")), 16)
+    self.assertEqual(len(ProstateSectorSet.fromLevel("Base")), 12)
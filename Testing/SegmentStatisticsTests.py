@@ -0,0 +1,51 @@
+import unittest
+import logging
+import inspect
+
+import numpy as np
+
+from SlicerPIRADSLogic.SegmentStatistics import SegmentStatistics, getExtentRegion, getExtentUnion, updateMaskInRegion
+
+
+class SegmentStatisticsTests(unittest.TestCase):
+
+  def test_extent_region(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    extent = (10, 19, 0, 9, 5, 6)
+    self.assertEqual(getExtentRegion((12, 13, -5, 2, 6, 8), extent), (slice(1, 2), slice(0, 3), slice(2, 4)))
+    self.assertIsNone(getExtentRegion((0, 9, 0, 9, 5, 6), extent))
+    self.assertEqual(getExtentUnion(None, (1, 2, 3, 4, 5, 6)), (1, 2, 3, 4, 5, 6))
+    self.assertEqual(getExtentUnion((1, 2, 3, 4, 5, 6), (0, 1, 4, 8, 5, 5)), (0, 2, 3, 8, 5, 6))
+
+  def test_mask_update_within_region(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    mask = np.zeros((10, 10, 10), dtype=bool)
+    mask[2:4, 2:4, 2:4] = True
+    mask[8, 8, 8] = True
+    current = mask.copy()
+    current[3, 3, 3] = False
+    current[6:8, 5, 5] = True
+
+    region = (slice(3, 8), slice(3, 6), slice(3, 6))
+    added, removed = updateMaskInRegion(mask, current[region], region)
+    self.assertListEqual(sorted(map(tuple, added)), [(6, 5, 5), (7, 5, 5)])
+    self.assertListEqual(list(map(tuple, removed)), [(3, 3, 3)])
+    self.assertTrue(np.array_equal(mask, current))
+
+    added, removed = updateMaskInRegion(mask, np.zeros((1, 1, 1), dtype=bool), (slice(8, 9),) * 3)
+    self.assertEqual(len(added), 0)
+    self.assertListEqual(list(map(tuple, removed)), [(8, 8, 8)])
+
+  def test_running_intensities(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    statistics = SegmentStatistics(voxelVolume=2.0)
+    statistics.voxelCount = 3
+    statistics.add("ADC", [1.0, 2.0, 6.0])
+    self.assertEqual(statistics.volume, 6.0)
+    self.assertAlmostEqual(statistics.getMeanIntensity("ADC"), 3.0)
+    statistics.add("ADC", [6.0], sign=-1)
+    self.assertAlmostEqual(statistics.getMeanIntensity("ADC"), 1.5)
+    self.assertIsNone(statistics.getMeanIntensity("T2"))
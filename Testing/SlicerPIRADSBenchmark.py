@@ -0,0 +1,245 @@
+""" Benchmark suite of SlicerPIRADS using synthetic multi-parametric prostate MR studies
+
+Generates studies of several sizes (see SyntheticStudyGenerator.STUDY_SIZES), imports each into a temporary DICOM
+database and times series classification, eligibility scans, QIICRX report generation and loading, population of the
+data selection tables and report export. Results are written as JSON for regression tracking.
+
+Usage:
+
+  Slicer --no-main-window --additional-module-paths <SlicerPIRADS build dirs> \\
+    --python-script Testing/SlicerPIRADSBenchmark.py --sizes small medium --repeats 5 --output benchmark.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import traceback
+import numpy as np
+from collections import OrderedDict
+
+import slicer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from SyntheticStudyGenerator import SyntheticStudyGenerator, STUDY_SIZES
+
+from SlicerPIRADSLogic.Tracing import Tracer
+
+
+RESULTS_FORMAT_VERSION = 1
+
+
+class BenchmarkSkipped(Exception):
+  pass
+
+
+class SlicerPIRADSBenchmark(object):
+  """ Runs all benchmarks for the given study sizes and collects results
+
+  Each benchmark gets executed repeats times after one untimed warm up run. Tracing is enabled while measuring so that
+  counters (database queries, files read, ...) of the last repetition are stored with the results.
+  """
+
+  BENCHMARKS = ["classification", "eligibility scan", "qiicrx generation", "qiicrx load", "table population",
+                "report export"]
+
+  def __init__(self, workingDirectory, repeats=3, seed=0):
+    self.workingDirectory = workingDirectory
+    self.repeats = repeats
+    self.seed = seed
+    self.results = []
+
+  def run(self, sizeNames, benchmarks=None):
+    from DICOMLib import DICOMUtils
+    benchmarks = benchmarks if benchmarks else self.BENCHMARKS
+    generator = SyntheticStudyGenerator(seed=self.seed)
+    for sizeName in sizeNames:
+      size = STUDY_SIZES[sizeName]
+      logging.info("Generating %s study (%d instances)" % (sizeName, size.getNumberOfInstances()))
+      study = generator.generate(os.path.join(self.workingDirectory, "studies"), size)
+      with DICOMUtils.TemporaryDICOMDatabase(os.path.join(self.workingDirectory, "database", sizeName)) as db:
+        DICOMUtils.importDicom(study.directory, db)
+        context = {"study": study}
+        for name in benchmarks:
+          self._runBenchmark(name, study, context)
+    return self.results
+
+  def _runBenchmark(self, name, study, context):
+    func = getattr(self, "_benchmark" + "".join(word.capitalize() for word in name.split()))
+    result = OrderedDict([("benchmark", name), ("studySize", study.size.name),
+                          ("instances", len(study.getFiles())), ("repeats", self.repeats)])
+    tracer = Tracer()
+    tracingEnabled = tracer.enabled
+    try:
+      func(context)
+      seconds = []
+      for _ in range(self.repeats):
+        tracer.reset()
+        tracer.enabled = True
+        startTime = time.time()
+        func(context)
+        seconds.append(time.time() - startTime)
+        tracer.enabled = tracingEnabled
+      result["status"] = "ok"
+      result["seconds"] = seconds
+      result["min"] = min(seconds)
+      result["median"] = float(np.median(seconds))
+      result["counters"] = tracer.getCounters()
+    except BenchmarkSkipped as exc:
+      result["status"] = "skipped: {}".format(exc)
+    except Exception as exc:
+      logging.error(traceback.format_exc())
+      result["status"] = "failed: {}".format(exc)
+    finally:
+      tracer.enabled = tracingEnabled
+      slicer.mrmlScene.Clear(0)
+    logging.info("%-20s %-8s %s" % (name, study.size.name, result.get("median", result["status"])))
+    self.results.append(result)
+
+  def _benchmarkClassification(self, context):
+    from SlicerPIRADSLogic.SeriesType import SeriesTypeFactory
+    for series in context["study"].series:
+      seriesType = SeriesTypeFactory.getSeriesTypeForFiles(series.files)
+      if not seriesType or seriesType.getName() != series.expectedSeriesType:
+        logging.warning("Series '%s' classified as %s instead of %s" %
+                        (series.description, seriesType.getName() if seriesType else None, series.expectedSeriesType))
+
+  def _benchmarkEligibilityScan(self, context):
+    from DICOMQIICRXLoaderPlugin import DICOMQIICRXLoaderPluginClass
+    study = context["study"]
+    context["eligibleSeries"] = DICOMQIICRXLoaderPluginClass.getEligibleSeriesForStudy(study.studyInstanceUID)
+    DICOMQIICRXLoaderPluginClass.getQIICRXReportSeries(study.studyInstanceUID)
+
+  def _benchmarkQiicrxGeneration(self, context):
+    from DICOMQIICRXLoaderPlugin import DICOMQIICRXGenerator
+    try:
+      generator = DICOMQIICRXGenerator()
+    except AttributeError:
+      raise BenchmarkSkipped("qiicrxsr CLI (DCMQI extension) not available")
+    seriesUIDs = context.get("eligibleSeries") or [s.seriesInstanceUID for s in context["study"].series]
+    generator.generateReport(seriesUIDs)
+
+  def _benchmarkQiicrxLoad(self, context):
+    from DICOMQIICRXLoaderPlugin import DICOMQIICRXLoaderPluginClass
+    reportSeries = DICOMQIICRXLoaderPluginClass.getQIICRXReportSeries(context["study"].studyInstanceUID)
+    if not reportSeries:
+      raise BenchmarkSkipped("no QIICRX report available")
+    loader = DICOMQIICRXLoaderPluginClass()
+    loadables = loader.examineFiles(slicer.dicomDatabase.filesForSeries(reportSeries[0]))
+    if not loadables or not loader.load(loadables[0]):
+      raise RuntimeError("loading QIICRX report failed")
+    slicer.mrmlScene.Clear(0)
+
+  def _benchmarkTablePopulation(self, context):
+    from SlicerPIRADSWidgets.DataSelectionDialog import DataSelectionDialog
+    study = context["study"]
+    dialog = DataSelectionDialog()
+    try:
+      dialog._patientTableModel.getPatients()
+      dialog._fillStudiesList(study.patientID)
+      dialog._fillSeriesList(study.studyInstanceUID)
+    finally:
+      dialog.ui.deleteLater()
+      dialog.deleteLater()
+
+  def _benchmarkReportExport(self, context):
+    from SlicerPIRADSLogic.HTMLReportCreator import HTMLReportCreator
+    from SlicerPIRADSLogic.PIRADSAssessmentCategory import PIRADSAssessmentCategory
+    from SlicerPIRADSLogic.ProstateMeasurement import ProstateVolume
+    if "reportFindings" not in context:
+      # created during the untimed warm up run
+      context["reportFindings"] = self._createReportFindings(context["study"])
+    creator = HTMLReportCreator(PIRADSAssessmentCategory(context["reportFindings"]),
+                                prostateVolume=ProstateVolume(ProstateVolume.LINEAR, 37.7, (42.0, 45.0, 38.0)),
+                                psa=6.4)
+    fileName = os.path.join(self.workingDirectory, "report.html")
+    with open(fileName, 'w') as f:
+      f.write(creator.template.format(creator.style, creator.getData()))
+
+  def _createReportFindings(self, study):
+    """ Loads the T2 axial and ADC series of study and returns one scored and segmented finding per zone """
+    from DICOMLib import DICOMUtils
+    from SlicerPIRADSLogic.Finding import Finding
+    from SlicerPIRADSLogic.LesionQuantification import LesionQuantifier
+    from SlicerPIRADSLogic.SeriesType import VolumeSeriesTypeSceneObserver
+    seriesTypes = dict()
+    for series in study.series:
+      if series.expectedSeriesType in ("T2a", "ADC"):
+        for nodeID in DICOMUtils.loadSeriesByUID([series.seriesInstanceUID]):
+          volume = slicer.mrmlScene.GetNodeByID(nodeID)
+          seriesType = VolumeSeriesTypeSceneObserver().volumeSeriesTypes.get(volume)
+          if seriesType:
+            seriesTypes[series.expectedSeriesType] = seriesType
+    if "T2a" not in seriesTypes:
+      raise RuntimeError("loading T2 axial series failed")
+
+    quantifier = LesionQuantifier()
+    findings = []
+    for name, sectors, center in [("Finding 1", ["PZpl_Mid_R", "PZpm_Mid_R"], (0.5, 0.6, 0.35)),
+                                  ("Finding 2", ["TZa_Mid_L"], (0.5, 0.4, 0.6))]:
+      finding = Finding(name)
+      finding.setSectors(sectors)
+      for seriesType in seriesTypes.values():
+        if 4 in finding.getPickList(seriesType):
+          finding.setScore(seriesType, 4)
+      volume = seriesTypes["T2a"].getVolume()
+      annotation = finding.getOrCreateAnnotation(seriesTypes["T2a"], "vtkMRMLSegmentationNode")
+      annotation.getOrCreateMRMLNode()
+      mask = self._createLesionMask(slicer.util.arrayFromVolume(volume).shape, center)
+      slicer.util.updateSegmentBinaryLabelmapFromArray(mask, annotation.mrmlNode, annotation.segmentID, volume)
+      finding.setMeasurements(quantifier.quantifyFinding(finding))
+      findings.append(finding)
+    return findings
+
+  @staticmethod
+  def _createLesionMask(shape, center):
+    """ Returns (k, j, i) uint8 array of shape with an ellipsoid around center, given as fractions of shape """
+    grid = np.ogrid[tuple(slice(0, n) for n in shape)]
+    distance = sum(((g - c * n) / max(n / 8.0, 1.0)) ** 2 for g, c, n in zip(grid, center, shape))
+    return (distance <= 1).astype(np.uint8)
+
+  def toDict(self):
+    return OrderedDict([
+      ("formatVersion", RESULTS_FORMAT_VERSION),
+      ("timestamp", time.strftime("%Y-%m-%dT%H:%M:%S")),
+      ("platform", platform.platform()),
+      ("python", platform.python_version()),
+      ("slicer", slicer.app.applicationVersion),
+      ("seed", self.seed),
+      ("results", self.results)
+    ])
+
+  def writeResults(self, fileName):
+    with open(fileName, 'w') as f:
+      json.dump(self.toDict(), f, indent=2)
+
+
+def main(argv):
+  parser = argparse.ArgumentParser(description="Benchmarks SlicerPIRADS with synthetic prostate MR studies")
+  parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(STUDY_SIZES.keys()))
+  parser.add_argument("--benchmarks", nargs="+", default=None, choices=SlicerPIRADSBenchmark.BENCHMARKS)
+  parser.add_argument("--repeats", type=int, default=3)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--output", default="SlicerPIRADSBenchmark.json", help="JSON file the results are written to")
+  parser.add_argument("--keep", action="store_true", help="keep generated studies and databases")
+  args = parser.parse_args(argv)
+
+  workingDirectory = tempfile.mkdtemp(prefix="SlicerPIRADSBenchmark")
+  try:
+    benchmark = SlicerPIRADSBenchmark(workingDirectory, repeats=args.repeats, seed=args.seed)
+    benchmark.run(args.sizes, args.benchmarks)
+    benchmark.writeResults(args.output)
+    logging.info("Benchmark results written to %s" % os.path.abspath(args.output))
+  finally:
+    if not args.keep:
+      shutil.rmtree(workingDirectory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+  main(sys.argv[1:])
+  slicer.util.exit()
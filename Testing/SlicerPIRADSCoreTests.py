@@ -0,0 +1,253 @@
+import os
+import struct
+import unittest
+import logging
+import inspect
+import shutil
+import tempfile
+import xml.etree.ElementTree as ElementTree
+
+import pydicom
+from pydicom.dataset import Dataset
+
+from SlicerPIRADSCore.SeriesType import SeriesTypeFactory, T2a, DWI, DWIb, ADC, DCE, B_VALUE_TAGS, readBValue, \
+  readBValues, getBValuesFromDescription
+from SlicerPIRADSCore.HangingProtocol import createLayoutDescription, getGridSize, getViewNames
+from SlicerPIRADSCore.LesionAssessmentRules import LesionAssessmentRuleFactory, PZRule, TZRule
+from SlicerPIRADSCore.PIRADSAssessmentCategory import PIRADSAssessmentCategory, calculateLesionCategory, \
+  getLesionDiameter
+from SlicerPIRADSCore.QIICRX import QIICRXReportContext, generateQIICRXMetadata, loadAcquisitionTypes, readHeader, \
+  isQIICRXDataset, UID_ENHANCED_SR_STORAGE
+
+from SyntheticStudyGenerator import SyntheticStudyGenerator, StudySize
+
+
+ACQUISITION_TYPES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SlicerPIRADS", "Resources",
+                                      "ProstateMRIAcquisitionTypes.json")
+
+
+class FindingStub(object):
+
+  def __init__(self, zone, scores):
+    self._rule = LesionAssessmentRuleFactory.getLesionAssessmentRuleForZone(zone)
+    self._scores = scores
+
+  def getAssessmentRule(self):
+    return self._rule
+
+  def getAssessmentScores(self):
+    return self._scores
+
+
+class MeasuredFindingStub(FindingStub):
+
+  def __init__(self, zone, scores, diameter):
+    FindingStub.__init__(self, zone, scores)
+    self.diameter = diameter
+
+  def getMaximumDiameter(self):
+    return self.diameter
+
+
+class SlicerPIRADSCoreTests(unittest.TestCase):
+  """ Tests of the Slicer independent logic. Only numpy and pydicom are required. """
+
+  @classmethod
+  def setUpClass(cls):
+    cls.directory = tempfile.mkdtemp()
+    size = StudySize("tiny", instancesPerSeries=2, bValues=(0, 800), dceFrames=2, matrixSize=8)
+    cls.study = SyntheticStudyGenerator(seed=1).generate(cls.directory, size)
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls.directory, ignore_errors=True)
+
+  def test_series_type_classification(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    for series in self.study.series:
+      self.assertEqual(SeriesTypeFactory.getSeriesTypeForFiles(series.files).getName(), series.expectedSeriesType)
+      self.assertEqual(SeriesTypeFactory.getSeriesTypeForDescription(series.description).getName(),
+                       series.expectedSeriesType)
+    self.assertIsNone(SeriesTypeFactory.getSeriesTypeForDescription("localizer"))
+
+  def test_b_values(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    dwi = [s for s in self.study.series if s.expectedSeriesType == "DWI"][0]
+    self.assertEqual(readBValues(dwi.files), [0, 800])
+    self.assertIsNone(readBValues(self.study.series[0].files))
+    self.assertEqual(SeriesTypeFactory.getSeriesTypeForFiles(dwi.files), DWI)
+    self.assertEqual(SeriesTypeFactory.getSeriesTypeForFiles(dwi.files[-1:]), DWI)
+
+    dataset = Dataset()
+    dataset.add_new(B_VALUE_TAGS["Philips"], "UN", struct.pack("<f", 1400.0))
+    self.assertEqual(readBValue(dataset), 1400)
+    dataset = Dataset()
+    dataset.add_new(B_VALUE_TAGS["GE"], "UN", b"1000001500\\8\\0\\0")
+    self.assertEqual(readBValue(dataset), 1500)
+    dataset = Dataset()
+    dataset.add_new(B_VALUE_TAGS["Siemens"], "IS", "2000")
+    self.assertEqual(readBValue(dataset), 2000)
+    self.assertIsNone(readBValue(Dataset()))
+
+  def test_b_value_classification_of_files(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    directory = tempfile.mkdtemp()
+    try:
+      size = StudySize("tiny", instancesPerSeries=1, bValues=(1400, 0, 800), dceFrames=1, matrixSize=8)
+      study = SyntheticStudyGenerator().generate(directory, size)
+      dwi = [s for s in study.series if s.expectedSeriesType == "DWI"][0]
+      self.assertEqual(readBValue(pydicom.dcmread(dwi.files[0], stop_before_pixels=True)), 1400)
+      self.assertEqual(SeriesTypeFactory.getSeriesType(dwi.files[0]), DWI)
+      self.assertEqual(SeriesTypeFactory.getSeriesTypeForFiles(dwi.files), DWI)
+      self.assertEqual(SeriesTypeFactory.getSeriesType(dwi.files[0], readBValues(dwi.files[:1])), DWIb)
+    finally:
+      shutil.rmtree(directory, ignore_errors=True)
+
+  def test_b_value_classification(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.assertEqual(getBValuesFromDescription("ep2d_diff_dwi b=1400"), [1400])
+    self.assertEqual(getBValuesFromDescription("dwi_b50_800"), [])
+    self.assertEqual(SeriesTypeFactory.getSeriesTypeForDescription("ax dwi"), DWI)
+    self.assertEqual(SeriesTypeFactory.getSeriesTypeForDescription("ax dwi b1400"), DWIb)
+    self.assertEqual(SeriesTypeFactory.getSeriesTypeForDescription("ax dwi", [1400]), DWIb)
+    self.assertEqual(SeriesTypeFactory.getSeriesTypeForDescription("ax dwi", [2000]), DWIb)
+    self.assertEqual(SeriesTypeFactory.getSeriesTypeForDescription("ax dwi", [0, 800, 1400]), DWI)
+    self.assertEqual(SeriesTypeFactory.getSeriesTypeForDescription("ax dwi b1400", [50, 800]), DWI)
+    self.assertEqual(SeriesTypeFactory.getSeriesTypeForDescription("t2_tse_ax", [1400]), T2a)
+
+  def test_adaptive_layout(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.assertEqual(getGridSize(1), (1, 1))
+    self.assertEqual(getGridSize(4), (2, 2))
+    self.assertEqual(getGridSize(5), (2, 3))
+    self.assertEqual(getGridSize(7), (3, 3))
+    with self.assertRaises(ValueError):
+      getGridSize(0)
+
+    layout = ElementTree.fromstring(createLayoutDescription(5))
+    rows = layout.findall("./item/layout")
+    self.assertEqual([len(row.findall("./item")) for row in rows], [3, 2])
+    self.assertEqual([view.get("singletontag") for view in layout.iter("view")], getViewNames(5))
+    self.assertEqual(getViewNames(5)[:3], getViewNames(3))
+
+  def test_lesion_assessment_rules(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.assertIsInstance(LesionAssessmentRuleFactory.getEligibleLesionAssessmentRule(["PZpl_Base_R"]), PZRule)
+    self.assertIsInstance(LesionAssessmentRuleFactory.getEligibleLesionAssessmentRule(["TZa_Mid_L"]), TZRule)
+    self.assertIsNone(LesionAssessmentRuleFactory.getEligibleLesionAssessmentRule(["PZpl_Base_R", "TZa_Mid_L"]))
+    rule = LesionAssessmentRuleFactory.getEligibleLesionAssessmentRule(["PZpl_Base_R", "TZa_Mid_L"],
+                                                                      chooseZone=lambda zones: zones[0])
+    self.assertIsInstance(rule, TZRule)
+
+  def test_assessment_category(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.assertEqual(calculateLesionCategory("PZ", {T2a: 2, DWI: 3, DCE: "-"}), 3)
+    self.assertEqual(calculateLesionCategory("PZ", {T2a: 2, DWI: 3, DCE: "+"}), 4)
+    self.assertEqual(calculateLesionCategory("TZ", {T2a: 3, ADC: 5}), 4)
+    self.assertEqual(calculateLesionCategory("TZ", {T2a: 2, ADC: 5}), 2)
+    self.assertIsNone(calculateLesionCategory("TZ", {DWI: 4}))
+
+    category = PIRADSAssessmentCategory([FindingStub("PZ", {DWI: 2}), FindingStub("TZ", {T2a: 4})])
+    self.assertEqual(category.getAssessmentCategory(), 4)
+    category.addFinding(FindingStub("PZ", {DWI: 5}))
+    self.assertEqual(category.getAssessmentCategory(), 5)
+
+  def test_assessment_category_size_threshold(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.assertEqual(calculateLesionCategory("PZ", {DWI: 4}, 14.9), 4)
+    self.assertEqual(calculateLesionCategory("PZ", {DWI: 4}, 15.0), 5)
+    self.assertEqual(calculateLesionCategory("PZ", {DWI: 3, DCE: "+"}, 20.0), 4)
+    self.assertEqual(calculateLesionCategory("TZ", {T2a: 4}, 16.0), 5)
+    self.assertEqual(calculateLesionCategory("TZ", {T2a: 3}, 16.0), 3)
+
+    self.assertIsNone(getLesionDiameter("PZ", {}))
+    self.assertEqual(getLesionDiameter("PZ", {T2a: 17.0, ADC: 12.0}), 12.0)
+    self.assertEqual(getLesionDiameter("TZ", {T2a: 17.0, ADC: 12.0}), 17.0)
+    self.assertEqual(getLesionDiameter("PZ", {T2a: 17.0, DCE: 9.0}), 17.0)
+
+    finding = MeasuredFindingStub("PZ", {DWI: 4}, 10.0)
+    category = PIRADSAssessmentCategory([finding])
+    self.assertEqual(category.getAssessmentCategory(), 4)
+    finding.diameter = 18.0
+    self.assertEqual(category.getAssessmentCategory(), 4)
+    category.invalidate()
+    self.assertEqual(category.getAssessmentCategory(), 5)
+
+  def test_qiicrx_metadata(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    context = QIICRXReportContext.fromSeriesFiles([(s.seriesInstanceUID, s.files) for s in self.study.series])
+    data, params = generateQIICRXMetadata(context, loadAcquisitionTypes(ACQUISITION_TYPES_FILE))
+
+    self.assertEqual(data["SeriesDescription"], "PI-RADS Report")
+    self.assertEqual(data["compositeContext"], os.path.basename(self.study.series[0].files[0]))
+    self.assertEqual(os.path.normpath(params["imageLibraryDataDir"]), os.path.normpath(self.study.directory))
+    self.assertEqual(len(data["imageLibrary"]), len(self.study.series))
+    self.assertEqual(data["imageLibrary"][0]["piradsSeriesType"]["CodeMeaning"], "T2-weighted Axial Acquisition")
+    self.assertEqual(data["imageLibrary"][0]["inputDICOMDirectory"], "01_T2a")
+    self.assertNotIn("findings", data)
+
+  def test_qiicrx_metadata_without_eligible_series(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    context = QIICRXReportContext.fromSeriesFiles([("1.2.3", self.study.series[0].files)],
+                                                  getSeriesType=lambda files: None)
+    self.assertEqual(len(context.getEligibleContext()), 0)
+    with self.assertRaises(ValueError):
+      generateQIICRXMetadata(context, {})
+
+  def test_report_context_resolves_series_once(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    classified = []
+
+    def getSeriesType(files):
+      classified.append(files[0])
+      return T2a if files is self.study.series[0].files else None
+
+    context = QIICRXReportContext.fromSeriesFiles([(s.seriesInstanceUID, s.files) for s in self.study.series] +
+                                                  [("1.2.3", [])], getSeriesType)
+    eligible = context.getEligibleContext()
+    generateQIICRXMetadata(eligible, loadAcquisitionTypes(ACQUISITION_TYPES_FILE))
+
+    self.assertEqual(len(classified), len(self.study.series))
+    self.assertEqual(eligible.getSeriesInstanceUIDs(), [self.study.series[0].seriesInstanceUID])
+    self.assertFalse(eligible.isOrganizedInDirectories())
+    self.assertIs(loadAcquisitionTypes(ACQUISITION_TYPES_FILE), loadAcquisitionTypes(ACQUISITION_TYPES_FILE))
+
+  def test_read_header(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    mrFile = self.study.series[0].files[0]
+    dataset, numberOfBytes = readHeader(mrFile)
+    self.assertEqual(dataset.SeriesDescription, "t2_tse_ax")
+    self.assertNotIn("PixelData", dataset)
+    self.assertLess(numberOfBytes, os.path.getsize(mrFile))
+    self.assertFalse(isQIICRXDataset(dataset))
+
+    srFile = os.path.join(self.directory, "sr.dcm")
+    sr = pydicom.dcmread(mrFile)
+    del sr.PixelData
+    sr.Modality = "SR"
+    sr.SOPClassUID = sr.file_meta.MediaStorageSOPClassUID = UID_ENHANCED_SR_STORAGE
+    template = Dataset()
+    template.MappingResource = "99QIICR"
+    template.TemplateIdentifier = "QIICRX"
+    sr.ContentTemplateSequence = [template]
+    content = Dataset()
+    content.TextValue = "x" * 10000
+    sr.ContentSequence = [content]
+    SyntheticStudyGenerator._write(sr, srFile)
+
+    dataset, numberOfBytes = readHeader(srFile)
+    self.assertTrue(isQIICRXDataset(dataset))
+    self.assertNotIn("ContentSequence", dataset)
+    self.assertLess(numberOfBytes, 10000)
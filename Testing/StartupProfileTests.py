@@ -0,0 +1,46 @@
+import unittest
+import logging
+import inspect
+
+from SlicerPIRADSLogic.StartupProfile import StartupProfile
+
+
+class StartupProfileTests(unittest.TestCase):
+
+  def setUp(self):
+    self.profile = StartupProfile()
+    self.profile.reset()
+
+  def test_stages_accumulate(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    with self.profile.stage("setup"):
+      pass
+    self.profile.addStageDuration("setup", 0.5)
+    self.profile.addStageDuration("import", 0.25)
+
+    stages = self.profile.getStages()
+    self.assertEqual([name for name, _, _ in stages], ["setup", "import"])
+    self.assertEqual(stages[0][1], 2)
+    self.assertGreaterEqual(self.profile.getStageDuration("setup"), 0.5)
+    self.assertIsNone(self.profile.getStageDuration("unknown"))
+
+  def test_stage_recorded_on_exception(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    with self.assertRaises(ValueError):
+      with self.profile.stage("failing"):
+        raise ValueError()
+    self.assertIsNotNone(self.profile.getStageDuration("failing"))
+
+  def test_milestones_and_report(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.assertTrue(self.profile.markMilestone("first study loaded"))
+    self.assertFalse(self.profile.markMilestone("first study loaded"))
+    self.profile.addStageDuration("import SegmentEditor", 0.1234)
+
+    report = self.profile.getReport()
+    self.assertIn("import SegmentEditor", report)
+    self.assertIn("123.4", report)
+    self.assertIn("first study loaded", report)
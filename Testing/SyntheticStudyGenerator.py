@@ -0,0 +1,216 @@
+import os
+import datetime
+import numpy as np
+from collections import OrderedDict
+
+import pydicom
+from pydicom.dataset import Dataset, FileDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+try:
+  from pydicom.dataset import FileMetaDataset
+except ImportError:
+  # pydicom < 2.0
+  FileMetaDataset = Dataset
+
+
+MR_IMAGE_STORAGE = "1.2.840.10008.5.1.4.1.1.4"
+
+ORIENTATIONS = {
+  "Axial": [1, 0, 0, 0, 1, 0],
+  "Sagittal": [0, 1, 0, 0, 0, -1],
+  "Coronal": [1, 0, 0, 0, 0, -1]
+}
+
+
+class StudySize(object):
+  """ Dimensions of a synthetic multi-parametric prostate MR study
+
+  Attributes:
+    name: name used for reporting e.g. 'small'
+    instancesPerSeries: number of slices of each T2, ADC and DWI volume and of each DCE frame
+    bValues: b-values of the DWI series. One volume is generated per b-value.
+    dceFrames: number of DCE frames
+    matrixSize: number of rows and columns of each image
+  """
+
+  __slots__ = ("name", "instancesPerSeries", "bValues", "dceFrames", "matrixSize")
+
+  def __init__(self, name, instancesPerSeries, bValues, dceFrames, matrixSize):
+    self.name = name
+    self.instancesPerSeries = instancesPerSeries
+    self.bValues = tuple(bValues)
+    self.dceFrames = dceFrames
+    self.matrixSize = matrixSize
+
+  def getNumberOfInstances(self):
+    """ Returns number of files of the whole study """
+    return self.instancesPerSeries * (3 + 1 + len(self.bValues) + self.dceFrames)
+
+
+STUDY_SIZES = OrderedDict([
+  ("small", StudySize("small", 12, (0, 400, 800), 8, 64)),
+  ("medium", StudySize("medium", 24, (0, 100, 400, 800, 1400), 20, 128)),
+  ("large", StudySize("large", 32, (0, 50, 100, 400, 800, 1400, 2000), 40, 256))
+])
+
+
+class SyntheticSeries(object):
+  """ Description of one generated series
+
+  Attributes:
+    seriesInstanceUID: SeriesInstanceUID
+    description: SeriesDescription e.g. 't2_tse_ax'
+    expectedSeriesType: name of the SeriesType the series is supposed to be classified as
+    files: list of generated file paths
+  """
+
+  __slots__ = ("seriesInstanceUID", "description", "expectedSeriesType", "files")
+
+  def __init__(self, seriesInstanceUID, description, expectedSeriesType):
+    self.seriesInstanceUID = seriesInstanceUID
+    self.description = description
+    self.expectedSeriesType = expectedSeriesType
+    self.files = []
+
+
+class SyntheticStudy(object):
+  """ Description of a generated study with patientID, studyInstanceUID, directory and a list of SyntheticSeries """
+
+  def __init__(self, patientID, studyInstanceUID, directory, size):
+    self.patientID = patientID
+    self.studyInstanceUID = studyInstanceUID
+    self.directory = directory
+    self.size = size
+    self.series = []
+
+  def getFiles(self):
+    return [f for series in self.series for f in series.files]
+
+
+class SyntheticStudyGenerator(object):
+  """ Writes synthetic multi-parametric prostate MR studies (T2 in three planes, DWI with several b-values, ADC and DCE)
+  to disk using pydicom. Pixel data is random noise generated from seed, so that studies are reproducible.
+
+  .. code-block:: python
+
+    study = SyntheticStudyGenerator(seed=42).generate("/tmp/benchmark", STUDY_SIZES["small"])
+    print(len(study.getFiles()))
+  """
+
+  def __init__(self, seed=0):
+    self._random = np.random.RandomState(seed)
+    self._patientCount = 0
+
+  def generate(self, outputDirectory, size, patientName=None):
+    """ Generates a study of the given StudySize into a new sub directory of outputDirectory
+
+    Returns:
+      SyntheticStudy
+    """
+    self._patientCount += 1
+    patientID = "PIRADS-{:04d}".format(self._patientCount)
+    study = SyntheticStudy(patientID, generate_uid(), os.path.join(outputDirectory, patientID, size.name), size)
+    studyTags = {
+      "PatientName": patientName if patientName else "Synthetic^{}".format(patientID),
+      "PatientID": patientID,
+      "PatientBirthDate": "19500101",
+      "PatientSex": "M",
+      "StudyInstanceUID": study.studyInstanceUID,
+      "StudyDate": datetime.date.today().strftime("%Y%m%d"),
+      "StudyTime": "080000",
+      "StudyID": "1",
+      "AccessionNumber": patientID,
+      "FrameOfReferenceUID": generate_uid()
+    }
+
+    seriesNumber = 0
+    for description, seriesType, orientation in [("t2_tse_ax", "T2a", "Axial"), ("t2_tse_sag", "T2s", "Sagittal"),
+                                                 ("t2_tse_cor", "T2c", "Coronal")]:
+      seriesNumber += 1
+      self._addSeries(study, studyTags, seriesNumber, description, seriesType, orientation, [dict()])
+
+    seriesNumber += 1
+    self._addSeries(study, studyTags, seriesNumber, "ep2d_diff_dwi", "DWI", "Axial",
+                    [{"DiffusionBValue": float(b)} for b in size.bValues])
+
+    seriesNumber += 1
+    self._addSeries(study, studyTags, seriesNumber, "Apparent Diffusion Coefficient (mm2/s)", "ADC", "Axial", [dict()])
+
+    seriesNumber += 1
+    self._addSeries(study, studyTags, seriesNumber, "AX DYNAMIC", "DCE", "Axial",
+                    [{"TemporalPositionIdentifier": frame + 1, "TriggerTime": frame * 7000.0}
+                     for frame in range(size.dceFrames)])
+    return study
+
+  def _addSeries(self, study, studyTags, seriesNumber, description, seriesType, orientation, volumes):
+    """ Writes one series consisting of len(volumes) volumes. Each entry of volumes holds additional tags. """
+    series = SyntheticSeries(generate_uid(), description, seriesType)
+    directory = os.path.join(study.directory, "{:02d}_{}".format(seriesNumber, seriesType))
+    if not os.path.exists(directory):
+      os.makedirs(directory)
+    size = study.size
+    instanceNumber = 0
+    for volumeTags in volumes:
+      for sliceIndex in range(size.instancesPerSeries):
+        instanceNumber += 1
+        dataset = self._createDataset(studyTags, size, orientation, sliceIndex)
+        dataset.SeriesInstanceUID = series.seriesInstanceUID
+        dataset.SeriesDescription = description
+        dataset.SeriesNumber = seriesNumber
+        dataset.InstanceNumber = instanceNumber
+        for keyword, value in volumeTags.items():
+          setattr(dataset, keyword, value)
+        fileName = os.path.join(directory, "{:05d}.dcm".format(instanceNumber))
+        self._write(dataset, fileName)
+        series.files.append(fileName)
+    study.series.append(series)
+    return series
+
+  def _createDataset(self, studyTags, size, orientation, sliceIndex):
+    sopInstanceUID = generate_uid()
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = MR_IMAGE_STORAGE
+    meta.MediaStorageSOPInstanceUID = sopInstanceUID
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    dataset = FileDataset(None, {}, file_meta=meta, preamble=b"\0" * 128)
+    for keyword, value in studyTags.items():
+      setattr(dataset, keyword, value)
+    dataset.SOPClassUID = MR_IMAGE_STORAGE
+    dataset.SOPInstanceUID = sopInstanceUID
+    dataset.Modality = "MR"
+    dataset.Manufacturer = "SlicerPIRADS Benchmark"
+    dataset.SeriesDate = dataset.ContentDate = studyTags["StudyDate"]
+    dataset.SeriesTime = dataset.ContentTime = studyTags["StudyTime"]
+
+    spacing = 180.0 / size.matrixSize
+    sliceThickness = 3.0
+    rowDirection, columnDirection = np.array(ORIENTATIONS[orientation][:3]), np.array(ORIENTATIONS[orientation][3:])
+    normal = np.cross(rowDirection, columnDirection)
+    origin = -90.0 * (rowDirection + columnDirection) + \
+             (sliceIndex - size.instancesPerSeries / 2.0) * sliceThickness * normal
+    dataset.ImageOrientationPatient = ORIENTATIONS[orientation]
+    dataset.ImagePositionPatient = [round(float(v), 4) for v in origin]
+    dataset.PixelSpacing = [spacing, spacing]
+    dataset.SliceThickness = sliceThickness
+    dataset.SliceLocation = round(float(np.dot(origin, normal)), 4)
+
+    dataset.Rows = dataset.Columns = size.matrixSize
+    dataset.SamplesPerPixel = 1
+    dataset.PhotometricInterpretation = "MONOCHROME2"
+    dataset.BitsAllocated = 16
+    dataset.BitsStored = 12
+    dataset.HighBit = 11
+    dataset.PixelRepresentation = 0
+    dataset.PixelData = self._random.randint(0, 4096, (size.matrixSize, size.matrixSize)).astype(np.uint16).tobytes()
+    return dataset
+
+  @staticmethod
+  def _write(dataset, fileName):
+    if int(pydicom.__version__.split(".")[0]) >= 3:
+      dataset.save_as(fileName, enforce_file_format=True)
+    else:
+      dataset.is_little_endian = True
+      dataset.is_implicit_VR = False
+      dataset.save_as(fileName, write_like_original=False)
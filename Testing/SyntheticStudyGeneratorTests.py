@@ -0,0 +1,53 @@
+import unittest
+import logging
+import inspect
+import shutil
+import tempfile
+
+import pydicom
+
+from SyntheticStudyGenerator import SyntheticStudyGenerator, StudySize
+
+
+class SyntheticStudyGeneratorTests(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.size = StudySize("tiny", instancesPerSeries=3, bValues=(0, 800, 1400), dceFrames=2, matrixSize=8)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory, ignore_errors=True)
+
+  def test_study_layout(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    study = SyntheticStudyGenerator(seed=1).generate(self.directory, self.size)
+
+    self.assertEqual([s.expectedSeriesType for s in study.series], ["T2a", "T2s", "T2c", "DWI", "ADC", "DCE"])
+    self.assertEqual(len(study.getFiles()), self.size.getNumberOfInstances())
+    self.assertEqual(len(study.series[3].files), 9)
+    self.assertEqual(len(study.series[5].files), 6)
+    self.assertEqual(len(set(s.seriesInstanceUID for s in study.series)), 6)
+
+  def test_dicom_attributes(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    study = SyntheticStudyGenerator(seed=1).generate(self.directory, self.size)
+
+    dwi = [pydicom.dcmread(f) for f in study.series[3].files]
+    self.assertEqual(sorted(set(float(ds.DiffusionBValue) for ds in dwi)), [0.0, 800.0, 1400.0])
+    self.assertTrue(all(ds.StudyInstanceUID == study.studyInstanceUID for ds in dwi))
+    self.assertEqual([ds.InstanceNumber for ds in dwi], list(range(1, 10)))
+
+    dce = pydicom.dcmread(study.series[5].files[-1])
+    self.assertEqual(dce.SeriesDescription, "AX DYNAMIC")
+    self.assertEqual(dce.TemporalPositionIdentifier, 2)
+    self.assertEqual(dce.pixel_array.shape, (8, 8))
+
+  def test_reproducible_pixel_data(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    first = SyntheticStudyGenerator(seed=7).generate(self.directory, self.size, patientName="A^A")
+    second = SyntheticStudyGenerator(seed=7).generate(tempfile.mkdtemp(dir=self.directory), self.size)
+    self.assertEqual(pydicom.dcmread(first.series[0].files[0]).PixelData,
+                     pydicom.dcmread(second.series[0].files[0]).PixelData)
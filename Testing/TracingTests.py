@@ -0,0 +1,96 @@
+import unittest
+import logging
+import inspect
+import csv
+import json
+import os
+import tempfile
+
+from SlicerPIRADSLogic.Tracing import Tracer, BYTES_DECODED, DATABASE_QUERIES, FILES_READ
+
+
+class TracingTests(unittest.TestCase):
+
+  def setUp(self):
+    self.tracer = Tracer()
+    self.tracer.reset()
+    self.tracer.enabled = True
+
+  def tearDown(self):
+    self.tracer.enabled = False
+    self.tracer.reset()
+
+  def test_nested_spans_and_counters(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    with self.tracer.span("load", studyUID="1.2.3"):
+      self.tracer.count(DATABASE_QUERIES)
+      with self.tracer.span("read"):
+        self.tracer.count(FILES_READ, 2)
+        self.tracer.count(BYTES_DECODED, 1024)
+
+    load, read = self.tracer.getSpans()
+    self.assertEqual((load.name, load.depth, read.name, read.depth), ("load", 0, "read", 1))
+    self.assertEqual(load.args, {"studyUID": "1.2.3"})
+    self.assertEqual(load.counters, {DATABASE_QUERIES: 1, FILES_READ: 2, BYTES_DECODED: 1024})
+    self.assertEqual(read.counters, {FILES_READ: 2, BYTES_DECODED: 1024})
+    self.assertGreaterEqual(load.duration, read.duration)
+    self.assertEqual(self.tracer.getCounters()[FILES_READ], 2)
+
+  def test_disabled_tracer_records_nothing(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    self.tracer.enabled = False
+    database = object()
+
+    @self.tracer.traced()
+    def query():
+      self.tracer.count(DATABASE_QUERIES)
+      return 42
+
+    self.assertEqual(query(), 42)
+    self.assertIs(self.tracer.countCalls(database), database)
+    self.assertEqual(self.tracer.getSpans(), [])
+    self.assertEqual(self.tracer.getCounters(), {})
+
+  def test_count_calls(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    class Database(object):
+      name = "ctkDICOMDatabase"
+
+      def patients(self):
+        return ["p1", "p2"]
+
+    database = self.tracer.countCalls(Database())
+    self.assertEqual(database.name, "ctkDICOMDatabase")
+    self.assertEqual(database.patients(), ["p1", "p2"])
+    database.patients()
+    self.assertEqual(self.tracer.getCounters()[DATABASE_QUERIES], 2)
+
+  def test_export(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    @self.tracer.traced("examine")
+    def examine():
+      self.tracer.count(FILES_READ)
+
+    examine()
+    examine()
+
+    trace = self.tracer.toChromeTrace()
+    self.assertEqual([e["name"] for e in trace["traceEvents"]], ["examine", "examine"])
+    self.assertTrue(all(e["ph"] == "X" and e["args"][FILES_READ] == 1 for e in trace["traceEvents"]))
+    self.assertEqual(trace["otherData"]["counters"][FILES_READ], 2)
+
+    directory = tempfile.mkdtemp()
+    jsonFile = os.path.join(directory, "trace.json")
+    csvFile = os.path.join(directory, "trace.csv")
+    self.tracer.exportChromeTrace(jsonFile)
+    self.tracer.exportCSV(csvFile)
+    with open(jsonFile) as f:
+      self.assertEqual(len(json.load(f)["traceEvents"]), 2)
+    with open(csvFile) as f:
+      rows = list(csv.reader(f))
+    self.assertEqual(rows[0], ["name", "depth", "thread", "start_ms", "duration_ms", FILES_READ])
+    self.assertEqual([row[0] for row in rows[1:]], ["examine", "examine"])
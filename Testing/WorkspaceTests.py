@@ -0,0 +1,67 @@
+import os
+import time
+import unittest
+import logging
+import inspect
+import shutil
+import tempfile
+
+from SlicerPIRADSCore.Workspace import Workspace, hashData, hashFile
+
+
+class WorkspaceTests(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.directory, ignore_errors=True)
+
+  def _addEntry(self, workspace, content, lastAccess):
+    entry = workspace.getEntry(hashData(content))
+    with open(os.path.join(entry, "meta.json"), 'w') as f:
+      f.write(content)
+    os.utime(entry, (lastAccess, lastAccess))
+    return entry
+
+  def test_content_addressing(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    fileName = os.path.join(self.directory, "sr.dcm")
+    with open(fileName, 'wb') as f:
+      f.write(b"DICM" * 1000)
+    self.assertEqual(hashFile(fileName, blockSize=7), hashData(b"DICM" * 1000))
+
+    workspace = Workspace(os.path.join(self.directory, "QIICRX"))
+    entry = workspace.getEntry(hashFile(fileName))
+    self.assertTrue(os.path.isdir(entry))
+    self.assertEqual(workspace.getEntry(hashFile(fileName)), entry)
+    self.assertNotEqual(workspace.getEntry(hashData("other")), entry)
+
+  def test_evict_by_age(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    now = time.time()
+    workspace = Workspace(self.directory, maximumAge=3600)
+    old = self._addEntry(workspace, "old", now - 7200)
+    recent = self._addEntry(workspace, "recent", now - 60)
+
+    removed = workspace.evict(now)
+    self.assertEqual([e.directory for e in removed], [old])
+    self.assertFalse(os.path.exists(old))
+    self.assertTrue(os.path.exists(recent))
+
+  def test_evict_least_recently_used_by_size(self):
+    logging.info('Starting %s' % inspect.stack()[0][3])
+
+    now = time.time()
+    workspace = Workspace(self.directory, maximumSize=2000)
+    entries = [self._addEntry(workspace, str(i) * 1000, now - 100 + i) for i in range(3)]
+    self.assertEqual(workspace.getSize(), 3000)
+
+    workspace.getEntry(hashData("0" * 1000))
+    workspace.evict(now + 1)
+    self.assertTrue(os.path.exists(entries[0]))
+    self.assertFalse(os.path.exists(entries[1]))
+    self.assertTrue(os.path.exists(entries[2]))
+    self.assertEqual(workspace.getSize(), 2000)
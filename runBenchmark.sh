@@ -0,0 +1,5 @@
+#!/usr/bin/env bash
+SLICER="/Applications/Slicer.app/Contents/MacOS/Slicer"
+DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+
+$SLICER --no-splash --no-main-window --python-script "$DIR/Testing/SlicerPIRADSBenchmark.py" "$@"